@@ -0,0 +1,358 @@
+# Modul: backup_catalog.py
+# Funktion: Katalog aller Backups mit Dateiversionen, Point-in-Time-Wiederherstellung und Aufbewahrungsregeln
+
+# Aufgaben:
+# - Jeden Backup-Lauf (full, delta, selective, repository) als Snapshot in einer SQLite-Datenbank erfassen
+# - Je Datei Versionen als Intervall [first_seen, last_seen] über die Snapshots einer Quelle speichern,
+#   zusammen mit dem Snapshot, der die Bytes tatsächlich enthält (holder)
+# - Wiederherstellung eines ganzen Ordners oder einer einzelnen Datei zu einem beliebigen Zeitpunkt,
+#   ohne Delta-Ordner nacheinander abzuspielen (eine Leseoperation je Datei)
+# - Aufbewahrungsregeln (die letzten N, maximales Alter) allein anhand des Katalogs anwenden;
+#   Snapshots, deren Dateien noch von behaltenen Snapshots benötigt werden, bleiben erhalten;
+#   im Repository werden danach nicht mehr referenzierte Chunks entfernt (Mark-and-Sweep)
+
+# Strukturvorschlag:
+# - Klasse: BackupCatalog(db_path)
+#   - record_snapshot(source, kind, location, files, stored, ref, complete) → snapshot_id
+#   - snapshot_at(source, at) / versions_at(source, snapshot_id) / version_at(source, path, at)
+#   - held_paths(source) → Pfade, deren aktuelle Version eine gesicherte Kopie hat
+#   - plan_prune(source, keep_last, max_age_days) / remove_snapshots(snapshot_ids)
+# - Funktion: restore_tree(backup_root, source_folder, target_folder, at=None)
+# - Funktion: restore_path(backup_root, source_folder, rel_path, target_path, at=None)
+# - Funktion: prune_backups(backup_root, source_folder, keep_last=None, max_age_days=None)
+
+import os
+import time
+import shutil
+import sqlite3
+import zipfile
+import logging
+from collections import defaultdict, namedtuple
+from datetime import datetime
+
+CATALOG_FILE = 'backup_catalog.db'
+
+Snapshot = namedtuple('Snapshot', ['id', 'kind', 'location', 'ref', 'created', 'complete'])
+FileVersion = namedtuple('FileVersion', ['path', 'size', 'mtime_ns', 'holder_id'])
+
+def _timestamp(at):
+    """Wandelt None (jetzt), datetime oder Unix-Zeit in Sekunden seit der Epoche um."""
+    if at is None:
+        return time.time()
+    if isinstance(at, datetime):
+        return at.timestamp()
+    return float(at)
+
+class BackupCatalog:
+    """SQLite-Katalog: welcher Snapshot enthält welche Version jeder Datei."""
+
+    def __init__(self, db_path=CATALOG_FILE):
+        self.root = os.path.dirname(os.path.abspath(db_path))
+        self.conn = sqlite3.connect(db_path)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.executescript('''
+            CREATE TABLE IF NOT EXISTS snapshots (
+                id INTEGER PRIMARY KEY,
+                source TEXT NOT NULL,
+                kind TEXT NOT NULL,
+                location TEXT NOT NULL,
+                ref TEXT,
+                created REAL NOT NULL,
+                complete INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS file_versions (
+                id INTEGER PRIMARY KEY,
+                source TEXT NOT NULL,
+                path TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                holder_id INTEGER REFERENCES snapshots (id),
+                first_seen INTEGER NOT NULL,
+                last_seen INTEGER NOT NULL,
+                partial INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_snapshots_source ON snapshots (source, created);
+            CREATE INDEX IF NOT EXISTS idx_file_versions_open ON file_versions (source, last_seen);
+            CREATE INDEX IF NOT EXISTS idx_file_versions_path ON file_versions (source, path, first_seen);
+            CREATE INDEX IF NOT EXISTS idx_file_versions_holder ON file_versions (holder_id);
+        ''')
+
+    def _latest_complete(self, source, before=None):
+        row = self.conn.execute('''
+            SELECT MAX(id) FROM snapshots WHERE source = ? AND complete = 1 AND created <= ?
+        ''', (source, _timestamp(before))).fetchone()
+        return row[0]
+
+    def record_snapshot(self, source, kind, location, files, stored, ref=None, complete=True):
+        """
+        Erfasst einen Backup-Lauf.
+
+        Args:
+            source (str): Gesicherter Ordner.
+            kind (str): 'full', 'delta', 'selective' oder 'repository'.
+            location (str): ZIP-Datei, Backup-Ordner oder Repository.
+            files (dict): {relativer Pfad mit '/': (Größe, mtime_ns)} aller erfassten Dateien.
+            stored (set): Pfade, deren Inhalt in diesem Snapshot liegt; für die übrigen
+                bleibt der Snapshot der vorherigen Version zuständig (Delta-Backups).
+            ref (str): Snapshot-ID im Repository (nur kind='repository').
+            complete (bool): False, wenn nur ein Teil des Ordners gesichert wurde (Selective Backup).
+
+        Returns:
+            int: snapshot_id im Katalog.
+        """
+        source = os.path.abspath(source)
+        location = os.path.relpath(os.path.abspath(location), self.root)
+        with self.conn:
+            previous_id = self._latest_complete(source)
+            snapshot_id = self.conn.execute('''
+                INSERT INTO snapshots (source, kind, location, ref, created, complete) VALUES (?, ?, ?, ?, ?, ?)
+            ''', (source, kind, location, ref, time.time(), int(complete))).lastrowid
+
+            if not complete:
+                self.conn.executemany('''
+                    INSERT INTO file_versions (source, path, size, mtime_ns, holder_id, first_seen, last_seen, partial)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, 1)
+                ''', ((source, path, size, mtime_ns, snapshot_id if path in stored else None, snapshot_id, snapshot_id)
+                      for path, (size, mtime_ns) in files.items()))
+                return snapshot_id
+
+            # Offene Versionen = Versionen, die im letzten vollständigen Snapshot gültig waren
+            open_versions = {}
+            if previous_id is not None:
+                open_versions = {path: (version_id, size, mtime_ns, holder_id)
+                                 for version_id, path, size, mtime_ns, holder_id in self.conn.execute('''
+                                     SELECT id, path, size, mtime_ns, holder_id FROM file_versions
+                                     WHERE source = ? AND last_seen = ? AND partial = 0
+                                 ''', (source, previous_id))}
+            extended = []
+            added = []
+            for path, (size, mtime_ns) in files.items():
+                previous = open_versions.get(path)
+                holder_id = snapshot_id if path in stored else (previous[3] if previous else None)
+                if previous is not None and previous[1:3] == (size, mtime_ns):
+                    # Gleiche Version: Intervall verlängern; neuester Holder gewinnt, damit alte Archive frei werden
+                    extended.append((snapshot_id, holder_id, previous[0]))
+                else:
+                    added.append((source, path, size, mtime_ns, holder_id, snapshot_id, snapshot_id))
+            self.conn.executemany('UPDATE file_versions SET last_seen = ?, holder_id = ? WHERE id = ?', extended)
+            self.conn.executemany('''
+                INSERT INTO file_versions (source, path, size, mtime_ns, holder_id, first_seen, last_seen, partial)
+                VALUES (?, ?, ?, ?, ?, ?, ?, 0)
+            ''', added)
+        return snapshot_id
+
+    def snapshot(self, snapshot_id):
+        row = self.conn.execute('SELECT id, kind, location, ref, created, complete FROM snapshots WHERE id = ?',
+                                (snapshot_id,)).fetchone()
+        return Snapshot(*row) if row else None
+
+    def snapshots(self, source):
+        """Alle Snapshots einer Quelle (älteste zuerst)."""
+        rows = self.conn.execute('''
+            SELECT id, kind, location, ref, created, complete FROM snapshots WHERE source = ? ORDER BY id
+        ''', (os.path.abspath(source),))
+        return [Snapshot(*row) for row in rows]
+
+    def snapshot_at(self, source, at=None):
+        """Letzter vollständiger Snapshot einer Quelle zum Zeitpunkt at (Standard: jetzt) oder None."""
+        snapshot_id = self._latest_complete(os.path.abspath(source), at)
+        return self.snapshot(snapshot_id) if snapshot_id is not None else None
+
+    def versions_at(self, source, snapshot_id):
+        """Alle Dateiversionen, die im vollständigen Snapshot snapshot_id gültig sind."""
+        rows = self.conn.execute('''
+            SELECT path, size, mtime_ns, holder_id FROM file_versions
+            WHERE source = ? AND partial = 0 AND first_seen <= ? AND last_seen >= ?
+        ''', (os.path.abspath(source), snapshot_id, snapshot_id))
+        return [FileVersion(*row) for row in rows]
+
+    def held_paths(self, source):
+        """Pfade, deren Version im letzten vollständigen Snapshot eine gesicherte Kopie (holder) hat."""
+        source = os.path.abspath(source)
+        snapshot_id = self._latest_complete(source)
+        if snapshot_id is None:
+            return set()
+        return {path for (path,) in self.conn.execute('''
+            SELECT path FROM file_versions
+            WHERE source = ? AND partial = 0 AND last_seen = ? AND holder_id IS NOT NULL
+        ''', (source, snapshot_id))}
+
+    def version_at(self, source, path, at=None):
+        """
+        Version einer Datei zum Zeitpunkt at oder None.
+
+        Berücksichtigt den letzten vollständigen Snapshot sowie neuere Selective Backups bis at.
+        """
+        source = os.path.abspath(source)
+        at = _timestamp(at)
+        complete_id = self._latest_complete(source, at) or 0
+        row = self.conn.execute('''
+            SELECT v.path, v.size, v.mtime_ns, v.holder_id FROM file_versions v
+            JOIN snapshots s ON s.id = v.first_seen
+            WHERE v.source = ? AND v.path = ? AND s.created <= ?
+              AND ((v.partial = 0 AND v.first_seen <= ? AND v.last_seen >= ?)
+                   OR (v.partial = 1 AND v.first_seen > ? AND v.holder_id IS NOT NULL))
+            ORDER BY v.first_seen DESC LIMIT 1
+        ''', (source, path.replace(os.sep, '/'), at, complete_id, complete_id, complete_id)).fetchone()
+        return FileVersion(*row) if row else None
+
+    def plan_prune(self, source, keep_last=None, max_age_days=None, now=None):
+        """
+        Ermittelt die Snapshots einer Quelle, die gelöscht werden dürfen.
+
+        Behalten wird, was in den letzten keep_last Snapshots liegt und jünger als
+        max_age_days ist (None = keine Einschränkung), immer der neueste vollständige
+        Snapshot sowie jeder Snapshot, der Dateien eines behaltenen Snapshots enthält.
+        """
+        source = os.path.abspath(source)
+        now = _timestamp(now)
+        rows = self.conn.execute('SELECT id, created FROM snapshots WHERE source = ? ORDER BY id DESC',
+                                 (source,)).fetchall()
+        retained = {self._latest_complete(source)}
+        for rank, (snapshot_id, created) in enumerate(rows):
+            if ((keep_last is None or rank < keep_last)
+                    and (max_age_days is None or now - created <= max_age_days * 86400)):
+                retained.add(snapshot_id)
+        retained.discard(None)
+        candidates = [snapshot_id for snapshot_id, _ in rows if snapshot_id not in retained]
+        if not candidates:
+            return []
+        placeholders = ', '.join('?' * len(retained))
+        needed = {holder_id for (holder_id,) in self.conn.execute(f'''
+            SELECT DISTINCT v.holder_id FROM file_versions v
+            JOIN snapshots s ON s.source = v.source AND s.id BETWEEN v.first_seen AND v.last_seen
+            WHERE v.source = ? AND v.partial = 1 - s.complete AND s.id IN ({placeholders})
+        ''', [source, *retained])}
+        return [snapshot_id for snapshot_id in candidates if snapshot_id not in needed]
+
+    def remove_snapshots(self, snapshot_ids):
+        """Entfernt Snapshots und nicht mehr erreichbare Dateiversionen aus dem Katalog."""
+        with self.conn:
+            self.conn.executemany('DELETE FROM snapshots WHERE id = ?', ((snapshot_id,) for snapshot_id in snapshot_ids))
+            self.conn.execute('''
+                DELETE FROM file_versions WHERE NOT EXISTS (
+                    SELECT 1 FROM snapshots s
+                    WHERE s.source = file_versions.source
+                      AND s.id BETWEEN file_versions.first_seen AND file_versions.last_seen
+                      AND file_versions.partial = 1 - s.complete)
+            ''')
+
+    def close(self):
+        self.conn.close()
+
+def open_catalog(backup_root):
+    """Öffnet den Katalog im Backup-Verzeichnis."""
+    os.makedirs(backup_root, exist_ok=True)
+    return BackupCatalog(os.path.join(backup_root, CATALOG_FILE))
+
+def _restore_versions(catalog, versions, target_for):
+    """Stellt Versionen wieder her; jedes Archiv bzw. Manifest wird nur einmal geöffnet."""
+    by_holder = defaultdict(list)
+    for version in versions:
+        by_holder[version.holder_id].append(version)
+    restored = 0
+    for holder_id, holder_versions in by_holder.items():
+        snapshot = catalog.snapshot(holder_id) if holder_id is not None else None
+        if snapshot is None:
+            for version in holder_versions:
+                logging.warning(f"Keine gesicherte Kopie von {version.path} im Katalog vorhanden.")
+            continue
+        location = os.path.join(catalog.root, snapshot.location)
+        if snapshot.kind == 'full':
+            with zipfile.ZipFile(location) as zipf:
+                for version in holder_versions:
+                    target_path = target_for(version.path)
+                    os.makedirs(os.path.dirname(target_path) or '.', exist_ok=True)
+                    with zipf.open(version.path) as src, open(target_path, 'wb') as dst:
+                        shutil.copyfileobj(src, dst, 1024 * 1024)
+                    os.utime(target_path, ns=(version.mtime_ns, version.mtime_ns))
+        elif snapshot.kind == 'repository':
+            # Erst hier laden: backup_repository zieht NumPy nach sich
+            from backup_repository import load_snapshot, restore_file
+
+            manifest = load_snapshot(location, snapshot.ref)['files']
+            for version in holder_versions:
+                restore_file(location, manifest[version.path], target_for(version.path))
+        else:
+            for version in holder_versions:
+                target_path = target_for(version.path)
+                os.makedirs(os.path.dirname(target_path) or '.', exist_ok=True)
+                shutil.copyfile(os.path.join(location, *version.path.split('/')), target_path)
+                os.utime(target_path, ns=(version.mtime_ns, version.mtime_ns))
+        restored += len(holder_versions)
+    return restored
+
+def restore_tree(backup_root, source_folder, target_folder, at=None):
+    """
+    Stellt den Ordner source_folder so wieder her, wie er zum Zeitpunkt at gesichert war.
+
+    Args:
+        at: datetime, Unix-Zeit oder None (letzter Stand).
+
+    Returns:
+        int: Anzahl wiederhergestellter Dateien.
+    """
+    catalog = open_catalog(backup_root)
+    try:
+        snapshot = catalog.snapshot_at(source_folder, at)
+        if snapshot is None:
+            logging.warning(f"Kein vollständiges Backup von {source_folder} zum gewünschten Zeitpunkt gefunden.")
+            return 0
+        versions = catalog.versions_at(source_folder, snapshot.id)
+        return _restore_versions(catalog, versions,
+                                 lambda path: os.path.join(target_folder, *path.split('/')))
+    finally:
+        catalog.close()
+
+def restore_path(backup_root, source_folder, rel_path, target_path, at=None):
+    """Stellt eine einzelne Datei im Stand zum Zeitpunkt at wieder her; False, wenn keine Version existiert."""
+    catalog = open_catalog(backup_root)
+    try:
+        version = catalog.version_at(source_folder, rel_path, at)
+        if version is None:
+            logging.warning(f"Keine Version von {rel_path} zum gewünschten Zeitpunkt gefunden.")
+            return False
+        return _restore_versions(catalog, [version], lambda path: target_path) == 1
+    finally:
+        catalog.close()
+
+def _snapshot_data_path(root, snapshot):
+    location = os.path.join(root, snapshot.location)
+    if snapshot.kind == 'repository':
+        # Nur das Manifest; Chunks können von anderen Snapshots referenziert werden
+        return os.path.join(location, 'snapshots', f"{snapshot.ref}.json")
+    return location
+
+def prune_backups(backup_root, source_folder, keep_last=None, max_age_days=None):
+    """
+    Wendet die Aufbewahrungsregeln an und löscht nicht mehr benötigte Backups.
+
+    Returns:
+        list: Pfade der gelöschten Backups.
+    """
+    catalog = open_catalog(backup_root)
+    try:
+        pruned = [catalog.snapshot(snapshot_id)
+                  for snapshot_id in catalog.plan_prune(source_folder, keep_last, max_age_days)]
+        removed = []
+        for snapshot in pruned:
+            path = _snapshot_data_path(catalog.root, snapshot)
+            if os.path.isdir(path):
+                shutil.rmtree(path)
+            elif os.path.exists(path):
+                os.remove(path)
+            removed.append(path)
+        catalog.remove_snapshots([snapshot.id for snapshot in pruned])
+        repositories = {os.path.join(catalog.root, snapshot.location)
+                        for snapshot in pruned if snapshot.kind == 'repository'}
+    finally:
+        catalog.close()
+    if repositories:
+        # Erst hier laden: backup_repository zieht NumPy nach sich
+        from backup_repository import collect_garbage
+
+        for repo_path in repositories:
+            collect_garbage(repo_path)
+    if removed:
+        logging.info(f"{len(removed)} alte Backups von {source_folder} entfernt.")
+    return removed
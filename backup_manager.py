@@ -5,10 +5,19 @@
 # - Backup des Savegame-Ordners oder Mods-Ordners erstellen
 # - Unterstützte Backup-Modi:
 #   - Full ZIP Backup: Gesamter Ordner wird als ZIP-Datei komprimiert (Standard)
+#     - Einträge werden parallel komprimiert und in Durchlaufreihenfolge über zip_writer.ZipWriter
+#       ins Archiv geschrieben (große Dateien gestreamt, nachdem alle vorherigen Einträge geschrieben sind)
+#     - Bereits komprimierte Dateien (Endung oder Stichproben-Test) werden nur gespeichert (ZIP_STORED)
 #   - Delta Backup: Nur neue oder geänderte Dateien werden gesichert (Hash-basiert)
 #   - Selective Backup: Nur vom Benutzer ausgewählte Dateien werden gesichert
+#   - Repository Backup: Inhaltsadressiertes Repository mit Chunk-Deduplizierung (siehe backup_repository.py)
+# - Jeder Lauf wird im Backup-Katalog erfasst (siehe backup_catalog.py): Point-in-Time-Wiederherstellung
+#   und Aufbewahrungsregeln (keep_last, max_age_days) ohne Durchsuchen der Archive
 # - Backups werden in ein eigenes Backup-Verzeichnis gespeichert (mit Zeitstempel)
-# - Speicherung der Datei-Hashes für Delta-Backups (z.B. `previous_hashes.json`)
+# - Speicherung der Datei-Hashes für Delta-Backups (SQLite-Manifest je Quellordner im Backup-Verzeichnis,
+#   `previous_hashes_<Ordnername>_<Pfad-Hash>.db`)
+#   - Schlüssel: relativer Pfad mit (Größe, mtime_ns, Inode); unveränderte Dateien werden nicht neu gehasht
+#   - Zu hashende Dateien werden parallel mit großen Lesepuffern verarbeitet
 
 # Geplante Features:
 # - Komprimierung der kompletten Backups als ZIP-Dateien (ZIP_DEFLATED)
@@ -18,77 +27,255 @@
 # - Optionales Aufräumen alter Backups (z.B. älter als 30 Tage oder mehr als 10 Backups)
 
 # Strukturvorschlag:
-# - Funktion: full_zip_backup(source_folder, backup_root)
-# - Funktion: delta_backup(source_folder, backup_root, hash_file='previous_hashes.json')
+# - Funktion: full_zip_backup(source_folder, backup_root, compresslevel=ZIP_COMPRESSION_LEVEL, workers=ZIP_WORKERS)
+# - Funktion: delta_backup(source_folder, backup_root, hash_file=None)
 # - Funktion: selective_backup(file_list, source_folder, backup_root)
-# - Funktion: backup_manager(mode, source_folder, backup_root, file_list=None)
+# - Funktion: repository_backup(source_folder, backup_root)
+# - Funktion: backup_manager(mode, source_folder, backup_root, file_list=None, compresslevel=ZIP_COMPRESSION_LEVEL,
+#             retention=None)
 
 import os
+import re
+import zlib
+import logging
 import zipfile
 import hashlib
 import shutil
+import sqlite3
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-import json
+
+from fs_walker import walk_files
+from backup_catalog import open_catalog, prune_backups
+from instrumentation import span
+from zip_writer import ZipWriter
+
+# Lesepuffer und parallele Worker für das Hashing (hashlib gibt den GIL bei großen Blöcken frei)
+HASH_BUFFER_SIZE = 1024 * 1024
+HASH_WORKERS = 4
+
+# Full-ZIP-Backup: zlib gibt den GIL beim Komprimieren frei, daher genügen Threads
+ZIP_COMPRESSION_LEVEL = 6
+ZIP_WORKERS = os.cpu_count() or 4
+# Dateien oberhalb dieser Größe werden nicht im Speicher komprimiert, sondern blockweise gestreamt
+ZIP_MAX_PARALLEL_SIZE = 16 * 1024 * 1024
+# Obergrenze der Dateigrößen, die gleichzeitig in Arbeit sind (je Eintrag Rohdaten und komprimierte Daten
+# im Speicher); begrenzt den Speicher unabhängig von der Anzahl der Kerne
+ZIP_MAX_INFLIGHT_BYTES = 256 * 1024 * 1024
+# Endungen, deren Inhalt bereits komprimiert ist (.ts4script ist ein ZIP-Archiv)
+STORED_EXTENSIONS = {'.ts4script', '.zip', '.7z', '.rar', '.png', '.jpg', '.jpeg', '.mp3', '.ogg'}
+# Stichproben-Test: spart zlib (Stufe 1) auf den Proben weniger als 10 %, wird nur gespeichert
+COMPRESSION_SAMPLE_COUNT = 4
+COMPRESSION_SAMPLE_SIZE = 16 * 1024
+COMPRESSION_MIN_SAVING = 0.10
 
 # Helper function to calculate SHA256 Hash of a file
-def calculate_hash(file_path):
+def calculate_hash(file_path, buffer_size=HASH_BUFFER_SIZE):
     sha256_hash = hashlib.sha256()
     with open(file_path, "rb") as f:
-        for byte_block in iter(lambda: f.read(4096), b""):
+        for byte_block in iter(lambda: f.read(buffer_size), b""):
             sha256_hash.update(byte_block)
     return sha256_hash.hexdigest()
 
-# Helper function to load or initialize previous file hashes
-def load_previous_hashes(hash_file):
-    if os.path.exists(hash_file):
-        with open(hash_file, 'r') as f:
-            return json.load(f)
-    return {}
+# Helper function to hash a file that may vanish or be locked during the backup (None = skipped)
+def _hash_or_skip(file_path):
+    try:
+        return calculate_hash(file_path)
+    except OSError as e:
+        logging.warning(f"{file_path} konnte nicht gelesen werden und wird übersprungen: {e}")
+        return None
+
+# Helper function to locate the hash manifest of a source folder inside the backup folder
+def hash_manifest_path(source_folder, backup_root):
+    source = os.path.normcase(os.path.abspath(source_folder))
+    folder_name = re.sub(r'[^\w.-]', '_', os.path.basename(source.rstrip(os.sep))) or 'root'
+    source_hash = hashlib.sha256(source.encode('utf-8')).hexdigest()[:12]
+    return os.path.join(backup_root, f"previous_hashes_{folder_name}_{source_hash}.db")
+
+# Helper function to open the hash manifest (path → size, mtime_ns, inode, SHA256)
+def open_hash_manifest(hash_file):
+    conn = sqlite3.connect(hash_file)
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS file_hashes (
+            path TEXT PRIMARY KEY,
+            size INTEGER NOT NULL,
+            mtime_ns INTEGER NOT NULL,
+            inode INTEGER NOT NULL,
+            sha256 BLOB NOT NULL
+        ) WITHOUT ROWID
+    ''')
+    return conn
+
+def load_previous_hashes(conn):
+    """Lädt das Manifest als {rel_path: (size, mtime_ns, inode, sha256_hex)}."""
+    return {path: (size, mtime_ns, inode, sha256.hex())
+            for path, size, mtime_ns, inode, sha256
+            in conn.execute('SELECT path, size, mtime_ns, inode, sha256 FROM file_hashes')}
+
+def save_current_hashes(conn, changed, removed):
+    """Schreibt nur geänderte Einträge und entfernt gelöschte Dateien aus dem Manifest."""
+    with conn:
+        conn.executemany(
+            'INSERT OR REPLACE INTO file_hashes (path, size, mtime_ns, inode, sha256) VALUES (?, ?, ?, ?, ?)',
+            ((path, size, mtime_ns, inode, bytes.fromhex(sha256))
+             for path, (size, mtime_ns, inode, sha256) in changed.items()))
+        conn.executemany('DELETE FROM file_hashes WHERE path = ?', ((path,) for path in removed))
+
+# Helper function to register a backup run in the snapshot catalog
+def _record_snapshot(backup_root, source_folder, kind, location, files, stored, ref=None, complete=True):
+    catalog = open_catalog(backup_root)
+    try:
+        catalog.record_snapshot(source_folder, kind, location, files, stored, ref=ref, complete=complete)
+    finally:
+        catalog.close()
+
+# Helper function to pick evenly spaced sample ranges for the compressibility test
+def _sample_ranges(size):
+    if size <= COMPRESSION_SAMPLE_COUNT * COMPRESSION_SAMPLE_SIZE:
+        return [(0, size)]
+    step = (size - COMPRESSION_SAMPLE_SIZE) // (COMPRESSION_SAMPLE_COUNT - 1)
+    return [(i * step, COMPRESSION_SAMPLE_SIZE) for i in range(COMPRESSION_SAMPLE_COUNT)]
 
-def save_current_hashes(hashes, hash_file):
-    with open(hash_file, 'w') as f:
-        json.dump(hashes, f, indent=4)
+def is_worth_compressing(file_path, sample):
+    """Entscheidet anhand der Endung und einer Stichprobe, ob sich Deflate für die Datei lohnt."""
+    if os.path.splitext(file_path)[1].lower() in STORED_EXTENSIONS or not sample:
+        return False
+    return len(zlib.compress(sample, 1)) <= len(sample) * (1 - COMPRESSION_MIN_SAVING)
+
+# Helper function to compress one archive entry in a worker thread
+def _compress_zip_entry(file_path, arcname, compresslevel):
+    zinfo = zipfile.ZipInfo.from_file(file_path, arcname)
+    with open(file_path, 'rb') as f:
+        data = f.read()
+    zinfo.file_size = len(data)
+    zinfo.CRC = zlib.crc32(data)
+    zinfo.compress_type = zipfile.ZIP_STORED
+    if compresslevel and is_worth_compressing(
+            file_path, b''.join(data[start:start + length] for start, length in _sample_ranges(len(data)))):
+        # Roher Deflate-Stream (wbits=-15), wie ihn das ZIP-Format erwartet
+        compressor = zlib.compressobj(compresslevel, zlib.DEFLATED, -15)
+        compressed = compressor.compress(data) + compressor.flush()
+        if len(compressed) < len(data):
+            zinfo.compress_type = zipfile.ZIP_DEFLATED
+            data = compressed
+    zinfo.compress_size = len(data)
+    return zinfo, data
+
+# Helper function to stream a large file into the archive without loading it into memory
+def _write_large_zip_entry(writer, file_path, arcname, size, compresslevel):
+    samples = []
+    with open(file_path, 'rb') as f:
+        for start, length in _sample_ranges(size):
+            f.seek(start)
+            samples.append(f.read(length))
+    zinfo = zipfile.ZipInfo.from_file(file_path, arcname)
+    compress = compresslevel and is_worth_compressing(file_path, b''.join(samples))
+    zinfo.compress_type = zipfile.ZIP_DEFLATED if compress else zipfile.ZIP_STORED
+    writer.write_file(zinfo, file_path, compresslevel)
 
 # 1. Full ZIP Backup
-def full_zip_backup(source_folder, backup_root):
+def full_zip_backup(source_folder, backup_root, compresslevel=ZIP_COMPRESSION_LEVEL, workers=ZIP_WORKERS):
     os.makedirs(backup_root, exist_ok=True)
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     folder_name = os.path.basename(source_folder.rstrip(os.sep))
     zip_name = f"{folder_name}_backup_{timestamp}.zip"
     zip_path = os.path.join(backup_root, zip_name)
 
-    with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-        for root, dirs, files in os.walk(source_folder):
-            for file in files:
-                file_path = os.path.join(root, file)
-                arcname = os.path.relpath(file_path, start=source_folder)
-                zipf.write(file_path, arcname)
+    with ZipWriter(zip_path) as writer, ThreadPoolExecutor(max_workers=workers) as executor:
+        # Begrenztes Fenster: höchstens 2 × workers Einträge und ZIP_MAX_INFLIGHT_BYTES Dateigröße in Arbeit
+        pending = deque()
+        pending_bytes = 0
+        files = {}
+        for entry in walk_files(source_folder):
+            arcname = os.path.relpath(entry.path, start=source_folder)
+            stat = entry.stat()
+            size = stat.st_size
+            files[arcname.replace(os.sep, '/')] = (size, stat.st_mtime_ns)
+            if size > ZIP_MAX_PARALLEL_SIZE:
+                # Reihenfolge beibehalten: erst alle vorherigen Einträge schreiben
+                while pending:
+                    writer.write_compressed(*pending.popleft()[0].result())
+                pending_bytes = 0
+                _write_large_zip_entry(writer, entry.path, arcname, size, compresslevel)
+                continue
+            while pending and (len(pending) >= 2 * workers or pending_bytes + size > ZIP_MAX_INFLIGHT_BYTES):
+                future, written = pending.popleft()
+                writer.write_compressed(*future.result())
+                pending_bytes -= written
+            pending.append((executor.submit(_compress_zip_entry, entry.path, arcname, compresslevel), size))
+            pending_bytes += size
+        while pending:
+            writer.write_compressed(*pending.popleft()[0].result())
+    _record_snapshot(backup_root, source_folder, 'full', zip_path, files, files.keys())
     print(f"Full ZIP backup created at {zip_path}")
+    return zip_path
 
 # 2. Delta Backup (Only new/changed files)
-def delta_backup(source_folder, backup_root, hash_file='previous_hashes.json'):
+def delta_backup(source_folder, backup_root, hash_file=None):
     os.makedirs(backup_root, exist_ok=True)
+    # Manifest je Quellordner: Savegames und Mods dürfen sich keine Hashes teilen
+    hash_file = hash_file or hash_manifest_path(source_folder, backup_root)
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     delta_folder = os.path.join(backup_root, f"delta_backup_{timestamp}")
     os.makedirs(delta_folder, exist_ok=True)
 
-    previous_hashes = load_previous_hashes(hash_file)
-    current_hashes = {}
-
-    for root, dirs, files in os.walk(source_folder):
-        for file in files:
-            file_path = os.path.join(root, file)
-            rel_path = os.path.relpath(file_path, start=source_folder)
-            file_hash = calculate_hash(file_path)
-            current_hashes[rel_path] = file_hash
-
-            if rel_path not in previous_hashes or previous_hashes[rel_path] != file_hash:
-                # Neue oder geänderte Datei sichern
-                dest_path = os.path.join(delta_folder, rel_path)
-                os.makedirs(os.path.dirname(dest_path), exist_ok=True)
-                shutil.copy2(file_path, dest_path)
-    
-    save_current_hashes(current_hashes, hash_file)
+    # Dateien ohne gesicherte Kopie im Katalog immer kopieren, auch wenn das Manifest sie kennt
+    # (z.B. vorhandenes Manifest, aber neuer Katalog): sonst wären sie nicht wiederherstellbar
+    catalog = open_catalog(backup_root)
+    try:
+        held = catalog.held_paths(source_folder)
+    finally:
+        catalog.close()
+
+    conn = open_hash_manifest(hash_file)
+    try:
+        previous_hashes = load_previous_hashes(conn)
+        seen = set()
+        files = {}
+        to_hash = []
+
+        for entry in walk_files(source_folder):
+            rel_path = os.path.relpath(entry.path, start=source_folder)
+            stat = entry.stat()
+            # inode() statt st_ino: unter Windows liefert scandir-stat keine Inode
+            stat_key = (stat.st_size, stat.st_mtime_ns, entry.inode())
+            seen.add(rel_path)
+            posix_path = rel_path.replace(os.sep, '/')
+            files[posix_path] = stat_key[:2]
+            previous = previous_hashes.get(rel_path)
+            # Unveränderte Metadaten: Hash aus dem Manifest übernehmen, Datei nicht lesen
+            if previous is None or previous[:3] != stat_key or posix_path not in held:
+                to_hash.append((rel_path, entry.path, stat_key))
+
+        changed = {}
+        copied = set()
+        with ThreadPoolExecutor(max_workers=HASH_WORKERS) as executor:
+            file_hashes = executor.map(_hash_or_skip, [file_path for _, file_path, _ in to_hash])
+            for (rel_path, file_path, stat_key), file_hash in zip(to_hash, file_hashes):
+                posix_path = rel_path.replace(os.sep, '/')
+                previous = previous_hashes.get(rel_path)
+                if file_hash is not None and (previous is None or previous[3] != file_hash or posix_path not in held):
+                    # Neue oder geänderte Datei sichern
+                    dest_path = os.path.join(delta_folder, rel_path)
+                    os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+                    try:
+                        shutil.copy2(file_path, dest_path)
+                    except OSError as e:
+                        logging.warning(f"{file_path} konnte nicht kopiert werden und wird übersprungen: {e}")
+                        file_hash = None
+                    else:
+                        copied.add(posix_path)
+                if file_hash is None:
+                    # Nicht im Snapshot erfassen; der Manifest-Eintrag bleibt, damit der nächste Lauf es erneut versucht
+                    del files[posix_path]
+                    continue
+                changed[rel_path] = stat_key + (file_hash,)
+
+        save_current_hashes(conn, changed, previous_hashes.keys() - seen)
+    finally:
+        conn.close()
+    _record_snapshot(backup_root, source_folder, 'delta', delta_folder, files, copied)
     print(f"Delta backup created at {delta_folder}")
 
 # 3. Selective Backup (User specifies files to backup)
@@ -98,23 +285,48 @@ def selective_backup(file_list, source_folder, backup_root):
     selective_folder = os.path.join(backup_root, f"selective_backup_{timestamp}")
     os.makedirs(selective_folder, exist_ok=True)
 
+    files = {}
     for file_rel_path in file_list:
         source_path = os.path.join(source_folder, file_rel_path)
         if os.path.exists(source_path):
             dest_path = os.path.join(selective_folder, file_rel_path)
             os.makedirs(os.path.dirname(dest_path), exist_ok=True)
             shutil.copy2(source_path, dest_path)
+            stat = os.stat(source_path)
+            files[os.path.normpath(file_rel_path).replace(os.sep, '/')] = (stat.st_size, stat.st_mtime_ns)
         else:
             print(f"Warning: {source_path} does not exist and was skipped.")
+    _record_snapshot(backup_root, source_folder, 'selective', selective_folder, files, files.keys(), complete=False)
     print(f"Selective backup created at {selective_folder}")
 
+# 4. Repository Backup (deduplicated chunks, see backup_repository.py)
+def repository_backup(source_folder, backup_root):
+    # NumPy (Chunking) only when this mode is used; keeps the other modes fast to start
+    from backup_repository import backup_to_repository, load_snapshot
+
+    repo_path = os.path.join(backup_root, 'repository')
+    snapshot_id = backup_to_repository(source_folder, repo_path)
+    files = {rel_path: (entry['size'], entry['mtime_ns'])
+             for rel_path, entry in load_snapshot(repo_path, snapshot_id)['files'].items()}
+    _record_snapshot(backup_root, source_folder, 'repository', repo_path, files, files.keys(), ref=snapshot_id)
+    print(f"Repository snapshot {snapshot_id} created in {backup_root}")
+    return snapshot_id
+
 # Dispatcher
-def backup_manager(mode, source_folder, backup_root, file_list=None):
-    if mode == 'full':
-        full_zip_backup(source_folder, backup_root)
-    elif mode == 'delta':
-        delta_backup(source_folder, backup_root)
-    elif mode == 'selective' and file_list is not None:
-        selective_backup(file_list, source_folder, backup_root)
-    else:
-        raise ValueError("Invalid mode or missing file list for selective backup.")
+def backup_manager(mode, source_folder, backup_root, file_list=None, compresslevel=ZIP_COMPRESSION_LEVEL,
+                   retention=None):
+    with span('backup', mode=mode):
+        if mode == 'full':
+            full_zip_backup(source_folder, backup_root, compresslevel)
+        elif mode == 'delta':
+            delta_backup(source_folder, backup_root)
+        elif mode == 'selective' and file_list is not None:
+            selective_backup(file_list, source_folder, backup_root)
+        elif mode == 'repository':
+            repository_backup(source_folder, backup_root)
+        else:
+            raise ValueError("Invalid mode or missing file list for selective backup.")
+    # Aufbewahrungsregeln, z.B. {"keep_last": 10, "max_age_days": 30}
+    if retention:
+        with span('backup.prune'):
+            prune_backups(backup_root, source_folder, **retention)
@@ -0,0 +1,252 @@
+# Modul: backup_repository.py
+# Funktion: Inhaltsadressiertes, dedupliziertes Backup-Repository mit Chunk-Deduplizierung
+
+# Aufgaben:
+# - Dateien in inhaltsdefinierte Chunks zerlegen (Gear-Rolling-Hash, vektorisiert mit NumPy)
+# - Jeden eindeutigen Chunk genau einmal komprimiert speichern (objects/<sha256[:2]>/<sha256>)
+# - Jeden Backup-Lauf als Snapshot-Manifest speichern (snapshots/<snapshot_id>.json)
+# - Unveränderte Dateien (Größe + mtime) aus dem vorherigen Snapshot desselben Quellordners übernehmen,
+#   ohne sie zu lesen
+# - Wiederherstellung eines ganzen Snapshots oder einzelner Dateien
+# - Garbage Collection: Chunks, die kein Snapshot mehr referenziert, nach dem Löschen von Snapshots entfernen
+
+# Strukturvorschlag:
+# - Funktion: iter_chunks(f) → Chunks einer geöffneten Datei
+# - Funktion: backup_to_repository(source_folder, repo_path) → snapshot_id
+# - Funktion: list_snapshots(repo_path) / load_snapshot(repo_path, snapshot_id)
+# - Funktion: latest_snapshot(repo_path, source_folder) → letztes Manifest dieses Quellordners
+# - Funktion: restore_snapshot(repo_path, snapshot_id, target_folder, paths=None)
+# - Funktion: collect_garbage(repo_path) → entfernt nicht referenzierte Chunks
+
+import os
+import json
+import uuid
+import zlib
+import hashlib
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import numpy as np
+
+from fs_walker import walk_files
+
+# Chunk-Grenzen: Durchschnitt 2^18 = 256 KiB, mindestens 64 KiB, höchstens 1 MiB
+CHUNK_AVG_BITS = 18
+CHUNK_MIN_SIZE = 64 * 1024
+CHUNK_MAX_SIZE = 1024 * 1024
+
+# Blockgröße beim Lesen; begrenzt den Speicher der vektorisierten Hash-Berechnung
+READ_BLOCK_SIZE = 4 * 1024 * 1024
+
+# Fenster des Gear-Hashes (32 Bit → die letzten 32 Bytes bestimmen den Hash)
+GEAR_WINDOW = 32
+
+# Feste Gear-Tabelle: darf nicht geändert werden, sonst stimmen Chunk-Grenzen älterer Backups nicht mehr
+GEAR = np.random.default_rng(0x53494D5641554C54).integers(0, 2**32, size=256, dtype=np.uint32)
+
+COMPRESSION_LEVEL = 6
+BACKUP_WORKERS = 4
+
+# Jüngere Chunks überlebt die Garbage Collection immer: ein gleichzeitig laufendes Backup
+# schreibt seine Chunks vor dem Manifest
+GC_GRACE_SECONDS = 3600
+
+def _boundary_candidates(window_prefix, block):
+    """
+    Berechnet die Gear-Hashes für alle Positionen eines Blocks und liefert mögliche Schnittstellen.
+
+    h_i = Σ_{j<32} GEAR[b_{i-j}] << j (mod 2^32); eine Grenze liegt hinter
+    Byte i, wenn die oberen CHUNK_AVG_BITS Bits von h_i null sind.
+    """
+    data = np.frombuffer(window_prefix + block, dtype=np.uint8)
+    gear = GEAR[data]
+    offset = len(window_prefix)
+    hashes = np.zeros(len(block), dtype=np.uint32)
+    for j in range(GEAR_WINDOW):
+        hashes += gear[offset - j:offset - j + len(block)] << np.uint32(j)
+    return np.flatnonzero((hashes >> np.uint32(32 - CHUNK_AVG_BITS)) == 0) + 1
+
+def iter_chunks(f):
+    """Liefert die inhaltsdefinierten Chunks einer im Binärmodus geöffneten Datei."""
+    pending = b''
+    window_prefix = b'\0' * (GEAR_WINDOW - 1)
+    while True:
+        block = f.read(READ_BLOCK_SIZE)
+        if not block:
+            break
+        candidates = _boundary_candidates(window_prefix, block) + len(pending)
+        window_prefix = (window_prefix + block)[-(GEAR_WINDOW - 1):]
+        pending += block
+        last_cut = 0
+        for cut in candidates.tolist():
+            if cut - last_cut < CHUNK_MIN_SIZE:
+                continue
+            while cut - last_cut > CHUNK_MAX_SIZE:
+                yield pending[last_cut:last_cut + CHUNK_MAX_SIZE]
+                last_cut += CHUNK_MAX_SIZE
+            yield pending[last_cut:cut]
+            last_cut = cut
+        while len(pending) - last_cut > CHUNK_MAX_SIZE:
+            yield pending[last_cut:last_cut + CHUNK_MAX_SIZE]
+            last_cut += CHUNK_MAX_SIZE
+        pending = pending[last_cut:]
+    if pending:
+        yield pending
+
+def _object_path(repo_path, chunk_id):
+    return os.path.join(repo_path, 'objects', chunk_id[:2], chunk_id)
+
+def _store_chunk(repo_path, chunk):
+    """Speichert einen Chunk, falls er noch nicht im Repository liegt; gibt seine ID zurück."""
+    chunk_id = hashlib.sha256(chunk).hexdigest()
+    path = _object_path(repo_path, chunk_id)
+    try:
+        # Wiederverwendeten Chunk auffrischen, damit ihn die Garbage Collection nicht vor dem Manifest löscht
+        os.utime(path)
+    except FileNotFoundError:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Erst temporär schreiben, dann atomar umbenennen (parallele Worker, Abbrüche)
+        temp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(temp_path, 'wb') as f:
+            f.write(zlib.compress(chunk, COMPRESSION_LEVEL))
+        os.replace(temp_path, path)
+    return chunk_id
+
+def _store_file(repo_path, file_path):
+    with open(file_path, 'rb') as f:
+        return [_store_chunk(repo_path, chunk) for chunk in iter_chunks(f)]
+
+def list_snapshots(repo_path):
+    """Listet alle Snapshot-IDs des Repositorys (älteste zuerst)."""
+    snapshot_dir = os.path.join(repo_path, 'snapshots')
+    if not os.path.isdir(snapshot_dir):
+        return []
+    return sorted(name[:-5] for name in os.listdir(snapshot_dir) if name.endswith('.json'))
+
+def load_snapshot(repo_path, snapshot_id):
+    """Lädt das Manifest eines Snapshots."""
+    with open(os.path.join(repo_path, 'snapshots', f"{snapshot_id}.json"), 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def _same_source(path, other):
+    return os.path.normcase(os.path.abspath(path)) == os.path.normcase(os.path.abspath(other))
+
+def latest_snapshot(repo_path, source_folder):
+    """Lädt das Manifest des letzten Snapshots von source_folder oder gibt None zurück."""
+    for snapshot_id in reversed(list_snapshots(repo_path)):
+        manifest = load_snapshot(repo_path, snapshot_id)
+        if _same_source(manifest.get('source', ''), source_folder):
+            return manifest
+    return None
+
+def backup_to_repository(source_folder, repo_path, workers=BACKUP_WORKERS):
+    """
+    Sichert einen Ordner als neuen Snapshot im deduplizierten Repository.
+
+    Dateien mit gleicher Größe und mtime wie im letzten Snapshot desselben
+    Quellordners werden nicht gelesen; geänderte Dateien werden gechunkt,
+    und nur neue Chunks belegen zusätzlichen Speicher.
+
+    Returns:
+        str: ID des neuen Snapshots.
+    """
+    os.makedirs(os.path.join(repo_path, 'snapshots'), exist_ok=True)
+    # Savegames und Mods teilen sich das Repository; nur Snapshots derselben Quelle sind vergleichbar
+    previous = latest_snapshot(repo_path, source_folder)
+    previous_files = previous['files'] if previous else {}
+
+    files = {}
+    changed = []
+    for entry in walk_files(source_folder):
+        rel_path = os.path.relpath(entry.path, start=source_folder).replace(os.sep, '/')
+        stat = entry.stat()
+        previous = previous_files.get(rel_path)
+        if previous and previous['size'] == stat.st_size and previous['mtime_ns'] == stat.st_mtime_ns:
+            files[rel_path] = previous
+        else:
+            files[rel_path] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "chunks": None}
+            changed.append((rel_path, entry.path))
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        chunk_lists = executor.map(lambda item: _store_file(repo_path, item[1]), changed)
+        for (rel_path, _), chunks in zip(changed, chunk_lists):
+            files[rel_path]["chunks"] = chunks
+
+    snapshot_id = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+    manifest = {
+        "id": snapshot_id,
+        "source": os.path.abspath(source_folder),
+        "created": datetime.now().isoformat(timespec='seconds'),
+        "files": files,
+    }
+    temp_path = os.path.join(repo_path, 'snapshots', f"{snapshot_id}.json.tmp")
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, separators=(',', ':'))
+    os.replace(temp_path, os.path.join(repo_path, 'snapshots', f"{snapshot_id}.json"))
+    logging.info(f"Snapshot {snapshot_id}: {len(files)} Dateien, {len(changed)} neu gelesen.")
+    return snapshot_id
+
+def restore_file(repo_path, file_entry, target_path):
+    """Stellt eine einzelne Datei aus ihren Chunks wieder her."""
+    os.makedirs(os.path.dirname(target_path) or '.', exist_ok=True)
+    with open(target_path, 'wb') as out:
+        for chunk_id in file_entry['chunks']:
+            with open(_object_path(repo_path, chunk_id), 'rb') as f:
+                out.write(zlib.decompress(f.read()))
+    os.utime(target_path, ns=(file_entry['mtime_ns'], file_entry['mtime_ns']))
+
+def restore_snapshot(repo_path, snapshot_id, target_folder, paths=None):
+    """
+    Stellt einen Snapshot (oder nur die angegebenen relativen Pfade) in target_folder wieder her.
+
+    Returns:
+        int: Anzahl wiederhergestellter Dateien.
+    """
+    files = load_snapshot(repo_path, snapshot_id)['files']
+    selected = files.keys() if paths is None else [path.replace(os.sep, '/') for path in paths]
+    restored = 0
+    for rel_path in selected:
+        file_entry = files.get(rel_path)
+        if file_entry is None:
+            logging.warning(f"{rel_path} ist nicht in Snapshot {snapshot_id} enthalten.")
+            continue
+        restore_file(repo_path, file_entry, os.path.join(target_folder, *rel_path.split('/')))
+        restored += 1
+    return restored
+
+def collect_garbage(repo_path, grace_seconds=None):
+    """
+    Entfernt Chunks, die von keinem Snapshot-Manifest mehr referenziert werden (Mark-and-Sweep).
+
+    Chunks und abgebrochene temporäre Dateien, die jünger als grace_seconds sind,
+    bleiben erhalten.
+
+    Returns:
+        tuple: (Anzahl entfernter Dateien, freigegebene Bytes).
+    """
+    referenced = set()
+    for snapshot_id in list_snapshots(repo_path):
+        for file_entry in load_snapshot(repo_path, snapshot_id)['files'].values():
+            referenced.update(file_entry['chunks'] or ())
+
+    cutoff = time.time() - (GC_GRACE_SECONDS if grace_seconds is None else grace_seconds)
+    removed = 0
+    freed = 0
+    for entry in walk_files(os.path.join(repo_path, 'objects')):
+        if entry.name in referenced:
+            continue
+        stat = entry.stat()
+        if stat.st_mtime > cutoff:
+            continue
+        try:
+            os.remove(entry.path)
+        except FileNotFoundError:
+            continue
+        removed += 1
+        freed += stat.st_size
+    if removed:
+        logging.info(f"Repository {repo_path}: {removed} nicht mehr referenzierte Chunks entfernt "
+                     f"({freed / 1024 / 1024:.1f} MiB).")
+    return removed, freed
@@ -0,0 +1,404 @@
+# Modul: benchmarks.py
+# Funktion: Reproduzierbare Benchmark-Suite der performance-kritischen Stufen
+
+# Aufgaben:
+# - Synthetische Testdaten (synthetic_data, offline und reproduzierbar über Seed) je Lauf einmal anlegen:
+#   DBPF-Savegames und -Packages beliebiger Größe, Mods-Ordner mit Dateianzahl und Tiefe, Suchergebnisse
+# - Jede Stufe (Extraktion, Savegame-Analyse, Mods-Scan, lokaler Katalog, Bericht, Backup-Modi, CLI-Start)
+#   messen:
+#   Laufzeit (Bestwert aus mehreren Läufen) und Spitzen-Speicher (tracemalloc, getrennter Lauf;
+#   nicht für Stufen im Kindprozess); Delta-Backup getrennt kalt (ohne Manifest) und warm
+# - Ergebnisse mit einer gespeicherten JSON-Baseline vergleichen und Regressionen markieren
+# - Neue Implementierungen gegen die bisherigen Referenz-Schleifen messen (--legacy)
+
+# Strukturvorschlag:
+# - Funktion: bench_extract_cc_ids(size_mb, repeat)
+# - Funktion: bench_generate_report(rows) → Laufzeit und Spitzen-Speicher (tracemalloc)
+# - Funktion: bench_full_zip_backup(file_count, file_size) → Durchsatz in MB/s
+# - Funktion: run_benchmarks(stages, scale, repeat) → {Stufe: {"seconds", "peak_mb"}}
+# - Funktion: compare_with_baseline(results, baseline, tolerance)
+# - Aufruf: python benchmarks.py [--stages ...] [--scale 1.0] [--save-baseline] [--legacy]
+
+import os
+import csv
+import sys
+import json
+import shutil
+import sqlite3
+import struct
+import argparse
+import subprocess
+import platform
+import tempfile
+import time
+import zipfile
+import tracemalloc
+
+import numpy as np
+
+from savegame_analyzer import extract_cc_id_array, analyze_savegame_array, CC_ID_THRESHOLD
+from mod_folder_scanner import scan_mods_folder, update_mods_index
+from report_generator import write_report
+from backup_manager import full_zip_backup, delta_backup
+from backup_repository import backup_to_repository
+from config import DEFAULT_CONFIG
+from cc_catalog import LocalCatalog
+from synthetic_data import (make_fake_search_results, make_synthetic_mods_tree, make_synthetic_save,
+                            make_synthetic_savegame)
+
+BASELINE_FILE = 'benchmarks_baseline.json'
+MAIN_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'main.py')
+# Abweichung, ab der eine Stufe als Regression gilt (20 % langsamer bzw. mehr Speicher)
+REGRESSION_TOLERANCE = 0.20
+# Kleinere absolute Unterschiede gelten als Messrauschen
+MIN_SIGNIFICANT_SECONDS = 0.01
+MIN_SIGNIFICANT_MB = 1.0
+
+def _extract_cc_ids_loop(savegame_binary_data):
+    """Referenz: bisherige Schleife über 8-Byte-Wörter (vor der Vektorisierung)."""
+    cc_ids = set()
+    for i in range(0, len(savegame_binary_data) - 8, 8):
+        chunk = savegame_binary_data[i:i+8]
+        if len(chunk) == 8:
+            cc_id = struct.unpack('<Q', chunk)[0]
+            if cc_id > 0x8000000000000000:
+                cc_ids.add(hex(cc_id))
+    return list(cc_ids)
+
+def _best_of(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+def bench_extract_cc_ids(size_mb=16, repeat=3):
+    """Vergleicht die Referenz-Schleife mit der vektorisierten Extraktion."""
+    data = make_synthetic_savegame(size_mb * 1024 * 1024)
+    loop = _best_of(lambda: _extract_cc_ids_loop(data), 1)
+    aligned = _best_of(lambda: extract_cc_id_array(data), repeat)
+    unaligned = _best_of(lambda: extract_cc_id_array(data, unaligned=True), repeat)
+    print(f"extract_cc_ids ({size_mb} MB):")
+    print(f"  Schleife (alt):           {loop:8.3f} s")
+    print(f"  vektorisiert:             {aligned:8.3f} s  ({loop / aligned:6.1f}x)")
+    print(f"  vektorisiert, unaligned:  {unaligned:8.3f} s")
+
+def _generate_report_legacy(missing_cc, cc_alternatives, output_dir, db_path):
+    """Referenz: bisheriges generate_report mit vier Durchläufen und JSON-Dict im Speicher."""
+    with open(os.path.join(output_dir, 'legacy.html'), 'w', encoding='utf-8') as f:
+        f.write("<html><body><table><tbody>")
+        for cc_id in missing_cc:
+            alt_links = ' | '.join(f"<a href='{link}' target='_blank'>{link}</a>" for link in cc_alternatives.get(cc_id, []))
+            f.write(f"<tr><td>{cc_id}</td><td>{alt_links}</td></tr>")
+        f.write("</tbody></table></body></html>")
+    with open(os.path.join(output_dir, 'legacy.csv'), 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['ID', 'Alternative Sources'])
+        for cc_id in missing_cc:
+            writer.writerow([cc_id, ', '.join(cc_alternatives.get(cc_id, []))])
+    with open(os.path.join(output_dir, 'legacy.json'), 'w', encoding='utf-8') as f:
+        json.dump({cc_id: cc_alternatives.get(cc_id, []) for cc_id in missing_cc}, f, indent=4, ensure_ascii=False)
+    with open(os.path.join(output_dir, 'legacy.md'), 'w', encoding='utf-8') as f:
+        for cc_id in missing_cc:
+            f.write(f"| {cc_id} | {', '.join(cc_alternatives.get(cc_id, []))} |\n")
+    conn = sqlite3.connect(db_path)
+    conn.execute('CREATE TABLE IF NOT EXISTS missing_cc (id TEXT PRIMARY KEY, alternatives TEXT, timestamp TEXT)')
+    for cc_id in missing_cc:
+        conn.execute('INSERT OR REPLACE INTO missing_cc (id, alternatives, timestamp) VALUES (?, ?, ?)',
+                     (cc_id, ', '.join(cc_alternatives.get(cc_id, [])), 'legacy'))
+    conn.commit()
+    conn.close()
+
+def _measure(func):
+    """
+    Gibt (Sekunden, Spitzen-Speicher in MB) für func zurück.
+
+    Zeit und Speicher werden in getrennten Läufen gemessen, da tracemalloc
+    die Laufzeit stark verfälscht.
+    """
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak / 1024 / 1024
+
+def bench_generate_report(rows=200000):
+    """Vergleicht das bisherige generate_report mit dem Single-Pass-Streaming-Writer."""
+    with tempfile.TemporaryDirectory() as output_dir:
+        def legacy():
+            records = list(make_fake_search_results(rows))
+            missing_cc = [cc_id for cc_id, _ in records]
+            _generate_report_legacy(missing_cc, dict(records), output_dir, os.path.join(output_dir, 'legacy.db'))
+
+        def streaming():
+            write_report(make_fake_search_results(rows), output_dir, os.path.join(output_dir, 'stream.db'))
+
+        legacy_time, legacy_peak = _measure(legacy)
+        stream_time, stream_peak = _measure(streaming)
+    print(f"generate_report ({rows} Zeilen):")
+    print(f"  vier Durchläufe (alt):    {legacy_time:8.3f} s  Spitze {legacy_peak:8.1f} MB")
+    print(f"  Single-Pass-Stream:       {stream_time:8.3f} s  Spitze {stream_peak:8.1f} MB")
+
+def _full_zip_backup_legacy(source_folder, zip_path):
+    """Referenz: bisheriges Full-ZIP-Backup (ein Thread, alles ZIP_DEFLATED)."""
+    with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
+        for dirpath, _, filenames in os.walk(source_folder):
+            for filename in filenames:
+                file_path = os.path.join(dirpath, filename)
+                zipf.write(file_path, os.path.relpath(file_path, start=source_folder))
+
+def bench_full_zip_backup(file_count=400, file_size=512 * 1024):
+    """Vergleicht den Durchsatz des bisherigen Full-ZIP-Backups mit der parallelen Variante."""
+    with tempfile.TemporaryDirectory() as work_dir:
+        mods_folder = os.path.join(work_dir, 'Mods')
+        total = make_synthetic_mods_tree(mods_folder, file_count, file_size)
+        legacy_path = os.path.join(work_dir, 'legacy.zip')
+        legacy = _best_of(lambda: _full_zip_backup_legacy(mods_folder, legacy_path), 1)
+        parallel_paths = []
+        parallel = _best_of(lambda: parallel_paths.append(full_zip_backup(mods_folder, work_dir)), 1)
+        legacy_size = os.path.getsize(legacy_path)
+        parallel_size = os.path.getsize(parallel_paths[-1])
+    megabytes = total / 1024 / 1024
+    print(f"full_zip_backup ({file_count} Dateien, {megabytes:.0f} MB):")
+    print(f"  ZIP_DEFLATED, ein Thread (alt): {megabytes / legacy:8.1f} MB/s  Archiv {legacy_size / 1024 / 1024:8.1f} MB")
+    print(f"  parallel, store/deflate:        {megabytes / parallel:8.1f} MB/s  Archiv {parallel_size / 1024 / 1024:8.1f} MB")
+
+class _Workspace:
+    """Erzeugt die synthetischen Eingaben einmal je Lauf der Suite (Größe über scale)."""
+
+    def __init__(self, work_dir, scale):
+        self.work_dir = work_dir
+        self.scale = scale
+        self._cache = {}
+
+    def path(self, *parts):
+        return os.path.join(self.work_dir, *parts)
+
+    def get(self, name, build):
+        if name not in self._cache:
+            self._cache[name] = build()
+        return self._cache[name]
+
+    def raw_save(self):
+        return self.get('raw_save', lambda: make_synthetic_savegame(int(32 * 1024 * 1024 * self.scale)))
+
+    def dbpf_save(self):
+        def build():
+            path = self.path('Slot_00000001.save')
+            make_synthetic_save(path, int(32 * 1024 * 1024 * self.scale))
+            return path
+        return self.get('dbpf_save', build)
+
+    def mods_tree(self):
+        def build():
+            path = self.path('Mods')
+            make_synthetic_mods_tree(path, max(4, int(300 * self.scale)), 256 * 1024, depth=3)
+            return path
+        return self.get('mods_tree', build)
+
+    def fresh(self, name):
+        """Leerer Ausgabepfad; Reste des vorherigen Durchlaufs werden entfernt."""
+        path = self.path(name)
+        if os.path.isdir(path):
+            shutil.rmtree(path)
+        elif os.path.exists(path):
+            os.remove(path)
+        return path
+
+# Stufen der Suite: Name → Funktion(workspace), die den zu messenden Aufruf zurückgibt (ohne Vorbereitung)
+def _stage_extract_cc_ids(ws):
+    data = ws.raw_save()
+    return lambda: extract_cc_id_array(data)
+
+def _stage_analyze_savegame(ws):
+    path = ws.dbpf_save()
+    return lambda: analyze_savegame_array(path)
+
+def _stage_scan_mods_folder(ws):
+    mods = ws.mods_tree()
+    return lambda: scan_mods_folder(mods)
+
+def _stage_update_mods_index(ws):
+    mods = ws.mods_tree()
+    return lambda: update_mods_index(mods, ws.fresh('mods_index.db'))
+
+def _stage_catalog_resolve(ws):
+    # Hälfte der IDs stammt aus den Packages, die andere Hälfte ist unbekannt
+    db_path = ws.fresh('catalog.db')
+    update_mods_index(ws.mods_tree(), db_path)
+    catalog = LocalCatalog(db_path)
+    try:
+        catalog.refresh()
+        known = [hex(instance + (1 << 64)) for (instance,)
+                 in catalog.conn.execute('SELECT instance FROM catalog_resources LIMIT ?', (int(5000 * ws.scale),))]
+    finally:
+        catalog.close()
+    rng = np.random.default_rng(1)
+    unknown = rng.integers(CC_ID_THRESHOLD + 1, 2**64 - 1, size=len(known), dtype=np.uint64).tolist()
+    cc_ids = known + [hex(cc_id) for cc_id in unknown]
+
+    def run():
+        catalog = LocalCatalog(db_path)
+        try:
+            catalog.resolve(cc_ids)
+            catalog.search('creator07 mod 00123')
+        finally:
+            catalog.close()
+    return run
+
+def _stage_generate_report(ws):
+    rows = int(100000 * ws.scale)
+    return lambda: write_report(make_fake_search_results(rows), ws.fresh('reports'), ws.fresh('reports.db'))
+
+def _stage_backup_full(ws):
+    mods = ws.mods_tree()
+    return lambda: full_zip_backup(mods, ws.fresh('backup_full'))
+
+def _stage_backup_delta_cold(ws):
+    # Ohne Manifest und Katalog: jede Datei wird gehasht und kopiert
+    mods = ws.mods_tree()
+    return lambda: delta_backup(mods, ws.fresh('backup_delta_cold'), ws.fresh('previous_hashes_cold.db'))
+
+def _stage_backup_delta_warm(ws):
+    # Zweiter Lauf gegen dasselbe Manifest: unveränderte Dateien werden weder gehasht noch kopiert
+    mods = ws.mods_tree()
+    backup_root = ws.fresh('backup_delta_warm')
+    hash_file = ws.fresh('previous_hashes_warm.db')
+    delta_backup(mods, backup_root, hash_file)
+    return lambda: delta_backup(mods, backup_root, hash_file)
+
+def _stage_backup_repository(ws):
+    mods = ws.mods_tree()
+    return lambda: backup_to_repository(mods, ws.fresh('repository'))
+
+def _stage_cli_startup(ws):
+    # Ganzer Prozess inkl. Interpreter-Start: "Savegames sichern" wie aus einer geplanten Aufgabe
+    work_dir = ws.path('cli')
+    os.makedirs(os.path.join(work_dir, 'saves'), exist_ok=True)
+    make_synthetic_save(os.path.join(work_dir, 'saves', 'Slot_00000001.save'), 64 * 1024, 100)
+    config_path = os.path.join(work_dir, 'config.json')
+    with open(config_path, 'w', encoding='utf-8') as f:
+        json.dump(dict(DEFAULT_CONFIG, savegames_folder='saves', backup_folder='backups'), f)
+    command = [sys.executable, MAIN_SCRIPT, '--config', config_path, '-q', 'backup']
+
+    def run():
+        ws.fresh(os.path.join('cli', 'backups'))
+        subprocess.run(command, cwd=work_dir, check=True, stdout=subprocess.DEVNULL)
+    return run
+
+BENCHMARK_STAGES = {
+    "extract_cc_ids": _stage_extract_cc_ids,
+    "analyze_savegame": _stage_analyze_savegame,
+    "scan_mods_folder": _stage_scan_mods_folder,
+    "update_mods_index": _stage_update_mods_index,
+    "catalog_resolve": _stage_catalog_resolve,
+    "generate_report": _stage_generate_report,
+    "backup_full": _stage_backup_full,
+    "backup_delta_cold": _stage_backup_delta_cold,
+    "backup_delta_warm": _stage_backup_delta_warm,
+    "backup_repository": _stage_backup_repository,
+    "cli_startup": _stage_cli_startup,
+}
+
+# Stufen, deren Arbeit in einem Kindprozess läuft: tracemalloc sähe nur den Elternprozess
+SUBPROCESS_STAGES = {"cli_startup"}
+
+def run_benchmarks(stages=None, scale=1.0, repeat=3):
+    """
+    Führt die ausgewählten Stufen aus.
+
+    Returns:
+        dict: {Stufe: {"seconds": Bestwert, "peak_mb": Spitzen-Speicher}}; ohne "peak_mb"
+        für Stufen in SUBPROCESS_STAGES.
+    """
+    results = {}
+    with tempfile.TemporaryDirectory() as work_dir:
+        ws = _Workspace(work_dir, scale)
+        for name in stages or BENCHMARK_STAGES:
+            func = BENCHMARK_STAGES[name](ws)
+            seconds = _best_of(func, repeat)
+            results[name] = {"seconds": round(seconds, 4)}
+            if name in SUBPROCESS_STAGES:
+                print(f"  {name:<20} {seconds:8.3f} s")
+                continue
+            tracemalloc.start()
+            func()
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            results[name]["peak_mb"] = round(peak / 1024 / 1024, 2)
+            print(f"  {name:<20} {seconds:8.3f} s  Spitze {results[name]['peak_mb']:8.1f} MB")
+    return results
+
+def compare_with_baseline(results, baseline, tolerance=REGRESSION_TOLERANCE):
+    """
+    Vergleicht Ergebnisse mit einer Baseline.
+
+    Returns:
+        list: Namen der Stufen, die langsamer oder speicherhungriger als erlaubt sind.
+    """
+    regressions = []
+    print(f"Vergleich mit Baseline (Toleranz {tolerance:.0%}):")
+    for name, result in results.items():
+        reference = baseline.get("stages", {}).get(name)
+        if reference is None:
+            print(f"  {name:<20} keine Baseline")
+            continue
+        time_ratio = result["seconds"] / max(reference["seconds"], 1e-9)
+        regressed = (time_ratio > 1 + tolerance
+                     and result["seconds"] - reference["seconds"] > MIN_SIGNIFICANT_SECONDS)
+        memory = ""
+        # Speicher nur vergleichen, wenn beide Seiten ihn gemessen haben
+        if "peak_mb" in result and "peak_mb" in reference:
+            memory_ratio = result["peak_mb"] / max(reference["peak_mb"], 1e-9)
+            regressed = regressed or (memory_ratio > 1 + tolerance
+                                      and result["peak_mb"] - reference["peak_mb"] > MIN_SIGNIFICANT_MB)
+            memory = f"  Speicher {memory_ratio:6.2f}x"
+        if regressed:
+            regressions.append(name)
+        print(f"  {name:<20} Zeit {time_ratio:6.2f}x{memory}{'  REGRESSION' if regressed else ''}")
+    return regressions
+
+def _environment(scale, repeat):
+    return {"python": platform.python_version(), "numpy": np.__version__, "platform": platform.platform(),
+            "cpu_count": os.cpu_count(), "scale": scale, "repeat": repeat}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="SimVault-Benchmarks (offline, synthetische Daten)")
+    parser.add_argument('--stages', nargs='+', choices=list(BENCHMARK_STAGES), help="nur diese Stufen messen")
+    parser.add_argument('--scale', type=float, default=1.0, help="Größe der synthetischen Daten (1.0 = Standard)")
+    parser.add_argument('--repeat', type=int, default=3, help="Läufe je Stufe (Bestwert zählt)")
+    parser.add_argument('--baseline', default=BASELINE_FILE, help="JSON-Baseline zum Vergleich")
+    parser.add_argument('--save-baseline', action='store_true', help="Ergebnisse als neue Baseline speichern")
+    parser.add_argument('--tolerance', type=float, default=REGRESSION_TOLERANCE)
+    parser.add_argument('--legacy', action='store_true', help="Vergleich mit den bisherigen Referenz-Implementierungen")
+    args = parser.parse_args(argv)
+
+    if args.legacy:
+        bench_extract_cc_ids()
+        bench_generate_report()
+        bench_full_zip_backup()
+        return 0
+
+    print(f"Benchmark-Suite (scale {args.scale}, Bestwert aus {args.repeat} Läufen):")
+    results = run_benchmarks(args.stages, args.scale, args.repeat)
+    environment = _environment(args.scale, args.repeat)
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump({"environment": environment, "stages": results}, f, indent=4)
+        print(f"Baseline gespeichert: {args.baseline}")
+        return 0
+    if not os.path.exists(args.baseline):
+        print(f"Keine Baseline unter {args.baseline} (mit --save-baseline anlegen).")
+        return 0
+    with open(args.baseline, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    if baseline.get("environment", {}).get("scale") != args.scale:
+        print(f"Warnung: Baseline wurde mit scale {baseline.get('environment', {}).get('scale')} erstellt.")
+    return 1 if compare_with_baseline(results, baseline, args.tolerance) else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
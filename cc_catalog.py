@@ -0,0 +1,386 @@
+# Modul: cc_catalog.py
+# Funktion: Lokaler, durchsuchbarer Katalog für fehlende CC – Auflösung ohne Netzwerkzugriff
+
+# Aufgaben:
+# - Katalog aus dem Mods-Index (mod_files/mod_resources) und früheren Suchergebnissen (search_tasks) aufbauen
+# - Dateien, die aus dem Mods-Ordner verschwunden sind, samt Ressourcen-Schlüsseln behalten:
+#   eine fehlende ID lässt sich so der Package-Datei zuordnen, aus der sie stammte
+# - Trigramm- und Präfix-Index über Dateinamen und Creator-Namen (aus dem Dateinamen abgeleitet)
+# - Präfix-Suche über Ressourcen-Schlüssel (Instance als Hex, z.B. "0x8000ab")
+# - Fehlende IDs zuerst lokal auflösen; nur der unaufgelöste Rest geht an cc_searcher
+#   - aufgelöst sind nur IDs aus installierten Dateien oder mit Suchtreffern innerhalb der TTL
+#   - archivierte Dateien und abgelaufene Suchtreffer sind nur Hinweise, die ID wird trotzdem gesucht
+
+# Strukturvorschlag:
+# - Klasse: LocalCatalog(db_path)
+#   - refresh() → gleicht den Katalog inkrementell mit dem Mods-Index ab
+#   - resolve(cc_ids, ttl) → {cc_id: Kandidaten} für lokal auffindbare IDs
+#   - search(text, limit) → nach Ähnlichkeit sortierte Kandidaten (Name, Creator oder Schlüssel-Präfix)
+# - Funktion: creator_from_name(file_name) → Creator-Präfix aus Dateinamen wie "Creator_Item.package"
+# - Funktion: candidates_to_alternatives(candidates) → {Seite: URL/Pfad} für Berichte
+# - Funktion: is_resolved(candidates) → True, wenn ein Kandidat die ID ohne Online-Suche auflöst
+# - Funktion: split_resolved(catalog, cc_ids, ttl) → (aufgelöste Alternativen, Hinweise, unaufgelöste IDs)
+# - Funktion: merge_hints(alternatives, hints) → Online-Ergebnisse um lokale Hinweise ergänzen
+
+import os
+import re
+import time
+import sqlite3
+import logging
+
+from dbpf_reader import to_hex, to_signed64
+from instrumentation import span
+from search_cache import DEFAULT_TTL
+
+# Obergrenze für Parameter je SQL-Abfrage (SQLite-Standard: 999)
+QUERY_BATCH_SIZE = 500
+
+# Vorauswahl für die Ähnlichkeitssuche: Kandidaten je gewünschtem Treffer und
+# höchstens so viele Index-Einträge (Trigramm → Datei) je Anfrage
+SEARCH_CANDIDATE_FACTOR = 10
+MAX_SEARCH_POSTINGS = 20000
+# Zuschlag, wenn Name oder Creator mit der Anfrage beginnen
+PREFIX_BONUS = 0.5
+
+LOCAL_SITE = "Lokal"
+
+_BRACKET_CREATOR = re.compile(r'\s*\[([^\]]+)\]')
+_SEPARATED_CREATOR = re.compile(r'\s*([^_\s\-]+?)\s*(?:_| - |-)')
+_NON_ALNUM = re.compile(r'[^0-9a-z]+')
+_HEX_KEY = re.compile(r'0x([0-9a-f]{1,16})')
+
+def _normalize(text):
+    return _NON_ALNUM.sub(' ', text.lower()).strip()
+
+def _trigrams(text):
+    """Trigramme je Wort, mit Leerzeichen aufgefüllt (auch kurze Wörter und Wortanfänge zählen)."""
+    grams = set()
+    for word in _normalize(text).split():
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+def _file_grams(name, creator):
+    grams = _trigrams(os.path.splitext(name)[0])
+    if creator:
+        grams |= _trigrams(creator)
+    return grams
+
+def _prefix_range(prefix):
+    # Alle Texte, die mit prefix beginnen, liegen in [prefix, prefix + U+10FFFF)
+    return prefix, prefix + '\U0010ffff'
+
+def _instance_ranges(digits):
+    """Wertebereiche (vorzeichenbehaftet) aller 16-stelligen Instances, die mit den Hex-Ziffern beginnen."""
+    shift = 4 * (16 - len(digits))
+    low = int(digits, 16) << shift
+    high = low | ((1 << shift) - 1)
+    # Der Bereich liegt ganz ober- oder ganz unterhalb von 0x8000…, das Vorzeichen wechselt darin nie
+    return [(to_signed64(low), to_signed64(high))]
+
+def creator_from_name(file_name):
+    """Creator-Präfix aus Namen wie "[Creator] Item", "Creator_Item" oder "Creator - Item" (sonst None)."""
+    stem = os.path.splitext(file_name)[0]
+    match = _BRACKET_CREATOR.match(stem) or _SEPARATED_CREATOR.match(stem)
+    return match.group(1).strip() if match else None
+
+class LocalCatalog:
+    """Katalog aller je gesehenen Mod-Dateien und ihrer CC-Ressourcen in der SimVault-Datenbank."""
+
+    def __init__(self, db_path='simvault_data.db'):
+        self.conn = sqlite3.connect(db_path)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.executescript('''
+            CREATE TABLE IF NOT EXISTS catalog_files (
+                id INTEGER PRIMARY KEY,
+                path TEXT UNIQUE NOT NULL,
+                name TEXT NOT NULL,
+                name_key TEXT NOT NULL,
+                creator TEXT,
+                creator_key TEXT,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                installed INTEGER NOT NULL,
+                last_seen REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS catalog_resources (
+                file_id INTEGER NOT NULL REFERENCES catalog_files (id),
+                type INTEGER NOT NULL,
+                grp INTEGER NOT NULL,
+                instance INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS catalog_grams (
+                gram TEXT NOT NULL,
+                file_id INTEGER NOT NULL REFERENCES catalog_files (id),
+                PRIMARY KEY (gram, file_id)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS catalog_gram_counts (
+                gram TEXT PRIMARY KEY,
+                files INTEGER NOT NULL
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS idx_catalog_resources_instance ON catalog_resources (instance);
+            CREATE INDEX IF NOT EXISTS idx_catalog_resources_file ON catalog_resources (file_id);
+            CREATE INDEX IF NOT EXISTS idx_catalog_files_name ON catalog_files (name_key);
+            CREATE INDEX IF NOT EXISTS idx_catalog_files_creator ON catalog_files (creator_key);
+        ''')
+
+    def _has_table(self, name):
+        return self.conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?",
+                                 (name,)).fetchone() is not None
+
+    def refresh(self):
+        """
+        Gleicht den Katalog mit dem Mods-Index ab (nur neue oder geänderte Dateien werden kopiert).
+
+        Nicht mehr installierte Dateien bleiben mit installed = 0 erhalten.
+
+        Returns:
+            dict: Statistik mit 'files', 'updated' und 'archived'.
+        """
+        if not self._has_table('mod_files'):
+            return {"files": 0, "updated": 0, "archived": 0}
+        with span('catalog.refresh') as refresh_span:
+            now = time.time()
+            # Abgleich über die eindeutigen Pfade direkt in SQLite, ohne beide Tabellen zu laden
+            changed = self.conn.execute('''
+                SELECT m.id, m.path, m.size, m.mtime_ns, c.id FROM mod_files m
+                LEFT JOIN catalog_files c ON c.path = m.path
+                WHERE c.id IS NULL OR c.installed = 0 OR c.size != m.size OR c.mtime_ns != m.mtime_ns
+            ''').fetchall()
+            archived = self.conn.execute('''
+                SELECT c.id FROM catalog_files c
+                WHERE c.installed = 1 AND NOT EXISTS (SELECT 1 FROM mod_files m WHERE m.path = c.path)
+            ''').fetchall()
+            with self.conn:
+                new_ids = self._add_files([(path, size, mtime_ns)
+                                           for _, path, size, mtime_ns, file_id in changed if file_id is None], now)
+                self.conn.executemany('''
+                    UPDATE catalog_files SET size = ?, mtime_ns = ?, installed = 1, last_seen = ? WHERE id = ?
+                ''', ((size, mtime_ns, now, file_id)
+                      for _, _, size, mtime_ns, file_id in changed if file_id is not None))
+                self.conn.execute('CREATE TEMP TABLE IF NOT EXISTS catalog_sync (mod_file_id INTEGER, file_id INTEGER)')
+                self.conn.execute('DELETE FROM catalog_sync')
+                self.conn.executemany('INSERT INTO catalog_sync (mod_file_id, file_id) VALUES (?, ?)',
+                                      ((mod_file_id, file_id if file_id is not None else new_ids[path])
+                                       for mod_file_id, path, _, _, file_id in changed))
+                self.conn.execute('DELETE FROM catalog_resources WHERE file_id IN (SELECT file_id FROM catalog_sync)')
+                # Nur der CC-Bereich (oberstes Bit gesetzt) kann in Savegames als fehlend auftauchen
+                self.conn.execute('''
+                    INSERT INTO catalog_resources (file_id, type, grp, instance)
+                    SELECT s.file_id, r.type, r.grp, r.instance
+                    FROM catalog_sync s JOIN mod_resources r ON r.file_id = s.mod_file_id
+                    WHERE r.instance < 0
+                ''')
+                # last_seen: Zeitpunkt, zu dem die Datei zuletzt installiert war
+                self.conn.executemany('UPDATE catalog_files SET installed = 0, last_seen = ? WHERE id = ?',
+                                      ((now, file_id) for (file_id,) in archived))
+            files = self.conn.execute('SELECT COUNT(*) FROM mod_files').fetchone()[0]
+            refresh_span.set(updated=len(changed), archived=len(archived))
+        if changed or archived:
+            logging.info(f"Lokaler Katalog: {files} installierte Dateien, {len(changed)} aktualisiert, "
+                         f"{len(archived)} nicht mehr installiert.")
+        return {"files": files, "updated": len(changed), "archived": len(archived)}
+
+    def _add_files(self, files, now):
+        """Legt neue Dateien samt Trigrammen an; gibt {Pfad: id} zurück."""
+        if not files:
+            return {}
+        first_id = self.conn.execute('SELECT COALESCE(MAX(id), 0) FROM catalog_files').fetchone()[0] + 1
+        rows = []
+        grams = []
+        gram_counts = {}
+        for file_id, (path, size, mtime_ns) in enumerate(files, first_id):
+            # IDs fortlaufend selbst vergeben, damit die Trigramme ohne Rückfrage referenzieren können
+            name = os.path.basename(path)
+            creator = creator_from_name(name)
+            rows.append((file_id, path, name, _normalize(name), creator, _normalize(creator) if creator else None,
+                         size, mtime_ns, now))
+            for gram in _file_grams(name, creator):
+                grams.append((gram, file_id))
+                gram_counts[gram] = gram_counts.get(gram, 0) + 1
+        self.conn.executemany('''
+            INSERT INTO catalog_files (id, path, name, name_key, creator, creator_key, size, mtime_ns, installed,
+                                       last_seen)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, 1, ?)
+        ''', rows)
+        self.conn.executemany('INSERT INTO catalog_grams (gram, file_id) VALUES (?, ?)', sorted(grams))
+        self.conn.executemany('''
+            INSERT INTO catalog_gram_counts (gram, files) VALUES (?, ?)
+            ON CONFLICT (gram) DO UPDATE SET files = files + excluded.files
+        ''', gram_counts.items())
+        return {row[1]: row[0] for row in rows}
+
+    def _file_candidate(self, row, score=None):
+        file_id, path, name, creator, installed = row
+        candidate = {"source": "mod", "name": name, "creator": creator, "path": path, "installed": bool(installed)}
+        if score is not None:
+            candidate["score"] = round(score, 3)
+        return candidate
+
+    def resolve(self, cc_ids, ttl=DEFAULT_TTL):
+        """
+        Sucht fehlende IDs im Katalog: Ressourcen bekannter Mod-Dateien und frühere Suchtreffer.
+
+        Args:
+            cc_ids (iterable): CC-IDs als Hex-Strings.
+            ttl (float): Suchtreffer, die älter sind, gelten als abgelaufen ("fresh": False).
+
+        Returns:
+            dict: {cc_id: [Kandidat, ...]} nur für lokal gefundene IDs; ob eine ID damit
+            aufgelöst ist, entscheidet is_resolved.
+        """
+        # Mehrfach genannte IDs oder andere Schreibweisen (0xAB / 0xab) nur einmal abfragen,
+        # das Ergebnis aber jeder ursprünglichen Schreibweise zuordnen
+        spellings = {}
+        for cc_id in cc_ids:
+            names = spellings.setdefault(int(cc_id, 16), [])
+            if cc_id not in names:
+                names.append(cc_id)
+        instances = list(spellings)
+        found = {}
+        has_search_results = self._has_table('search_tasks')
+        fresh_since = time.time() - ttl
+        with span('catalog.resolve', ids=len(instances)) as resolve_span:
+            for start in range(0, len(instances), QUERY_BATCH_SIZE):
+                batch = instances[start:start + QUERY_BATCH_SIZE]
+                placeholders = ', '.join('?' * len(batch))
+                rows = self.conn.execute(f'''
+                    SELECT r.instance, r.type, r.grp, f.id, f.path, f.name, f.creator, f.installed
+                    FROM catalog_resources r JOIN catalog_files f ON f.id = r.file_id
+                    WHERE r.instance IN ({placeholders})
+                    ORDER BY f.installed DESC, f.last_seen DESC
+                ''', [to_signed64(instance) for instance in batch])
+                for instance, resource_type, group, *file_row in rows:
+                    candidate = self._file_candidate(file_row)
+                    candidate.update(type=hex(resource_type), group=hex(group))
+                    found.setdefault(instance % (1 << 64), []).append(candidate)
+                if has_search_results:
+                    # Die Queue speichert die IDs als Text: normalisierte und ursprüngliche Schreibweisen abfragen
+                    names = sorted({hex(instance) for instance in batch}
+                                   | {name for instance in batch for name in spellings[instance]})
+                    placeholders = ', '.join('?' * len(names))
+                    rows = self.conn.execute(f'''
+                        SELECT cc_id, site, result, updated_at FROM search_tasks
+                        WHERE status = 'done' AND result IS NOT NULL AND cc_id IN ({placeholders})
+                    ''', names)
+                    for cc_id, site, url, updated_at in rows:
+                        found.setdefault(int(cc_id, 16), []).append({"source": "search", "site": site, "url": url,
+                                                                     "fresh": (updated_at or 0) >= fresh_since})
+            resolve_span.set(resolved=sum(map(is_resolved, found.values())), hints=len(found))
+        return {name: list(candidates) for instance, candidates in found.items() for name in spellings[instance]}
+
+    def search(self, text, limit=20):
+        """
+        Findet Kandidaten zu einem Suchtext.
+
+        "0x…" sucht nach Ressourcen-Schlüsseln mit diesem Instance-Präfix; sonst
+        werden Datei- und Creator-Namen nach Trigramm-Ähnlichkeit (Jaccard) sortiert,
+        mit Zuschlag für Präfix-Treffer.
+        """
+        key = _HEX_KEY.fullmatch(text.strip().lower())
+        if key:
+            return self._search_key(key.group(1), limit)
+        query = _normalize(text)
+        grams = _trigrams(text)
+        if not grams:
+            return []
+        with span('catalog.search'):
+            placeholders = ', '.join('?' * len(grams))
+            counts = dict(self.conn.execute(
+                f'SELECT gram, files FROM catalog_gram_counts WHERE gram IN ({placeholders})', list(grams)))
+            # Kandidaten über die seltensten Trigramme finden; häufige ("cre", " s ") passen auf fast alles
+            selected = []
+            postings = 0
+            for gram in sorted(counts, key=counts.get):
+                if selected and postings + counts[gram] > MAX_SEARCH_POSTINGS:
+                    break
+                selected.append(gram)
+                postings += counts[gram]
+            rows = []
+            if selected:
+                placeholders = ', '.join('?' * len(selected))
+                rows = self.conn.execute(f'''
+                    SELECT f.id, f.path, f.name, f.creator, f.installed FROM catalog_files f JOIN (
+                        SELECT file_id, COUNT(*) AS shared FROM catalog_grams WHERE gram IN ({placeholders})
+                        GROUP BY file_id ORDER BY shared DESC LIMIT ?
+                    ) g ON g.file_id = f.id
+                ''', [*selected, limit * SEARCH_CANDIDATE_FACTOR]).fetchall()
+            low, high = _prefix_range(query)
+            rows += self.conn.execute('''
+                SELECT id, path, name, creator, installed FROM catalog_files
+                WHERE (name_key >= ? AND name_key < ?) OR (creator_key >= ? AND creator_key < ?)
+                LIMIT ?
+            ''', (low, high, low, high, limit)).fetchall()
+            scored = {}
+            for file_row in rows:
+                file_id, _, name, creator, _ = file_row
+                if file_id in scored:
+                    continue
+                file_grams = _file_grams(name, creator)
+                score = len(grams & file_grams) / len(grams | file_grams)
+                if _normalize(name).startswith(query) or (creator and _normalize(creator).startswith(query)):
+                    score += PREFIX_BONUS
+                scored[file_id] = (score, file_row)
+        best = sorted(scored.values(), key=lambda item: -item[0])[:limit]
+        return [self._file_candidate(file_row, score) for score, file_row in best]
+
+    def _search_key(self, digits, limit):
+        candidates = []
+        for low, high in _instance_ranges(digits):
+            rows = self.conn.execute('''
+                SELECT r.instance, r.type, r.grp, f.id, f.path, f.name, f.creator, f.installed
+                FROM catalog_resources r JOIN catalog_files f ON f.id = r.file_id
+                WHERE r.instance BETWEEN ? AND ? ORDER BY r.instance LIMIT ?
+            ''', (low, high, limit - len(candidates)))
+            for instance, resource_type, group, *file_row in rows:
+                candidate = self._file_candidate(file_row)
+                candidate.update(instance=to_hex(instance), type=hex(resource_type), group=hex(group))
+                candidates.append(candidate)
+        return candidates
+
+    def close(self):
+        self.conn.close()
+
+def candidates_to_alternatives(candidates):
+    """Kandidaten als {Seite: URL} wie in den Suchergebnissen; Mod-Dateien unter "Lokal: <Name>"."""
+    alternatives = {}
+    for candidate in candidates:
+        if candidate["source"] == "search":
+            alternatives[candidate["site"]] = candidate["url"]
+        else:
+            alternatives[f"{LOCAL_SITE}: {candidate['name']}"] = candidate["path"]
+    return alternatives
+
+def is_resolved(candidates):
+    """
+    True, wenn die ID ohne Online-Suche als aufgelöst gilt: eine installierte Mod-Datei
+    enthält sie oder ein Suchtreffer ist jünger als die TTL.
+
+    Archivierte Dateien und abgelaufene Suchtreffer sind nur Hinweise; sonst würde ein
+    deinstallierter Mod eine tatsächlich fehlende ID für immer verdecken.
+    """
+    return any(candidate["installed"] if candidate["source"] == "mod" else candidate["fresh"]
+               for candidate in candidates)
+
+def split_resolved(catalog, cc_ids, ttl=DEFAULT_TTL):
+    """
+    Teilt IDs in lokal aufgelöste und online zu suchende.
+
+    Returns:
+        tuple: ({cc_id: Alternativen} der aufgelösten IDs, {cc_id: Alternativen} als Hinweise
+        für IDs, die trotzdem gesucht werden, Liste der zu suchenden IDs)
+    """
+    candidates = catalog.resolve(cc_ids, ttl)
+    resolved = {}
+    hints = {}
+    for cc_id, cc_candidates in candidates.items():
+        target = resolved if is_resolved(cc_candidates) else hints
+        target[cc_id] = candidates_to_alternatives(cc_candidates)
+    return resolved, hints, [cc_id for cc_id in cc_ids if cc_id not in resolved]
+
+def merge_hints(alternatives, hints):
+    """Ergänzt {cc_id: Alternativen} um lokale Hinweise; Online-Treffer derselben Seite haben Vorrang."""
+    merged = dict(alternatives)
+    for cc_id, hint in hints.items():
+        merged[cc_id] = {**hint, **merged.get(cc_id, {})}
+    return merged
@@ -0,0 +1,151 @@
+# Modul: cc_membership.py
+# Funktion: Kompakte Mengenprüfung "welche CC-IDs sind nicht installiert?"
+
+# Aufgaben:
+# - Installierte Ressourcen-Instanzen als sortiertes uint64-Array speichern
+# - Bloom-Filter für schnelle negative Antworten (sicher nicht installiert)
+# - Vektorisierte Suche (np.searchsorted) statt Hashing von Hex-Strings
+# - Persistenz als .npy-Dateien, beim Laden per Memory-Map eingeblendet
+# - Index-Generation neben den Arrays, damit veraltete Dateien (z.B. nach Absturz) neu gebaut werden
+
+# Strukturvorschlag:
+# - Klasse: InstalledKeySet(keys, bloom)
+#   - from_instances(instances) → baut Array und Bloom-Filter
+#   - missing(cc_ids) → uint64-Array der nicht installierten IDs
+#   - save(prefix, generation) / load(prefix) / saved_generation(prefix)
+# - Funktion: load_installed_key_set(db_path, prefix, rebuild=False)
+
+import os
+import math
+import logging
+
+import numpy as np
+
+from mod_folder_scanner import load_index_generation, load_installed_instances
+from savegame_analyzer import _sorted_unique
+
+# Bits pro Schlüssel im Bloom-Filter (10 Bits ≈ 1 % Falsch-Positive)
+BLOOM_BITS_PER_KEY = 10
+MAX_BLOOM_HASHES = 16
+
+# Konstanten für das Double-Hashing der 64-Bit-IDs
+_HASH_MULTIPLIER_1 = np.uint64(0x9E3779B97F4A7C15)
+_HASH_MULTIPLIER_2 = np.uint64(0xC2B2AE3D27D4EB4F)
+
+def _as_uint64_array(values):
+    if isinstance(values, np.ndarray):
+        return values.astype(np.uint64, copy=False)
+    return np.fromiter((int(value, 16) if isinstance(value, str) else value for value in values),
+                       dtype=np.uint64)
+
+def _bloom_hashes(ids):
+    """Zwei unabhängige 64-Bit-Hashes je ID für das Double-Hashing."""
+    h1 = ids * _HASH_MULTIPLIER_1
+    h2 = ((ids ^ (ids >> np.uint64(31))) * _HASH_MULTIPLIER_2) | np.uint64(1)
+    return h1, h2
+
+def _bloom_position(h1, h2, i, bit_count_log2):
+    """Bit-Position der i-ten Hashfunktion (obere Bits des Produkts)."""
+    return (h1 + np.uint64(i) * h2) >> np.uint64(64 - bit_count_log2)
+
+class InstalledKeySet:
+    """Sortiertes uint64-Array installierter Instanzen mit vorgeschaltetem Bloom-Filter."""
+
+    def __init__(self, keys, bloom):
+        self.keys = keys
+        self.bloom = bloom
+        bit_count = bloom.size * 8
+        self.bit_count_log2 = bit_count.bit_length() - 1
+        self.hash_count = min(MAX_BLOOM_HASHES, max(1, round(math.log(2) * bit_count / max(keys.size, 1))))
+
+    @classmethod
+    def from_instances(cls, instances, bits_per_key=BLOOM_BITS_PER_KEY):
+        """Baut das Set aus installierten Instance-IDs (beliebige Reihenfolge, Duplikate erlaubt)."""
+        keys = _sorted_unique(_as_uint64_array(instances))
+        # Bitanzahl auf Zweierpotenz runden (mindestens 64 Bit)
+        bit_count_log2 = max(6, math.ceil(math.log2(max(keys.size * bits_per_key, 1))))
+        # Bits direkt im gepackten Array setzen (1 Bit je Position statt 1 Byte und packbits)
+        key_set = cls(keys, np.zeros(1 << (bit_count_log2 - 3), dtype=np.uint8))
+        h1, h2 = _bloom_hashes(keys)
+        for i in range(key_set.hash_count):
+            positions = _bloom_position(h1, h2, i, key_set.bit_count_log2)
+            np.bitwise_or.at(key_set.bloom, positions >> np.uint64(3),
+                             np.left_shift(1, (positions & np.uint64(7)).astype(np.uint8), dtype=np.uint8))
+        return key_set
+
+    def contains(self, cc_ids):
+        """Gibt ein bool-Array zurück: True, wenn die jeweilige ID installiert ist."""
+        ids = _as_uint64_array(cc_ids)
+        found = np.zeros(ids.size, dtype=bool)
+        if not self.keys.size:
+            return found
+        # Jede Hashfunktion prüft nur noch die IDs, die bisher nicht ausgeschlossen wurden
+        maybe = np.arange(ids.size)
+        h1, h2 = _bloom_hashes(ids)
+        for i in range(self.hash_count):
+            positions = _bloom_position(h1, h2, i, self.bit_count_log2)
+            bits = self.bloom[positions >> np.uint64(3)] >> (positions & np.uint64(7)).astype(np.uint8)
+            hit = (bits & 1).astype(bool)
+            maybe, h1, h2 = maybe[hit], h1[hit], h2[hit]
+        # Nur Bloom-Treffer gegen das sortierte Array prüfen
+        candidates = ids[maybe]
+        index = np.searchsorted(self.keys, candidates)
+        index[index == self.keys.size] = 0
+        found[maybe] = self.keys[index] == candidates
+        return found
+
+    def missing(self, cc_ids):
+        """Gibt die nicht installierten IDs als sortiertes, eindeutiges uint64-Array zurück."""
+        ids = _sorted_unique(_as_uint64_array(cc_ids))
+        return ids[~self.contains(ids)]
+
+    def save(self, prefix, generation=0):
+        """
+        Speichert Array und Bloom-Filter als <prefix>.keys.npy / <prefix>.bloom.npy.
+
+        Die Index-Generation wird zuletzt geschrieben (<prefix>.generation.npy) und vorher
+        entfernt, so dass unvollständig gespeicherte Arrays nie als aktuell gelten.
+        """
+        generation_path = f"{prefix}.generation.npy"
+        if os.path.exists(generation_path):
+            os.remove(generation_path)
+        np.save(f"{prefix}.keys.npy", self.keys)
+        np.save(f"{prefix}.bloom.npy", self.bloom)
+        np.save(generation_path, np.array(generation, dtype=np.int64))
+
+    @staticmethod
+    def saved_generation(prefix):
+        """Index-Generation der gespeicherten Arrays oder None, wenn sie fehlen."""
+        paths = [f"{prefix}.keys.npy", f"{prefix}.bloom.npy", f"{prefix}.generation.npy"]
+        if not all(os.path.exists(path) for path in paths):
+            return None
+        return int(np.load(paths[2]))
+
+    @classmethod
+    def load(cls, prefix):
+        """Lädt ein gespeichertes Set als read-only Memory-Map."""
+        keys = np.load(f"{prefix}.keys.npy", mmap_mode='r')
+        bloom = np.load(f"{prefix}.bloom.npy", mmap_mode='r')
+        return cls(keys, bloom)
+
+def load_installed_key_set(db_path='simvault_data.db', prefix=None, rebuild=False):
+    """
+    Lädt das persistierte Set installierter Instanzen oder baut es aus dem Mods-Index neu.
+
+    Args:
+        db_path (str): SQLite-Datenbank mit dem Mods-Index.
+        prefix (str): Dateipräfix der .npy-Dateien, Standard: neben der Datenbank.
+        rebuild (bool): Neu aufbauen, z.B. wenn update_mods_index Änderungen gemeldet hat.
+            Auch ohne rebuild wird neu gebaut, wenn die gespeicherte Index-Generation nicht
+            mehr zur Datenbank passt.
+    """
+    if prefix is None:
+        prefix = os.path.splitext(db_path)[0] + '_installed'
+    # Generation vor den Instanzen lesen: ändert sich der Index dazwischen, wird beim nächsten Mal neu gebaut
+    generation = load_index_generation(db_path)
+    if not rebuild and InstalledKeySet.saved_generation(prefix) == generation:
+        return InstalledKeySet.load(prefix)
+    key_set = InstalledKeySet.from_instances(load_installed_instances(db_path))
+    key_set.save(prefix, generation)
+    logging.info(f"Installierte Ressourcen: {key_set.keys.size} Instanzen indexiert.")
+    return key_set
@@ -2,52 +2,61 @@
 # Funktion: Sucht nach fehlenden CC- oder Mod-Dateien online (Web Scraping von TSR, CurseForge, ModTheSims etc.)
 
 # Aufgaben:
-- Automatische Suche basierend auf Dateinamen oder CC-IDs
-- Nutzung von Web Scraping (Requests + BeautifulSoup)
-- Trefferlisten mit Links zur Suchanfrage sammeln
-- Unterstützung fester Quellen:
-  - The Sims Resource (TSR)
-  - CurseForge
-  - ModTheSims
-  - Tumblr
-  - Patreon
-  - LoversLab
-  - SexySims
-  - NewSea
+# - Automatische Suche basierend auf Dateinamen oder CC-IDs
+# - Nutzung von Web Scraping (Requests + BeautifulSoup)
+# - Trefferlisten mit Links zur Suchanfrage sammeln
+# - Unterstützung fester Quellen:
+#   - The Sims Resource (TSR)
+#   - CurseForge
+#   - ModTheSims
+#   - Tumblr
+#   - Patreon
+#   - LoversLab
+#   - SexySims
+#   - NewSea
 
 # Erweiterte Architektur:
-- Feste Quellen werden als Core-Module direkt eingebunden (kein Plugin erforderlich für Haupt-Sites)
-- Erweiterbare Plugin-Architektur für zusätzliche, benutzerdefinierte Quellen
-- Modularer Aufbau:
-  - cc_searcher/core_sites/ (alle großen Seiten wie TSR, CurseForge, MTS, etc.)
-  - cc_searcher/plugins/ (zusätzliche Quellen als Plugins)
-  - cc_searcher/login_manager.py (Login- und Session-Management inkl. 2FA Support)
-  - cc_searcher/captcha_solver.py (Manuelle oder automatische Captcha-Behandlung)
+# - Feste Quellen werden als Core-Module direkt eingebunden (kein Plugin erforderlich für Haupt-Sites)
+# - Erweiterbare Plugin-Architektur für zusätzliche, benutzerdefinierte Quellen
+# - Modularer Aufbau:
+#   - cc_searcher/core_sites/ (alle großen Seiten wie TSR, CurseForge, MTS, etc.)
+#   - cc_searcher/plugins/ (zusätzliche Quellen als Plugins)
+#   - cc_searcher/login_manager.py (Login- und Session-Management inkl. 2FA Support)
+#   - cc_searcher/captcha_solver.py (Manuelle oder automatische Captcha-Behandlung)
 
 # Zukünftige Erweiterungen (Advanced-Version geplant):
-- Vollständiges HTML-Parsing für echte Trefferlisten (Titel, Bild, Downloadlink, Beschreibung)
-- Headless Browser Support (Selenium/Playwright)
-- Unterstützung für Login und Authentifizierung:
-  - Sichtbares Login-Fenster
-  - Benutzer loggt sich selbst ein (mit 2FA-Support)
-  - Cookies werden automatisch gespeichert und **mit AES256 verschlüsselt**
-  - Entschlüsselung nur zur Laufzeit im RAM (keine Klartext-Cookies auf Disk)
-- Manuelle Captcha-Lösung: Fenster öffnet sich, Benutzer löst Captcha manuell
-- (Optional: Captcha-Automatisierung via Services, falls gewünscht)
-- Automatisiertes Download-Management
+# - Vollständiges HTML-Parsing für echte Trefferlisten (Titel, Bild, Downloadlink, Beschreibung)
+# - Headless Browser Support (Selenium/Playwright)
+# - Unterstützung für Login und Authentifizierung:
+#   - Sichtbares Login-Fenster
+#   - Benutzer loggt sich selbst ein (mit 2FA-Support)
+#   - Cookies werden automatisch gespeichert und **mit AES256 verschlüsselt**
+#   - Entschlüsselung nur zur Laufzeit im RAM (keine Klartext-Cookies auf Disk)
+# - Manuelle Captcha-Lösung: Fenster öffnet sich, Benutzer löst Captcha manuell
+# - (Optional: Captcha-Automatisierung via Services, falls gewünscht)
+# - Automatisiertes Download-Management
 
 # Strukturvorschlag:
-- Funktion: search_alternatives(missing_cc_list) → Gibt Trefferliste zurück
+# - Funktion: search_alternatives(missing_cc_list) → Gibt Trefferliste zurück
+# - Funktion: iter_search_results(missing_cc_iter) → Liefert (CC, Seite, Treffer) sobald fertig
+# - Funktion: run_search_queue(queue, missing_cc_list, incoming=None, stop=None) → fortsetzbare Suche über
+#   search_queue.SearchQueue; incoming liefert während der Suche weitere IDs nach, stop bricht sie ab
+# - Klasse: TokenBucket (Rate-Limit je Domain)
 
 # cc_searcher.py
 
 import requests
+from requests.adapters import HTTPAdapter
 from bs4 import BeautifulSoup
 import logging
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from queue import Empty
+from urllib.parse import urlsplit
 
-# Logging konfigurieren
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+from instrumentation import span
+from search_cache import normalize_query
 
 HEADERS = {
     'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/113.0.0.0 Safari/537.36'
@@ -65,31 +74,253 @@ SEARCH_ENGINES = {
     "NewSea": "http://www.newseasims.com/sims3-search.php?query={query}"
 }
 
-def search_site(site_name, search_url_template, query):
-    """Führt eine Suche auf einer spezifischen Seite durch."""
+# Parallele Anfragen insgesamt (verschiedene Seiten laufen gleichzeitig)
+SEARCH_WORKERS = 8
+
+# Rate-Limit je Domain: Anfragen pro Sekunde und maximaler Burst
+RATE_LIMIT_PER_SECOND = 1.0
+RATE_LIMIT_BURST = 1
+
+class TokenBucket:
+    """Thread-sicherer Token-Bucket: begrenzt die Anfragen an eine einzelne Domain."""
+
+    def __init__(self, rate=RATE_LIMIT_PER_SECOND, capacity=RATE_LIMIT_BURST):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Blockiert, bis ein Token verfügbar ist, und verbraucht es."""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+def create_session(pool_size=SEARCH_WORKERS):
+    """Erstellt eine Session mit Keep-Alive-Verbindungspool je Host."""
+    session = requests.Session()
+    session.headers.update(HEADERS)
+    adapter = HTTPAdapter(pool_connections=len(SEARCH_ENGINES), pool_maxsize=pool_size)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+def _domain(url_template):
+    return urlsplit(url_template).netloc
+
+def search_site(site_name, search_url_template, query, session=None, cache=None, bucket=None,
+                raise_errors=False):
+    """
+    Führt eine Suche auf einer spezifischen Seite durch.
+
+    Mit cache werden frische Einträge ohne Netzwerkzugriff beantwortet und
+    veraltete per Conditional Request revalidiert; bucket begrenzt nur echte
+    Anfragen. Mit raise_errors werden vorübergehende Fehler (Netzwerk, 429,
+    5xx) als Exception weitergegeben statt als "kein Treffer" gewertet.
+    Scheitert die Revalidierung eines veralteten Treffers, bleibt dieser erhalten
+    und wird weiter geliefert.
+    """
+    # URL und Cache-Schlüssel aus derselben Form der Anfrage, sonst teilen sich zwei URLs einen Eintrag
+    query = normalize_query(query)
+    entry = cache.get(site_name, query) if cache else None
+    if entry and entry.fresh:
+        return entry.result
+
+    headers = HEADERS
+    if entry and (entry.etag or entry.last_modified):
+        headers = dict(HEADERS)
+        if entry.etag:
+            headers['If-None-Match'] = entry.etag
+        if entry.last_modified:
+            headers['If-Modified-Since'] = entry.last_modified
+
+    if bucket:
+        bucket.acquire()
     try:
         search_url = search_url_template.format(query=query.replace(" ", "+"))
-        response = requests.get(search_url, headers=HEADERS, timeout=10)
+        with span('search.request', site=site_name) as request_span:
+            response = (session or requests).get(search_url, headers=headers, timeout=10)
+            request_span.add_bytes(len(response.content))
+            request_span.set(status=response.status_code)
+        if response.status_code == 304 and entry:
+            cache.refresh(site_name, query)
+            return entry.result
         if response.status_code == 200:
             soup = BeautifulSoup(response.text, 'html.parser')
             # Vereinfachte Suche: Nur die URL als Bestätigung
+            if cache:
+                cache.put(site_name, query, search_url, response.content,
+                          response.headers.get('ETag'), response.headers.get('Last-Modified'))
             return search_url
-        else:
-            logging.warning(f"Seite {site_name} konnte nicht durchsucht werden (Status {response.status_code}).")
-            return None
+        logging.warning(f"Seite {site_name} konnte nicht durchsucht werden (Status {response.status_code}).")
+        if response.status_code == 429 or response.status_code >= 500:
+            raise requests.HTTPError(f"Status {response.status_code}", response=response)
     except Exception as e:
+        if entry and entry.result:
+            logging.warning(f"Revalidierung auf {site_name} fehlgeschlagen, veraltetes Ergebnis bleibt: {e}")
+            return entry.result
+        if raise_errors:
+            raise
         logging.error(f"Fehler bei der Suche auf {site_name}: {e}")
-        return None
+    if cache:
+        cache.put(site_name, query, None)
+    return None
+
+def _search_task(cc, site_name, url_template, session, cache, bucket):
+    return cc, site_name, search_site(site_name, url_template, cc, session, cache, bucket)
+
+def iter_search_results(missing_cc_iter, search_engines=None, max_workers=SEARCH_WORKERS, session=None,
+                        rate=RATE_LIMIT_PER_SECOND, burst=RATE_LIMIT_BURST, cache=None):
+    """
+    Durchsucht alle Seiten parallel und liefert (cc, site_name, result) sobald fertig.
+
+    Anfragen an verschiedene Domains laufen gleichzeitig; jede Domain wird
+    über einen eigenen Token-Bucket begrenzt. missing_cc_iter darf ein
+    Generator sein – Suchen starten, während weitere IDs nachgeliefert werden.
+    Ein optionaler SearchCache beantwortet bekannte Anfragen ohne Netzwerk.
+    """
+    search_engines = search_engines or SEARCH_ENGINES
+    own_session = session is None
+    if own_session:
+        session = create_session(max_workers)
+    buckets = {}
+    for url_template in search_engines.values():
+        buckets.setdefault(_domain(url_template), TokenBucket(rate, burst))
+
+    def tasks():
+        for cc in missing_cc_iter:
+            logging.info(f"Suche nach: {cc}")
+            for site_name, url_template in search_engines.items():
+                yield cc, site_name, url_template
+
+    # Nur begrenzt viele Aufträge gleichzeitig einreichen: bricht der Aufrufer den Generator ab,
+    # wartet das Beenden nur auf die laufenden Anfragen, nicht auf alle (CC × Seite)-Kombinationen
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    task_iter = tasks()
+    try:
+        pending = set()
+        input_open = True
+        while True:
+            while input_open and len(pending) < max_workers * 2:
+                task = next(task_iter, None)
+                if task is None:
+                    input_open = False
+                    break
+                cc, site_name, url_template = task
+                pending.add(executor.submit(_search_task, cc, site_name, url_template,
+                                            session, cache, buckets[_domain(url_template)]))
+            if not pending:
+                break
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+        if own_session:
+            session.close()
+
+def run_search_queue(queue, missing_cc_list, search_engines=None, max_workers=SEARCH_WORKERS, session=None,
+                     rate=RATE_LIMIT_PER_SECOND, burst=RATE_LIMIT_BURST, cache=None, incoming=None, stop=None):
+    """
+    Sucht über eine persistente SearchQueue: fortsetzbar nach Abbruch.
+
+    Aufträge werden je (ID, Seite) angelegt (bereits vorhandene nicht erneut),
+    Ergebnisse sofort in der Datenbank gespeichert und vorübergehende Fehler
+    mit Backoff wiederholt. Ein Neustart arbeitet nur die offenen Aufträge ab.
+
+    Über incoming (queue.Queue) können während der Suche weitere ID-Listen
+    nachgeliefert werden; None beendet die Eingabe. Die Suche endet erst,
+    wenn die Eingabe beendet und alle Aufträge abgearbeitet sind.
+
+    Ist stop (threading.Event) gesetzt, werden keine Aufträge mehr vergeben;
+    laufende Anfragen werden noch gespeichert, offene Aufträge bleiben für
+    den nächsten Lauf in der Warteschlange.
+    """
+    search_engines = search_engines or SEARCH_ENGINES
+    cc_ids = queue.enqueue(missing_cc_list, search_engines)
+    input_open = incoming is not None
+
+    def receive(timeout=0):
+        # Nachgelieferte IDs im eigenen Thread einreihen (SQLite-Verbindung der Queue ist threadgebunden)
+        nonlocal input_open
+        try:
+            batch = incoming.get(timeout=timeout) if timeout != 0 else incoming.get_nowait()
+            while True:
+                if batch is None:
+                    input_open = False
+                    return
+                cc_ids.extend(queue.enqueue(batch, search_engines))
+                batch = incoming.get_nowait()
+        except Empty:
+            pass
+
+    own_session = session is None
+    if own_session:
+        session = create_session(max_workers)
+    buckets = {}
+    for url_template in search_engines.values():
+        buckets.setdefault(_domain(url_template), TokenBucket(rate, burst))
+
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            running = {}
+            while True:
+                stopped = stop is not None and stop.is_set()
+                if input_open and not stopped:
+                    receive()
+                # Warteschlange des Executors klein halten, damit Abbrüche wenig verlieren
+                free = max_workers * 2 - len(running)
+                if free > 0 and not stopped:
+                    for cc, site_name in queue.claim(free, search_engines):
+                        url_template = search_engines[site_name]
+                        future = executor.submit(search_site, site_name, url_template, cc, session, cache,
+                                                 buckets[_domain(url_template)], True)
+                        running[future] = (cc, site_name)
+                if not running:
+                    if stopped:
+                        break
+                    delay = queue.next_retry_in(search_engines)
+                    if input_open:
+                        # Auf neue IDs oder den nächsten fälligen Auftrag warten
+                        receive(timeout=delay)
+                        continue
+                    if delay is None:
+                        break
+                    time.sleep(delay)
+                    continue
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    cc, site_name = running.pop(future)
+                    try:
+                        queue.complete(cc, site_name, future.result())
+                    except Exception as e:
+                        logging.warning(f"Suche nach {cc} auf {site_name} fehlgeschlagen, wird wiederholt: {e}")
+                        queue.fail(cc, site_name, e)
+    finally:
+        if own_session:
+            session.close()
+    return queue.results(cc_ids)
+
+def search_alternatives(missing_cc_list, queue=None, **kwargs):
+    """
+    Durchsucht verschiedene Seiten nach alternativen CC-Dateien.
 
-def search_alternatives(missing_cc_list):
-    """Durchsucht verschiedene Seiten nach alternativen CC-Dateien."""
+    Mit queue (search_queue.SearchQueue) wird die Suche persistent und
+    fortsetzbar ausgeführt.
+    """
+    if queue is not None:
+        return run_search_queue(queue, missing_cc_list, **kwargs)
     search_results = {}
-    for cc in missing_cc_list:
-        logging.info(f"Suche nach: {cc}")
-        search_results[cc] = {}
-        for site_name, url_template in SEARCH_ENGINES.items():
-            result = search_site(site_name, url_template, cc)
-            if result:
-                search_results[cc][site_name] = result
-            time.sleep(1)  # Kleine Pause zwischen Anfragen, um geblockt zu werden zu vermeiden
+    for cc, site_name, result in iter_search_results(missing_cc_list, **kwargs):
+        site_results = search_results.setdefault(cc, {})
+        if result:
+            site_results[site_name] = result
     return search_results
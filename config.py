@@ -13,9 +13,13 @@
 #   - Mods-Ordner-Pfad
 #   - Savegames-Ordner-Pfad
 #   - Backup-Pfad
-#   - Backup-Modus (full, delta, selective)
+#   - Backup-Modus (full, delta, selective, repository)
 #   - Berichtformate (HTML, CSV, JSON, MD)
+#   - Berichtsmodus (full, delta)
 #   - Datenbank-Typ (sqlite, mysql)
+#   - Such-Cache (Pfad, TTL, negative TTL, maximale Größe)
+#   - Pipeline (Zwischenergebnis-Cache, Scan-Optionen, lokaler Katalog)
+#   - Instrumentierung (Spans je Stufe, optional tracemalloc/cProfile, JSON-Trace und Prometheus-Export)
 # - Optional:
 #   - Custom Branding (z.B. Logo, App-Name)
 #   - Spracheinstellungen (future i18n Support)
@@ -24,17 +28,43 @@
 # - Funktion: load_config(config_path='config.json')
 # - Funktion: save_config(config, config_path='config.json')
 # - Funktion: create_default_config(config_path='config.json')
+# - Funktion: validate_config(config) → ergänzt fehlende Schlüssel mit Standardwerten, prüft Werte
+# - Funktion: get_config(config_path='config.json') → geladene und validierte Konfiguration
 
 import os
+import copy
 import json
+import logging
 
 # Default configuration settings
 DEFAULT_CONFIG = {
     "mods_folder": "C:/Users/YourName/Documents/Electronic Arts/The Sims 4/Mods",
     "savegames_folder": "C:/Users/YourName/Documents/Electronic Arts/The Sims 4/saves",
     "backup_folder": "./backups",
-    "backup_mode": "full",  # options: full, delta, selective
+    "backup_mode": "full",  # options: full, delta, selective, repository
+    "backup_zip_level": 6,  # Deflate-Stufe für Full-ZIP-Backups (0 = nur speichern)
+    "backup_retention": {"keep_last": None, "max_age_days": None},  # None = keine Bereinigung
     "report_formats": ["html", "csv", "json", "md"],
+    "report_mode": "full",  # options: full, delta
+    "search_cache": {
+        "path": "search_cache.db",
+        "ttl_hours": 168,  # Treffer eine Woche cachen
+        "negative_ttl_hours": 24,  # keine Treffer / Fehler einen Tag cachen
+        "max_size_mb": 256
+    },
+    "pipeline": {
+        "cache_path": "pipeline_cache.db",  # Zwischenergebnisse je Savegame/Bericht (Fingerprint)
+        "unaligned_scan": False,  # Roh-Scan über alle Byte-Offsets (nur Nicht-DBPF-Savegames)
+        "local_catalog": True  # fehlende IDs zuerst im lokalen Katalog (cc_catalog) auflösen
+    },
+    "instrumentation": {
+        "enabled": False,
+        "memory": False,  # Spitzen-Speicher je Span (tracemalloc, verlangsamt den Lauf)
+        "profile": False,  # cProfile für den gesamten Lauf
+        "trace_path": "simvault_trace.json",
+        "prometheus_path": "simvault_metrics.prom",
+        "profile_path": "simvault.prof"
+    },
     "database": {
         "type": "sqlite",  # options: sqlite, mysql (future)
         "sqlite_path": "simvault_data.db",
@@ -53,28 +83,100 @@ DEFAULT_CONFIG = {
     "language": "en"  # future: i18n support
 }
 
+BACKUP_MODES = ("full", "delta", "selective", "repository")
+REPORT_MODES = ("full", "delta")
+REPORT_FORMATS = ("html", "csv", "json", "md")
+DATABASE_TYPES = ("sqlite", "mysql")
+
 def create_default_config(config_path='config.json'):
     """Erstellt eine Standard-Konfigurationsdatei, falls keine existiert."""
     if not os.path.exists(config_path):
         with open(config_path, 'w', encoding='utf-8') as f:
             json.dump(DEFAULT_CONFIG, f, indent=4)
-        print(f"Default config created at {config_path}")
+        logging.info(f"Standard-Konfiguration erstellt: {config_path}")
     else:
-        print(f"Config file already exists at {config_path}")
+        logging.info(f"Konfigurationsdatei existiert bereits: {config_path}")
 
 def load_config(config_path='config.json'):
     """Lädt die Konfigurationsdatei."""
     if not os.path.exists(config_path):
-        print("No config file found. Creating default config...")
+        logging.warning("Keine Konfigurationsdatei gefunden. Standard-Konfiguration wird erstellt.")
         create_default_config(config_path)
     
     with open(config_path, 'r', encoding='utf-8') as f:
         config = json.load(f)
-    print(f"Config loaded from {config_path}")
+    logging.info(f"Konfiguration geladen: {config_path}")
     return config
 
 def save_config(config, config_path='config.json'):
     """Speichert die Konfigurationsdatei."""
     with open(config_path, 'w', encoding='utf-8') as f:
         json.dump(config, f, indent=4)
-    print(f"Config saved to {config_path}")
+    logging.info(f"Konfiguration gespeichert: {config_path}")
+
+def _merge_defaults(config, defaults):
+    """Ergänzt fehlende Schlüssel (auch in verschachtelten Abschnitten) aus den Standardwerten."""
+    merged = copy.deepcopy(defaults)
+    for key, value in config.items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = _merge_defaults(value, merged[key])
+        else:
+            merged[key] = value
+    return merged
+
+def _is_count(value, minimum):
+    return isinstance(value, int) and not isinstance(value, bool) and value >= minimum
+
+def validate_config(config):
+    """
+    Ergänzt fehlende Einträge mit Standardwerten und prüft die Werte.
+
+    Returns:
+        dict: Vollständige Konfiguration.
+
+    Raises:
+        ValueError: mit allen gefundenen Fehlern.
+    """
+    if not isinstance(config, dict):
+        raise ValueError("Die Konfiguration muss ein JSON-Objekt sein.")
+    config = _merge_defaults(config, DEFAULT_CONFIG)
+    errors = []
+    for key in ("mods_folder", "savegames_folder", "backup_folder"):
+        if not isinstance(config[key], str) or not config[key]:
+            errors.append(f"{key} muss ein Pfad sein.")
+    if config["backup_mode"] not in BACKUP_MODES:
+        errors.append(f"backup_mode muss einer von {', '.join(BACKUP_MODES)} sein.")
+    if not _is_count(config["backup_zip_level"], 0) or config["backup_zip_level"] > 9:
+        errors.append("backup_zip_level muss eine ganze Zahl von 0 bis 9 sein.")
+    retention = config["backup_retention"]
+    if retention["keep_last"] is not None and not _is_count(retention["keep_last"], 1):
+        errors.append("backup_retention.keep_last muss None oder eine ganze Zahl ≥ 1 sein.")
+    max_age = retention["max_age_days"]
+    if max_age is not None and (isinstance(max_age, bool) or not isinstance(max_age, (int, float)) or max_age < 0):
+        errors.append("backup_retention.max_age_days muss None oder eine Zahl ≥ 0 sein.")
+    formats = config["report_formats"]
+    if not isinstance(formats, list) or not formats or any(f not in REPORT_FORMATS for f in formats):
+        errors.append(f"report_formats muss eine Liste aus {', '.join(REPORT_FORMATS)} sein.")
+    if config["report_mode"] not in REPORT_MODES:
+        errors.append(f"report_mode muss einer von {', '.join(REPORT_MODES)} sein.")
+    for key in ("ttl_hours", "negative_ttl_hours", "max_size_mb"):
+        value = config["search_cache"][key]
+        if isinstance(value, bool) or not isinstance(value, (int, float)) or value < 0:
+            errors.append(f"search_cache.{key} muss eine Zahl ≥ 0 sein.")
+    if config["database"]["type"] not in DATABASE_TYPES:
+        errors.append(f"database.type muss einer von {', '.join(DATABASE_TYPES)} sein.")
+    for section, key in (("search_cache", "path"), ("pipeline", "cache_path"), ("database", "sqlite_path")):
+        if not isinstance(config[section][key], str) or not config[section][key]:
+            errors.append(f"{section}.{key} muss ein Dateipfad sein.")
+    if errors:
+        raise ValueError("Ungültige Konfiguration: " + " ".join(errors))
+    return config
+
+def get_config(config_path='config.json'):
+    """
+    Lädt und validiert die Konfiguration (legt config.json bei Bedarf an).
+
+    Raises:
+        ValueError: bei ungültigem JSON oder ungültigen Werten.
+    """
+    return validate_config(load_config(config_path))
@@ -0,0 +1,194 @@
+# Modul: dbpf_reader.py
+# Funktion: Liest Sims 4 DBPF-Container (Savegames und .package-Dateien) streamend
+
+# Aufgaben:
+# - Header und Ressourcen-Index (DBPF 2.x) parsen
+# - Ressourcen-Schlüssel (Type/Group/Instance) typisiert zurückgeben
+# - Einzelne Ressourcen bei Bedarf lesen und dekomprimieren (zlib)
+# - Speicherbedarf auf die größte einzelne Ressource begrenzen
+
+# Strukturvorschlag:
+# - Funktion: is_dbpf(f)
+# - Funktion: read_dbpf_index(f, header=None) → Liste von IndexEntry
+# - Funktion: read_resource(f, entry) → dekomprimierte Bytes
+# - Funktion: iter_resources(f, resource_types=None) → (ResourceKey, Bytes)
+# - Funktion: to_signed64(value) / to_hex(value) → Instance für SQLite umrechnen und zurück
+
+import struct
+import zlib
+from collections import namedtuple
+
+DBPF_MAGIC = b'DBPF'
+HEADER_SIZE = 96
+
+# Kompressionsarten im erweiterten Index-Eintrag
+COMPRESSION_NONE = 0x0000
+COMPRESSION_ZLIB = 0x5A42
+COMPRESSION_STREAMABLE = 0xFFFE
+COMPRESSION_REFPACK = 0xFFFF
+COMPRESSION_DELETED = 0xFFE0
+
+# Index-Flags: Felder, die für alle Einträge konstant sind
+INDEX_FLAG_CONST_TYPE = 0x1
+INDEX_FLAG_CONST_GROUP = 0x2
+INDEX_FLAG_CONST_INSTANCE_HIGH = 0x4
+
+# Bit im file_size-Feld, das einen erweiterten Eintrag (mit Kompressionsart) markiert
+EXTENDED_ENTRY_BIT = 0x80000000
+
+class ResourceKey(namedtuple('ResourceKey', ['type', 'group', 'instance'])):
+    """Typisierter DBPF-Ressourcen-Schlüssel (Type, Group, Instance)."""
+    __slots__ = ()
+
+    def __str__(self):
+        return f"{self.type:08X}:{self.group:08X}:{self.instance:016X}"
+
+# SQLite speichert nur vorzeichenbehaftete 64-Bit-Integer; Instances werden bitgleich umgerechnet
+def to_signed64(value):
+    """uint64 → bitgleicher int64 (SQLite-INTEGER)."""
+    return value - (1 << 64) if value >= (1 << 63) else value
+
+def to_hex(value):
+    """Gespeicherter int64 → Hex-String der uint64-Instance."""
+    return hex(value + (1 << 64) if value < 0 else value)
+
+IndexEntry = namedtuple('IndexEntry', ['key', 'offset', 'file_size', 'mem_size', 'compression'])
+
+def is_dbpf(f):
+    """Prüft anhand der Magic-Bytes, ob die geöffnete Datei ein DBPF-Container ist."""
+    position = f.tell()
+    try:
+        f.seek(0)
+        return f.read(4) == DBPF_MAGIC
+    finally:
+        f.seek(position)
+
+def read_dbpf_header(f):
+    """
+    Liest den DBPF-Header.
+
+    Returns:
+        tuple: (major_version, minor_version, index_count, index_offset, index_size)
+    """
+    f.seek(0)
+    header = f.read(HEADER_SIZE)
+    if len(header) < HEADER_SIZE or header[:4] != DBPF_MAGIC:
+        raise ValueError("Keine gültige DBPF-Datei (Header fehlt oder falsche Magic-Bytes).")
+    major, minor = struct.unpack_from('<II', header, 4)
+    index_count, index_offset_short, index_size = struct.unpack_from('<III', header, 36)
+    index_offset = struct.unpack_from('<I', header, 64)[0]
+    if major != 2:
+        raise ValueError(f"Nicht unterstützte DBPF-Version {major}.{minor}.")
+    # Ältere Schreiber tragen die Position nur im kurzen Feld ein
+    if index_offset == 0:
+        index_offset = index_offset_short
+    return major, minor, index_count, index_offset, index_size
+
+def read_dbpf_index(f, header=None):
+    """
+    Liest den Ressourcen-Index und gibt eine Liste von IndexEntry zurück.
+
+    header ist das Ergebnis von read_dbpf_header, falls der Aufrufer es schon gelesen hat.
+    """
+    _, _, index_count, index_offset, index_size = header or read_dbpf_header(f)
+    if index_count == 0:
+        return []
+    f.seek(index_offset)
+    index = f.read(index_size)
+    if len(index) < index_size:
+        raise ValueError("DBPF-Index ist abgeschnitten.")
+
+    if index_size < 4:
+        raise ValueError("DBPF-Index ist kleiner als das Flags-Feld.")
+    flags = struct.unpack_from('<I', index, 0)[0]
+    const_fields = bin(flags & (INDEX_FLAG_CONST_TYPE | INDEX_FLAG_CONST_GROUP
+                                | INDEX_FLAG_CONST_INSTANCE_HIGH)).count('1')
+    # Mindestgröße ohne erweiterte Felder; jeder erweiterte Eintrag erhöht sie um 4 Byte
+    required = 4 + const_fields * 4 + index_count * (16 + (3 - const_fields) * 4)
+    if required > index_size:
+        raise ValueError(f"DBPF-Index ({index_size} Byte) zu klein für {index_count} Einträge.")
+    pos = 4
+    const_type = const_group = const_instance_high = None
+    if flags & INDEX_FLAG_CONST_TYPE:
+        const_type = struct.unpack_from('<I', index, pos)[0]
+        pos += 4
+    if flags & INDEX_FLAG_CONST_GROUP:
+        const_group = struct.unpack_from('<I', index, pos)[0]
+        pos += 4
+    if flags & INDEX_FLAG_CONST_INSTANCE_HIGH:
+        const_instance_high = struct.unpack_from('<I', index, pos)[0]
+        pos += 4
+
+    unpack_u32 = struct.Struct('<I').unpack_from
+    unpack_tail = struct.Struct('<IIII').unpack_from
+    unpack_u16 = struct.Struct('<H').unpack_from
+    entries = []
+    for _ in range(index_count):
+        if const_type is None:
+            res_type = unpack_u32(index, pos)[0]
+            pos += 4
+        else:
+            res_type = const_type
+        if const_group is None:
+            group = unpack_u32(index, pos)[0]
+            pos += 4
+        else:
+            group = const_group
+        if const_instance_high is None:
+            instance_high = unpack_u32(index, pos)[0]
+            pos += 4
+        else:
+            instance_high = const_instance_high
+        instance_low, offset, file_size, mem_size = unpack_tail(index, pos)
+        pos += 16
+        compression = COMPRESSION_NONE
+        if file_size & EXTENDED_ENTRY_BIT:
+            file_size &= ~EXTENDED_ENTRY_BIT
+            required += 4
+            if required > index_size:
+                raise ValueError(f"DBPF-Index ({index_size} Byte) zu klein für {index_count} Einträge.")
+            compression = unpack_u16(index, pos)[0]
+            pos += 4  # Kompressionsart (uint16) + committed (uint16)
+        elif file_size != mem_size:
+            # Ältere Einträge ohne Kompressionsart sind RefPack-komprimiert
+            compression = COMPRESSION_REFPACK
+        key = ResourceKey(res_type, group, (instance_high << 32) | instance_low)
+        entries.append(IndexEntry(key, offset, file_size, mem_size, compression))
+    return entries
+
+def read_resource(f, entry):
+    """
+    Liest eine einzelne Ressource und dekomprimiert sie bei Bedarf.
+
+    Returns:
+        bytes | None: Nutzdaten oder None bei nicht unterstützter Kompression.
+    """
+    if entry.compression == COMPRESSION_DELETED:
+        return None
+    f.seek(entry.offset)
+    raw = f.read(entry.file_size)
+    if len(raw) < entry.file_size:
+        raise ValueError(f"Ressource {entry.key} ist abgeschnitten.")
+    if entry.compression == COMPRESSION_NONE:
+        return raw
+    if entry.compression == COMPRESSION_ZLIB:
+        return zlib.decompress(raw)
+    # RefPack/Streamable werden in Savegames nicht verwendet
+    return None
+
+def iter_resources(f, resource_types=None):
+    """
+    Liefert (ResourceKey, Nutzdaten) für alle Ressourcen der gewünschten Typen.
+
+    Es wird immer nur eine Ressource gleichzeitig gelesen, der Speicherbedarf
+    ist daher durch die größte einzelne Ressource begrenzt.
+    """
+    entries = read_dbpf_index(f)
+    if resource_types is not None:
+        entries = [entry for entry in entries if entry.key.type in resource_types]
+    # In Dateireihenfolge lesen, um Seeks zu minimieren
+    entries.sort(key=lambda entry: entry.offset)
+    for entry in entries:
+        payload = read_resource(f, entry)
+        if payload is not None:
+            yield entry.key, payload
@@ -0,0 +1,86 @@
+# Modul: fs_walker.py
+# Funktion: Schneller, paralleler Verzeichnis-Durchlauf für Mods- und Savegame-Ordner
+
+# Aufgaben:
+# - Verzeichnisbaum mit os.scandir durchlaufen
+# - Unterverzeichnisse parallel in einem Thread-Pool lesen (lohnt sich auf langsamen/Netzlaufwerken)
+# - stat-Ergebnisse der DirEntry-Objekte im Worker vorab laden und wiederverwenden
+# - Einträge lazy als Generator liefern
+# - Filter nach Dateiendung und Ignore-Mustern (fnmatch, z.B. "*.tmp", "__pycache__")
+
+# Strukturvorschlag:
+# - Funktion: walk_files(root, extensions=None, ignore_patterns=None, max_workers=8, errors=None) → Generator über os.DirEntry
+
+import os
+import logging
+from fnmatch import fnmatch
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+DEFAULT_WALK_WORKERS = 8
+
+def _is_ignored(name, ignore_patterns):
+    return any(fnmatch(name, pattern) for pattern in ignore_patterns)
+
+def _scan_directory(path, extensions, ignore_patterns):
+    """Liest ein einzelnes Verzeichnis; gibt (Dateien, Unterverzeichnisse, Fehlerpfade) zurück."""
+    files = []
+    subdirs = []
+    failed = []
+    try:
+        with os.scandir(path) as entries:
+            for entry in entries:
+                if ignore_patterns and _is_ignored(entry.name, ignore_patterns):
+                    continue
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirs.append(entry.path)
+                    elif entry.is_file():
+                        if extensions and not entry.name.lower().endswith(extensions):
+                            continue
+                        # stat im Worker-Thread laden; DirEntry cached das Ergebnis
+                        entry.stat()
+                        files.append(entry)
+                except OSError as e:
+                    logging.warning(f"{entry.path} übersprungen: {e}")
+                    failed.append(entry.path)
+    except OSError as e:
+        logging.warning(f"Verzeichnis {path} konnte nicht gelesen werden: {e}")
+        failed.append(path)
+    return files, subdirs, failed
+
+def walk_files(root, extensions=None, ignore_patterns=None, max_workers=DEFAULT_WALK_WORKERS, errors=None):
+    """
+    Durchläuft einen Verzeichnisbaum parallel und liefert alle Dateien lazy.
+
+    Args:
+        root (str): Startverzeichnis.
+        extensions (iterable): Optional, nur Dateien mit diesen Endungen (z.B. ('.package',)).
+        ignore_patterns (iterable): Optional, fnmatch-Muster für zu ignorierende Datei-/Ordnernamen.
+        max_workers (int): Anzahl paralleler Verzeichnis-Leser.
+        errors (list): Optional, erhält die Pfade nicht lesbarer Verzeichnisse und Einträge.
+            Aufrufer, die aus dem Ergebnis Löschungen ableiten, müssen diese Pfade aussparen.
+
+    Yields:
+        os.DirEntry: Datei-Einträge mit bereits geladenem stat() (Reihenfolge nicht garantiert).
+    """
+    if extensions:
+        extensions = tuple(ext.lower() for ext in extensions)
+    ignore_patterns = tuple(ignore_patterns or ())
+
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    pending = {executor.submit(_scan_directory, root, extensions, ignore_patterns)}
+    try:
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                files, subdirs, failed = future.result()
+                if errors is not None:
+                    errors.extend(failed)
+                for subdir in subdirs:
+                    pending.add(executor.submit(_scan_directory, subdir, extensions, ignore_patterns))
+                yield from files
+    finally:
+        # Bei vorzeitig beendetem Generator ausstehende Verzeichnisse verwerfen
+        for future in pending:
+            future.cancel()
+        executor.shutdown(wait=True)
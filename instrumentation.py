@@ -0,0 +1,292 @@
+# Modul: instrumentation.py
+# Funktion: Messpunkte (Spans) für Pipeline-Stufen und Teilschritte, Export als JSON-Trace und Prometheus-Metriken
+
+# Aufgaben:
+# - Spans je Stufe (analyze, scan, diff, search, report, backup) und je Teilschritt
+#   (Savegame gelesen, Package-Index gelesen, Seitenanfrage, Berichtsformat geschrieben)
+# - Je Span: Laufzeit, gelesene/geschriebene Bytes, Spitzen-Speicher (tracemalloc, optional)
+# - Optionaler cProfile-Hook für die gesamte Messung
+# - Export als JSON-Trace (Chrome-Trace-Format, z.B. in Perfetto öffnen) und als
+#   Prometheus-Textdatei (node_exporter textfile collector)
+# - Ohne aktive Messung kosten span() und record() praktisch nichts
+
+# Strukturvorschlag:
+# - Klasse: Tracer(memory=False, profile=False)
+#   - span(name, **attrs) → Kontextmanager; span.add_bytes(n)
+#   - record(name, seconds, nbytes, **attrs) → bereits gemessener Span (z.B. aus Worker-Prozessen)
+#   - summary() / write_json_trace(path) / write_prometheus(path) / write_profile(path)
+# - Funktion: start_tracing(memory, profile) / stop_tracing() / tracer_from_config(config)
+# - Funktion: span(name, **attrs) / record(...) → nutzen den aktiven Tracer, sonst No-op
+
+import os
+import json
+import time
+import logging
+import cProfile
+import threading
+import tracemalloc
+
+METRIC_PREFIX = 'simvault'
+
+class Span:
+    """Ein gemessener Abschnitt; wird als Kontextmanager über Tracer.span() erzeugt."""
+
+    __slots__ = ('tracer', 'id', 'name', 'attrs', 'parent', 'thread', 'start', 'duration', 'bytes', 'peak',
+                 '_base', '_peak_abs')
+
+    def __init__(self, tracer, name, attrs):
+        self.tracer = tracer
+        self.name = name
+        self.attrs = attrs
+        self.id = None
+        self.parent = None
+        self.thread = threading.get_ident()
+        self.start = 0.0
+        self.duration = 0.0
+        self.bytes = 0
+        self.peak = None
+        self._base = None
+        self._peak_abs = 0
+
+    def add_bytes(self, count):
+        self.bytes += count
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def __enter__(self):
+        tracer = self.tracer
+        stack = tracer._stack()
+        if stack:
+            self.parent = stack[-1].id
+        # tracemalloc kennt nur eine prozessweite Spitze: Speicher nur im messenden Thread erfassen
+        if tracer.memory and self.thread == tracer.main_thread and tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            if stack and stack[-1]._base is not None:
+                stack[-1]._peak_abs = max(stack[-1]._peak_abs, peak)
+            tracemalloc.reset_peak()
+            self._base = self._peak_abs = current
+        stack.append(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.duration = time.perf_counter() - self.start
+        tracer = self.tracer
+        stack = tracer._stack()
+        stack.pop()
+        if self._base is not None:
+            self._peak_abs = max(self._peak_abs, tracemalloc.get_traced_memory()[1])
+            self.peak = self._peak_abs - self._base
+            if stack and stack[-1]._base is not None:
+                stack[-1]._peak_abs = max(stack[-1]._peak_abs, self._peak_abs)
+            tracemalloc.reset_peak()
+        if exc_type is not None:
+            self.attrs['error'] = exc_type.__name__
+        tracer._finish(self)
+        return False
+
+class _NullSpan:
+    """Platzhalter ohne aktive Messung."""
+
+    def add_bytes(self, count):
+        pass
+
+    def set(self, **attrs):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+NULL_SPAN = _NullSpan()
+
+class Tracer:
+    """Sammelt Spans aller Threads eines Laufs und exportiert sie."""
+
+    def __init__(self, memory=False, profile=False):
+        self.memory = memory
+        self.profile = profile
+        self.spans = []
+        self.lock = threading.Lock()
+        self.main_thread = threading.get_ident()
+        self.origin = time.perf_counter()
+        self.profiler = None
+        self._local = threading.local()
+        self._next_id = 0
+        self._owns_tracemalloc = False
+
+    def _stack(self):
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def _new_span(self, name, attrs):
+        span = Span(self, name, attrs)
+        # ID schon beim Start vergeben, damit Kind-Spans ihren Eltern-Span referenzieren können
+        with self.lock:
+            self._next_id += 1
+            span.id = self._next_id
+        return span
+
+    def _finish(self, span):
+        with self.lock:
+            self.spans.append(span)
+
+    def start(self):
+        """Startet tracemalloc bzw. cProfile, falls angefordert."""
+        if self.memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._owns_tracemalloc = True
+        if self.profile:
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+        return self
+
+    def stop(self):
+        if self.profiler:
+            self.profiler.disable()
+        if self._owns_tracemalloc:
+            tracemalloc.stop()
+            self._owns_tracemalloc = False
+
+    def span(self, name, **attrs):
+        return self._new_span(name, attrs)
+
+    def record(self, name, seconds, nbytes=0, **attrs):
+        """Erfasst einen außerhalb gemessenen Span (z.B. Laufzeit aus einem Worker-Prozess)."""
+        span = self._new_span(name, attrs)
+        span.duration = seconds
+        span.start = time.perf_counter() - seconds
+        span.bytes = nbytes
+        stack = self._stack()
+        if stack:
+            span.parent = stack[-1].id
+        self._finish(span)
+
+    def summary(self):
+        """Aggregiert die Spans je Name: {name: {count, seconds, bytes, peak_bytes}}."""
+        totals = {}
+        with self.lock:
+            spans = list(self.spans)
+        for span in spans:
+            total = totals.setdefault(span.name, {"count": 0, "seconds": 0.0, "bytes": 0, "peak_bytes": None})
+            total["count"] += 1
+            total["seconds"] += span.duration
+            total["bytes"] += span.bytes
+            if span.peak is not None:
+                total["peak_bytes"] = max(total["peak_bytes"] or 0, span.peak)
+        return totals
+
+    def write_json_trace(self, path):
+        """Schreibt alle Spans im Chrome-Trace-Format (Zeiten in Mikrosekunden)."""
+        with self.lock:
+            spans = sorted(self.spans, key=lambda span: span.start)
+        events = []
+        for span in spans:
+            args = dict(span.attrs, bytes=span.bytes, span_id=span.id, parent_id=span.parent)
+            if span.peak is not None:
+                args['peak_bytes'] = span.peak
+            events.append({
+                "name": span.name, "cat": span.name.split('.')[0], "ph": "X",
+                "ts": round((span.start - self.origin) * 1e6, 1), "dur": round(span.duration * 1e6, 1),
+                "pid": os.getpid(), "tid": span.thread, "args": args,
+            })
+        _write_atomic(path, json.dumps({"traceEvents": events, "displayTimeUnit": "ms",
+                                        "summary": self.summary()}, default=str))
+
+    def write_prometheus(self, path, prefix=METRIC_PREFIX):
+        """Schreibt die aggregierten Werte im Prometheus-Textformat."""
+        summary = self.summary()
+        metrics = [
+            ("span_seconds_total", "counter", "Gesamtlaufzeit je Span in Sekunden", "seconds"),
+            ("span_calls_total", "counter", "Anzahl abgeschlossener Spans", "count"),
+            ("span_bytes_total", "counter", "Gelesene bzw. geschriebene Bytes je Span", "bytes"),
+            ("span_peak_bytes", "gauge", "Höchster zusätzlicher Speicher (tracemalloc) je Span", "peak_bytes"),
+        ]
+        lines = []
+        for metric, metric_type, description, field in metrics:
+            lines.append(f"# HELP {prefix}_{metric} {description}")
+            lines.append(f"# TYPE {prefix}_{metric} {metric_type}")
+            for name, total in sorted(summary.items()):
+                if total[field] is not None:
+                    lines.append(f'{prefix}_{metric}{{span="{_escape_label(name)}"}} {total[field]}')
+        _write_atomic(path, '\n'.join(lines) + '\n')
+
+    def write_profile(self, path):
+        """Speichert die cProfile-Statistik (auswertbar mit pstats oder snakeviz)."""
+        if self.profiler is None:
+            return False
+        self.profiler.dump_stats(path)
+        return True
+
+    def export(self, trace_path=None, prometheus_path=None, profile_path=None):
+        """Schreibt alle angegebenen Exporte."""
+        if trace_path:
+            self.write_json_trace(trace_path)
+        if prometheus_path:
+            self.write_prometheus(prometheus_path)
+        if profile_path:
+            self.write_profile(profile_path)
+        for name, total in sorted(self.summary().items(), key=lambda item: -item[1]["seconds"]):
+            logging.info(f"{name}: {total['count']}x, {total['seconds']:.3f} s, {total['bytes']} Bytes")
+
+def _escape_label(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _write_atomic(path, text):
+    # Der textfile collector darf nie eine halb geschriebene Datei lesen
+    temp_path = f"{path}.tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(temp_path, path)
+
+_active_tracer = None
+
+def get_tracer():
+    return _active_tracer
+
+def tracing_enabled():
+    return _active_tracer is not None
+
+def start_tracing(memory=False, profile=False):
+    """Aktiviert einen neuen Tracer für alle Module und gibt ihn zurück."""
+    global _active_tracer
+    _active_tracer = Tracer(memory, profile).start()
+    return _active_tracer
+
+def stop_tracing():
+    """Beendet die Messung und gibt den Tracer (oder None) zurück."""
+    global _active_tracer
+    tracer, _active_tracer = _active_tracer, None
+    if tracer:
+        tracer.stop()
+    return tracer
+
+def tracer_from_config(config):
+    """Startet die Messung gemäß config["instrumentation"], falls aktiviert (sonst None)."""
+    settings = config.get("instrumentation", {})
+    if not settings.get("enabled"):
+        return None
+    return start_tracing(memory=settings.get("memory", False), profile=settings.get("profile", False))
+
+def export_from_config(tracer, config):
+    """Schreibt die in config["instrumentation"] konfigurierten Exporte."""
+    settings = config.get("instrumentation", {})
+    tracer.export(settings.get("trace_path"), settings.get("prometheus_path"), settings.get("profile_path"))
+
+def span(name, **attrs):
+    """Span im aktiven Tracer; ohne aktive Messung ein No-op-Kontextmanager."""
+    tracer = _active_tracer
+    if tracer is None:
+        return NULL_SPAN
+    return tracer.span(name, **attrs)
+
+def record(name, seconds, nbytes=0, **attrs):
+    """Erfasst einen bereits gemessenen Span im aktiven Tracer."""
+    tracer = _active_tracer
+    if tracer is not None:
+        tracer.record(name, seconds, nbytes, **attrs)
@@ -1,35 +1,271 @@
-# main.py
+# Modul: main.py
+# Funktion: Kommandozeile von SimVault mit Unterbefehlen für einzelne Stufen oder den gesamten Ablauf
 
-def main():
-    # 1. Savegame laden und analysieren
-    from savegame_analyzer import analyze_savegame
+# Aufgaben:
+# - Unterbefehle: run (gesamte Pipeline, Standard), analyze, scan, search, lookup, report, backup, restore
+# - Schneller Start für Skripte und geplante Aufgaben: jeder Befehl importiert erst beim Aufruf nur
+#   die Module, die er braucht (kein NumPy für Backups, kein requests/bs4 außer für die Suche)
+# - Logging wird einmal hier konfiguriert (-v/-q), nicht beim Import der Module
+# - Konfiguration über config.get_config (validiert)
+# - Ungültige Eingaben (Konfiguration, CC-IDs) → Meldung und Exit-Code 2 statt Traceback
+# - Optional: --timing misst die Startzeit bis zum Befehl und die Laufzeit des Befehls
+# - Datenausgaben (analyze, search, lookup) als JSON auf stdout, Meldungen auf stderr
 
-    savegame_path = "Pfad/zum/Savegame"
-    cc_ids = analyze_savegame(savegame_path)
+# Strukturvorschlag:
+# - Funktion: build_parser() → argparse-Parser mit Unterbefehlen
+# - Funktionen: cmd_run / cmd_analyze / cmd_scan / cmd_search / cmd_lookup / cmd_report / cmd_backup /
+#   cmd_restore
+# - Funktion: main(argv=None) → Exit-Code
+# - Aufruf: python main.py [--config config.json] [-v|-q] [--timing] <Befehl> [Optionen]
 
-    # 2. Mods-Ordner scannen
-    from mod_folder_scanner import scan_mods_folder
+import time
 
-    mods_folder = "Pfad/zum/Mods-Ordner"
-    existing_mods = scan_mods_folder(mods_folder)
+# Vor allen weiteren Imports: Grundlage für --timing
+_STARTED = time.perf_counter()
 
-    # 3. Fehlende CCs bestimmen
-    missing_cc = set(cc_ids) - set(existing_mods)
+import sys
+import json
+import logging
+import argparse
+from datetime import datetime
 
-    # 4. Alternative CCs online suchen
+from config import BACKUP_MODES, REPORT_FORMATS, get_config
+
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
+SOURCE_FOLDERS = {"saves": "savegames_folder", "mods": "mods_folder"}
+
+def _print_json(data, output=None):
+    if output:
+        with open(output, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=4, ensure_ascii=False)
+        logging.info(f"Ergebnis gespeichert: {output}")
+    else:
+        json.dump(data, sys.stdout, indent=4, ensure_ascii=False)
+        sys.stdout.write('\n')
+
+def cmd_run(config, args):
+    from pipeline import run_pipeline
+
+    run_pipeline(config)
+
+def cmd_analyze(config, args):
+    from pipeline import analyze_savegames
+
+    cc_sources = analyze_savegames(config)
+    result = {"cc_sources": cc_sources}
+    if args.missing:
+        # Abgleich mit dem vorhandenen Mods-Index (ohne neuen Scan, siehe "scan")
+        import numpy as np
+        from cc_membership import load_installed_key_set
+
+        installed = load_installed_key_set(config["database"]["sqlite_path"])
+        ids = np.array([int(cc_id, 16) for cc_id in cc_sources], dtype=np.uint64)
+        result["missing_cc"] = [hex(cc_id) for cc_id in installed.missing(ids).tolist()]
+    _print_json(result, args.output)
+
+def cmd_scan(config, args):
+    from mod_folder_scanner import update_mods_index
+    from cc_membership import load_installed_key_set
+    from cc_catalog import LocalCatalog
+
+    db_path = config["database"]["sqlite_path"]
+    stats = update_mods_index(config["mods_folder"], db_path)
+    load_installed_key_set(db_path, rebuild=bool(stats["updated"] or stats["removed"]))
+    if config["pipeline"]["local_catalog"]:
+        catalog = LocalCatalog(db_path)
+        try:
+            catalog.refresh()
+        finally:
+            catalog.close()
+    print(f"Mods-Index: {stats['files']} Dateien, {stats['updated']} neu eingelesen, {stats['removed']} entfernt.")
+
+def _parse_cc_ids(values):
+    """
+    Normalisiert CC-IDs ("0x…" oder Hex ohne Präfix) zu eindeutigen Hex-Strings.
+
+    Raises:
+        ValueError: bei Werten, die keine 64-Bit-Hex-Zahl sind.
+    """
+    cc_ids = {}
+    for value in values:
+        try:
+            instance = int(value, 16)
+        except ValueError:
+            instance = -1
+        if not 0 <= instance < 1 << 64:
+            raise ValueError(f"Ungültige CC-ID {value!r} (erwartet: 64-Bit-Hex, z.B. 0x8000…)")
+        cc_ids.setdefault(hex(instance), None)
+    return list(cc_ids)
+
+def cmd_search(config, args):
     from cc_searcher import search_alternatives
+    from search_cache import cache_from_config
+    from search_queue import SearchQueue
+
+    from cc_catalog import LocalCatalog, merge_hints, split_resolved
+
+    try:
+        cc_ids = _parse_cc_ids(args.ids or [line.strip() for line in sys.stdin if line.strip()])
+    except ValueError as e:
+        logging.error(str(e))
+        return 2
+    db_path = config["database"]["sqlite_path"]
+    local = {}
+    hints = {}
+    search_cache = cache_from_config(config)
+    try:
+        if config["pipeline"]["local_catalog"] and not args.online_only:
+            catalog = LocalCatalog(db_path)
+            try:
+                local, hints, cc_ids = split_resolved(catalog, cc_ids, search_cache.ttl)
+            finally:
+                catalog.close()
+        results = {}
+        if cc_ids:
+            search_queue = SearchQueue(db_path, search_cache.ttl, search_cache.negative_ttl)
+            try:
+                results = search_alternatives(cc_ids, queue=search_queue, cache=search_cache)
+            finally:
+                search_queue.close()
+    finally:
+        search_cache.close()
+    _print_json({**merge_hints(results, hints), **local}, args.output)
+
+def cmd_lookup(config, args):
+    """Durchsucht nur den lokalen Katalog (Datei-/Creator-Namen oder "0x…"-Schlüssel), ohne Netzwerk."""
+    from cc_catalog import LocalCatalog
+
+    catalog = LocalCatalog(config["database"]["sqlite_path"])
+    try:
+        _print_json(catalog.search(' '.join(args.query), args.limit))
+    finally:
+        catalog.close()
+
+def cmd_report(config, args):
+    """Gibt den zuletzt gespeicherten Bericht aus der Datenbank erneut aus (ohne Analyse und Suche)."""
+    from report_generator import write_report
+    from report_storage import ReportStore
+
+    formats = args.formats or config["report_formats"]
+    store = ReportStore(config["database"]["sqlite_path"])
+    try:
+        run_ids = [args.run] if args.run else store.last_runs(1)
+        if not run_ids:
+            logging.warning("Keine gespeicherten Berichte gefunden.")
+            return 1
+        if config["report_mode"] == "delta" and not args.run and store.latest_run() is not None:
+            # Rollierender Gesamtbericht aus SQLite, so wie ihn generate_delta_report fortschreibt
+            records, name = store.latest_items(), 'report_latest'
+        else:
+            records, name = store.run_items(run_ids[0]), f'report_run{run_ids[0]}'
+        paths = write_report(records, args.output_dir, None, formats, name=name)
+    finally:
+        store.close()
+    for path in paths.values():
+        print(path)
+
+def cmd_backup(config, args):
+    from backup_manager import backup_manager
+
+    retention = {key: value for key, value in config["backup_retention"].items() if value is not None}
+    backup_manager(args.mode or config["backup_mode"], config[SOURCE_FOLDERS[args.source]],
+                   config["backup_folder"], file_list=args.files, compresslevel=config["backup_zip_level"],
+                   retention=retention or None)
+
+def cmd_restore(config, args):
+    from backup_catalog import restore_tree, restore_path
+
+    source_folder = config[SOURCE_FOLDERS[args.source]]
+    if args.path:
+        if not restore_path(config["backup_folder"], source_folder, args.path, args.target, args.at):
+            return 1
+        print(f"{args.path} wiederhergestellt: {args.target}")
+    else:
+        restored = restore_tree(config["backup_folder"], source_folder, args.target, args.at)
+        print(f"{restored} Dateien wiederhergestellt: {args.target}")
+        if not restored:
+            return 1
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='simvault', description="SimVault: fehlende CC finden, Berichte und Backups")
+    parser.add_argument('--config', default='config.json', help="Konfigurationsdatei (Standard: config.json)")
+    verbosity = parser.add_mutually_exclusive_group()
+    verbosity.add_argument('-v', '--verbose', action='store_true', help="ausführliche Ausgabe (DEBUG)")
+    verbosity.add_argument('-q', '--quiet', action='store_true', help="nur Warnungen und Fehler")
+    parser.add_argument('--timing', action='store_true', help="Startzeit und Laufzeit des Befehls ausgeben")
+    commands = parser.add_subparsers(dest='command', metavar='<Befehl>')
+
+    run = commands.add_parser('run', help="gesamte Pipeline: Analyse, Scan, Suche, Bericht (Standard)")
+    run.set_defaults(handler=cmd_run)
+
+    analyze = commands.add_parser('analyze', help="Savegames analysieren, CC-IDs als JSON ausgeben")
+    analyze.add_argument('--missing', action='store_true', help="zusätzlich fehlende IDs laut Mods-Index")
+    analyze.add_argument('--output', help="JSON in diese Datei statt auf stdout")
+    analyze.set_defaults(handler=cmd_analyze)
+
+    scan = commands.add_parser('scan', help="Mods-Index aktualisieren")
+    scan.set_defaults(handler=cmd_scan)
+
+    search = commands.add_parser('search', help="Alternativen für CC-IDs suchen (ohne IDs: von stdin)")
+    search.add_argument('ids', nargs='*', metavar='CC_ID', help="CC-IDs als Hex, z.B. 0x8000…")
+    search.add_argument('--output', help="JSON in diese Datei statt auf stdout")
+    search.add_argument('--online-only', action='store_true', help="lokalen Katalog nicht verwenden")
+    search.set_defaults(handler=cmd_search)
+
+    lookup = commands.add_parser('lookup', help="lokalen Katalog durchsuchen (Name, Creator oder 0x…-Schlüssel)")
+    lookup.add_argument('query', nargs='+')
+    lookup.add_argument('--limit', type=int, default=20)
+    lookup.set_defaults(handler=cmd_lookup)
+
+    report = commands.add_parser('report', help="letzten gespeicherten Bericht erneut ausgeben")
+    report.add_argument('--run', type=int, help="Lauf-ID (Standard: letzter Lauf)")
+    report.add_argument('--formats', nargs='+', choices=REPORT_FORMATS)
+    report.add_argument('--output-dir', default='reports')
+    report.set_defaults(handler=cmd_report)
 
-    cc_alternatives = search_alternatives(missing_cc)
+    backup = commands.add_parser('backup', help="Savegames oder Mods sichern")
+    backup.add_argument('--source', choices=list(SOURCE_FOLDERS), default='saves')
+    backup.add_argument('--mode', choices=BACKUP_MODES,
+                        help="Standard: backup_mode aus der Konfiguration")
+    backup.add_argument('--files', nargs='+', help="Dateien relativ zum Quellordner (nur selective)")
+    backup.set_defaults(handler=cmd_backup)
 
-    # 5. Report generieren
-    from report_generator import generate_report
+    restore = commands.add_parser('restore', help="Stand aus dem Backup-Katalog wiederherstellen")
+    restore.add_argument('target', help="Zielordner (bzw. Zieldatei mit --path)")
+    restore.add_argument('--source', choices=list(SOURCE_FOLDERS), default='saves')
+    restore.add_argument('--at', type=datetime.fromisoformat,
+                         help="Zeitpunkt (ISO-Format, z.B. 2024-05-01T18:00); Standard: letzter Stand")
+    restore.add_argument('--path', help="nur diese Datei (relativ zum Quellordner)")
+    restore.set_defaults(handler=cmd_restore)
+    return parser
 
-    generate_report(missing_cc, cc_alternatives)
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    level = logging.DEBUG if args.verbose else logging.WARNING if args.quiet else logging.INFO
+    logging.basicConfig(level=level, format=LOG_FORMAT)
 
-    # 6. (Optional) GUI starten
-    from gui_interface import start_gui
+    from instrumentation import tracer_from_config, stop_tracing, export_from_config
 
-    start_gui()
+    try:
+        config = get_config(args.config)
+    except ValueError as e:
+        logging.error(f"{args.config}: {e}")
+        return 2
+    handler = getattr(args, 'handler', cmd_run)
+    # Optional: Laufzeit, Bytes und Speicher je Stufe messen (config["instrumentation"])
+    tracer = tracer_from_config(config)
+    command_started = time.perf_counter()
+    try:
+        exit_code = handler(config, args) or 0
+    finally:
+        if tracer:
+            stop_tracing()
+            export_from_config(tracer, config)
+    if args.timing:
+        print(f"Start bis Befehl: {(command_started - _STARTED) * 1000:.1f} ms, "
+              f"Befehl {args.command or 'run'}: {time.perf_counter() - command_started:.3f} s", file=sys.stderr)
+    return exit_code
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
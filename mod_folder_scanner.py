@@ -6,17 +6,33 @@
 # - Alle .package- und .ts4script-Dateien finden
 # - Dateinamen extrahieren
 # - Vergleichbare Liste erstellen
+# - DBPF-Index jeder .package-Datei lesen und Ressourcen-Schlüssel in SQLite speichern
+# - Inkrementelles Update: nur geänderte Dateien (Größe/mtime) neu lesen, gelöschte entfernen
 
 # Strukturvorschlag:
 # - Funktion: scan_mods_folder(folder_path) → Gibt Liste der CC- und Script-Dateien zurück
+# - Funktion: update_mods_index(folder_path, db_path) → Aktualisiert den Ressourcen-Index
+# - Funktion: load_installed_instances(db_path) → Instance-IDs aller installierten Ressourcen
+# - Funktion: load_index_generation(db_path) → Änderungszähler des Index
 
 # mod_folder_scanner.py
 
 import os
 import logging
+import sqlite3
+import struct
+from concurrent.futures import ThreadPoolExecutor
 
-# Logging konfigurieren
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+import numpy as np
+
+from dbpf_reader import read_dbpf_header, read_dbpf_index, HEADER_SIZE, to_signed64
+from fs_walker import walk_files
+from instrumentation import span
+
+MOD_EXTENSIONS = ('.package', '.ts4script')
+
+# Parallele Index-Leser (I/O-gebunden, lohnt sich vor allem auf Netzlaufwerken)
+INDEX_READ_WORKERS = 8
 
 def scan_mods_folder(folder_path):
     """
@@ -30,13 +46,166 @@ def scan_mods_folder(folder_path):
     """
     cc_files = []
     try:
-        for root, dirs, files in os.walk(folder_path):
-            for file in files:
-                if file.lower().endswith(('.package', '.ts4script')):
-                    full_path = os.path.join(root, file)
-                    cc_files.append(full_path)
+        cc_files = [entry.path for entry in walk_files(folder_path, MOD_EXTENSIONS)]
         logging.info(f"{len(cc_files)} Mod-Dateien (.package und .ts4script) im Mods-Ordner gefunden.")
     except Exception as e:
         logging.error(f"Fehler beim Scannen des Mods-Ordners: {e}")
     
     return cc_files
+
+def _init_index_db(conn):
+    conn.executescript('''
+        CREATE TABLE IF NOT EXISTS mod_files (
+            id INTEGER PRIMARY KEY,
+            path TEXT UNIQUE NOT NULL,
+            size INTEGER NOT NULL,
+            mtime_ns INTEGER NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS mod_resources (
+            file_id INTEGER NOT NULL,
+            type INTEGER NOT NULL,
+            grp INTEGER NOT NULL,
+            instance INTEGER NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_mod_resources_instance ON mod_resources (instance);
+        CREATE INDEX IF NOT EXISTS idx_mod_resources_file ON mod_resources (file_id);
+        -- Zähler, der bei jeder Änderung des Index erhöht wird (Abgleich mit abgeleiteten Dateien)
+        CREATE TABLE IF NOT EXISTS mod_index_state (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            generation INTEGER NOT NULL
+        );
+        INSERT OR IGNORE INTO mod_index_state (id, generation) VALUES (1, 0);
+    ''')
+
+def _read_package_keys(file_path):
+    """
+    Liest die Ressourcen-Schlüssel einer .package-Datei.
+
+    Leer bei Script-Mods und defekten Packages; None, wenn die Datei nicht
+    gelesen werden konnte (z.B. gesperrt), damit der nächste Scan es erneut versucht.
+    """
+    if not file_path.lower().endswith('.package'):
+        return []
+    with span('scan.package', file=os.path.basename(file_path)) as package_span:
+        try:
+            with open(file_path, 'rb') as f:
+                # Gelesen werden nur Header und Index
+                header = read_dbpf_header(f)
+                entries = read_dbpf_index(f, header)
+                package_span.add_bytes(HEADER_SIZE + header[4])
+        except OSError as e:
+            logging.warning(f"{file_path} konnte nicht gelesen werden, wird beim nächsten Scan erneut versucht: {e}")
+            return None
+        except (ValueError, struct.error) as e:
+            # Defekte Packages dürfen das Update der übrigen Dateien nicht abbrechen
+            logging.warning(f"Index von {file_path} konnte nicht gelesen werden: {e}")
+            return []
+        package_span.set(resources=len(entries))
+        return [entry.key for entry in entries]
+
+def _is_below(path, roots):
+    return any(path == root or path.startswith(os.path.join(root, '')) for root in roots)
+
+def update_mods_index(folder_path, db_path='simvault_data.db'):
+    """
+    Aktualisiert den persistenten Ressourcen-Index des Mods-Ordners.
+
+    Nur Dateien, deren Größe oder mtime sich seit dem letzten Lauf geändert
+    hat, werden neu gelesen; gelöschte Dateien werden aus dem Index entfernt.
+    Ist der Mods-Ordner selbst nicht lesbar, bleibt der Index unverändert;
+    Einträge unter nicht lesbaren Unterordnern werden nicht entfernt.
+
+    Args:
+        folder_path (str): Pfad zum Sims 4 Mods-Ordner.
+        db_path (str): SQLite-Datenbank (config["database"]["sqlite_path"]).
+
+    Returns:
+        dict: Statistik mit 'files', 'updated' und 'removed'.
+    """
+    # Ein fehlender oder nicht lesbarer Ordner (z.B. nicht eingebundenes Laufwerk) sähe sonst
+    # aus wie ein leerer Mods-Ordner und würde den gesamten Index löschen
+    try:
+        with os.scandir(folder_path):
+            pass
+    except OSError as e:
+        logging.error(f"Mods-Ordner {folder_path} nicht lesbar, Index bleibt unverändert: {e}")
+        conn = sqlite3.connect(db_path)
+        try:
+            _init_index_db(conn)
+            files = conn.execute('SELECT COUNT(*) FROM mod_files').fetchone()[0]
+        finally:
+            conn.close()
+        return {"files": files, "updated": 0, "removed": 0}
+
+    current = {}
+    walk_errors = []
+    for entry in walk_files(folder_path, MOD_EXTENSIONS, errors=walk_errors):
+        stat = entry.stat()
+        current[entry.path] = (stat.st_size, stat.st_mtime_ns)
+
+    conn = sqlite3.connect(db_path)
+    try:
+        _init_index_db(conn)
+        known = {path: (file_id, size, mtime_ns)
+                 for file_id, path, size, mtime_ns
+                 in conn.execute('SELECT id, path, size, mtime_ns FROM mod_files')}
+
+        # Dateien unter nicht lesbaren Unterordnern sind nicht gelöscht, nur nicht sichtbar
+        removed = [known[path][0] for path in known.keys() - current.keys()
+                   if not _is_below(path, walk_errors)]
+        changed = [path for path, stat in current.items()
+                   if path not in known or known[path][1:] != stat]
+
+        with ThreadPoolExecutor(max_workers=INDEX_READ_WORKERS) as executor:
+            changed_keys = executor.map(_read_package_keys, changed)
+
+            failed = 0
+            with conn:
+                conn.executemany('DELETE FROM mod_resources WHERE file_id = ?', ((i,) for i in removed))
+                conn.executemany('DELETE FROM mod_files WHERE id = ?', ((i,) for i in removed))
+                for path, keys in zip(changed, changed_keys):
+                    if keys is None:
+                        # Alte Größe/mtime und Ressourcen behalten → beim nächsten Scan erneut lesen
+                        failed += 1
+                        continue
+                    size, mtime_ns = current[path]
+                    if path in known:
+                        file_id = known[path][0]
+                        conn.execute('UPDATE mod_files SET size = ?, mtime_ns = ? WHERE id = ?',
+                                     (size, mtime_ns, file_id))
+                        conn.execute('DELETE FROM mod_resources WHERE file_id = ?', (file_id,))
+                    else:
+                        file_id = conn.execute('INSERT INTO mod_files (path, size, mtime_ns) VALUES (?, ?, ?)',
+                                               (path, size, mtime_ns)).lastrowid
+                    conn.executemany(
+                        'INSERT INTO mod_resources (file_id, type, grp, instance) VALUES (?, ?, ?, ?)',
+                        ((file_id, key.type, key.group, to_signed64(key.instance)) for key in keys))
+                if removed or len(changed) > failed:
+                    conn.execute('UPDATE mod_index_state SET generation = generation + 1 WHERE id = 1')
+    finally:
+        conn.close()
+
+    updated = len(changed) - failed
+    logging.info(f"Mods-Index aktualisiert: {len(current)} Dateien, "
+                 f"{updated} neu eingelesen, {failed} nicht lesbar, {len(removed)} entfernt.")
+    return {"files": len(current), "updated": updated, "removed": len(removed)}
+
+def load_index_generation(db_path='simvault_data.db'):
+    """Liefert den Änderungszähler des Mods-Index (steigt bei jeder Aktualisierung mit Änderungen)."""
+    conn = sqlite3.connect(db_path)
+    try:
+        _init_index_db(conn)
+        return conn.execute('SELECT generation FROM mod_index_state WHERE id = 1').fetchone()[0]
+    finally:
+        conn.close()
+
+def load_installed_instances(db_path='simvault_data.db'):
+    """Liefert die Instance-IDs aller installierten Ressourcen aus dem Mods-Index (uint64-Array)."""
+    conn = sqlite3.connect(db_path)
+    try:
+        _init_index_db(conn)
+        rows = conn.execute('SELECT DISTINCT instance FROM mod_resources')
+        # Vorzeichenbehaftete SQLite-Werte bitgleich als uint64 interpretieren
+        return np.fromiter((instance for (instance,) in rows), dtype=np.int64).view(np.uint64)
+    finally:
+        conn.close()
@@ -0,0 +1,287 @@
+# Modul: pipeline.py
+# Funktion: Orchestriert die SimVault-Stufen nebenläufig und mit Zwischenergebnis-Cache
+
+# Aufgaben:
+# - Savegame-Analyse und Mods-Scan gleichzeitig ausführen (voneinander unabhängig)
+# - Fehlende IDs je fertigem Savegame sofort an die Suche weiterreichen, statt auf die
+#   vollständige Fehlliste zu warten
+# - Fehlende IDs zuerst im lokalen Katalog auflösen (cc_catalog); nur der Rest geht ins Netz
+# - Stufenergebnisse anhand von Eingabe-Fingerprints (Dateigröße/mtime, Konfiguration) speichern,
+#   damit unveränderte Savegames und vorhandene Berichtsdateien bei erneuten Läufen übersprungen werden
+#   (der Lauf selbst wird immer in der Datenbank gespeichert)
+# - Alle Pfade aus der Konfiguration (config.load_config)
+
+# Strukturvorschlag:
+# - Klasse: StageCache(db_path)
+#   - get(stage, key, fingerprint) / put(stage, key, fingerprint, value) / prune(stage, keep_keys)
+# - Funktion: fingerprint(*parts) → SHA256 über die Eingaben einer Stufe
+# - Funktion: analyze_savegames(config) → {CC-ID: Savegames}, nur die Analyse-Stufe (CLI: analyze)
+# - Funktion: run_pipeline(config) → {"cc_sources", "missing_cc", "alternatives"}
+
+import os
+import json
+import queue
+import sqlite3
+import hashlib
+import logging
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from instrumentation import span
+
+# Bei Änderungen an der Analyse erhöhen, damit gespeicherte Ergebnisse verworfen werden
+ANALYZER_CACHE_VERSION = 1
+
+def fingerprint(*parts):
+    """SHA256 über JSON-serialisierbare Eingaben einer Stufe."""
+    return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+class StageCache:
+    """Persistente Zwischenergebnisse je (Stufe, Schlüssel), gültig solange der Fingerprint passt."""
+
+    def __init__(self, db_path='pipeline_cache.db'):
+        self.conn = sqlite3.connect(db_path)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS stage_cache (
+                stage TEXT NOT NULL,
+                key TEXT NOT NULL,
+                fingerprint TEXT NOT NULL,
+                value BLOB,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (stage, key)
+            ) WITHOUT ROWID
+        ''')
+
+    def get(self, stage, key, fingerprint):
+        """Gespeicherter Wert oder None, wenn keiner existiert oder sich die Eingaben geändert haben."""
+        row = self.conn.execute('SELECT fingerprint, value FROM stage_cache WHERE stage = ? AND key = ?',
+                                (stage, key)).fetchone()
+        if row is None or row[0] != fingerprint:
+            return None
+        return row[1]
+
+    def put(self, stage, key, fingerprint, value):
+        with self.conn:
+            self.conn.execute('''
+                INSERT OR REPLACE INTO stage_cache (stage, key, fingerprint, value, updated_at) VALUES (?, ?, ?, ?, ?)
+            ''', (stage, key, fingerprint, value, time.time()))
+
+    def prune(self, stage, keep_keys):
+        """Entfernt Einträge einer Stufe, deren Schlüssel nicht mehr vorkommen (z.B. gelöschte Savegames)."""
+        keep_keys = set(keep_keys)
+        stale = [(stage, key) for (key,) in self.conn.execute('SELECT key FROM stage_cache WHERE stage = ?', (stage,))
+                 if key not in keep_keys]
+        with self.conn:
+            self.conn.executemany('DELETE FROM stage_cache WHERE stage = ? AND key = ?', stale)
+
+    def close(self):
+        self.conn.close()
+
+def _scan_stage(config, db_path):
+    from mod_folder_scanner import update_mods_index
+    from cc_membership import load_installed_key_set
+    from cc_catalog import LocalCatalog
+
+    with span('scan') as stage:
+        index_stats = update_mods_index(config["mods_folder"], db_path)
+        # Set nur neu aufbauen, wenn der Mods-Index sich geändert hat
+        installed = load_installed_key_set(db_path, rebuild=bool(index_stats["updated"] or index_stats["removed"]))
+        if config.get("pipeline", {}).get("local_catalog", True):
+            # Vor dem nächsten Scan übernehmen, damit entfernte Packages im Katalog bleiben
+            catalog = LocalCatalog(db_path)
+            try:
+                catalog.refresh()
+            finally:
+                catalog.close()
+        stage.set(**index_stats)
+    return installed
+
+def _iter_savegame_ids(file_paths, stage_cache, unaligned):
+    """Liefert (Pfad, uint64-Array): zuerst unveränderte Savegames aus dem Cache, dann neu analysierte."""
+    from savegame_analyzer import iter_analyze_savegames
+
+    to_analyze = {}
+    for path in file_paths:
+        try:
+            stat = os.stat(path)
+        except OSError as e:
+            logging.error(f"Savegame {path} nicht lesbar: {e}")
+            continue
+        file_fingerprint = fingerprint(ANALYZER_CACHE_VERSION, stat.st_size, stat.st_mtime_ns, unaligned)
+        cached = stage_cache.get('analyze', path, file_fingerprint)
+        if cached is not None:
+            yield path, np.frombuffer(cached, dtype=np.uint64)
+        else:
+            to_analyze[path] = file_fingerprint
+    if to_analyze:
+        for path, id_array in iter_analyze_savegames(list(to_analyze), unaligned=unaligned):
+            stage_cache.put('analyze', path, to_analyze[path], id_array.astype(np.uint64).tobytes())
+            yield path, id_array
+    logging.info(f"{len(file_paths) - len(to_analyze)} Savegames unverändert (Cache), "
+                 f"{len(to_analyze)} neu analysiert.")
+
+def analyze_savegames(config):
+    """
+    Führt nur die Savegame-Analyse aus, mit demselben Zwischenergebnis-Cache wie run_pipeline.
+
+    Returns:
+        dict: {CC-ID (hex): sortierte Liste der Savegame-Namen}
+    """
+    from savegame_analyzer import find_savegames, merge_savegame_ids, sources_as_hex
+
+    unaligned = config.get("pipeline", {}).get("unaligned_scan", False)
+    file_paths = find_savegames(config["savegames_folder"])
+    stage_cache = StageCache(config.get("pipeline", {}).get("cache_path", "pipeline_cache.db"))
+    sources = {}
+    try:
+        with span('analyze') as stage:
+            for _ in merge_savegame_ids(_iter_savegame_ids(file_paths, stage_cache, unaligned), sources):
+                pass
+            stage.set(cc_ids=len(sources))
+        stage_cache.prune('analyze', file_paths)
+    finally:
+        stage_cache.close()
+    return sources_as_hex(sources)
+
+def _analyze_stage(config, db_path, stage_cache, scan_future, incoming):
+    """
+    Analysiert die Savegames und reicht fehlende IDs je Savegame an die Suche weiter.
+
+    IDs, die der lokale Katalog auflöst, werden nicht gesucht; archivierte Dateien und
+    abgelaufene Suchtreffer werden nur als Hinweise mitgegeben.
+
+    Returns:
+        tuple: ({CC-ID (hex): Savegame-Namen}, sortierte Liste fehlender IDs als Hex,
+        {CC-ID (hex): Alternativen} der lokal aufgelösten IDs, {CC-ID (hex): Alternativen}
+        als Hinweise für online gesuchte IDs)
+    """
+    from savegame_analyzer import find_savegames, merge_savegame_ids, sources_as_hex
+    from cc_catalog import LocalCatalog, split_resolved
+    from search_cache import DEFAULT_TTL
+
+    unaligned = config.get("pipeline", {}).get("unaligned_scan", False)
+    use_catalog = config.get("pipeline", {}).get("local_catalog", True)
+    ttl = config.get("search_cache", {}).get("ttl_hours", DEFAULT_TTL / 3600) * 3600
+    file_paths = find_savegames(config["savegames_folder"])
+    sources = {}
+    missing = set()
+    local = {}
+    hints = {}
+    installed = None
+    catalog = None
+    try:
+        with span('analyze') as stage:
+            for path, id_array in merge_savegame_ids(_iter_savegame_ids(file_paths, stage_cache, unaligned), sources):
+                name = os.path.basename(path)
+                if installed is None:
+                    # Wartet nur beim ersten Savegame auf den parallel laufenden Mods-Scan
+                    installed = scan_future.result()
+                    if use_catalog:
+                        catalog = LocalCatalog(db_path)
+                with span('diff', file=name):
+                    new_missing = [cc_id for cc_id in installed.missing(id_array).tolist() if cc_id not in missing]
+                if not new_missing:
+                    continue
+                missing.update(new_missing)
+                unresolved = [hex(cc_id) for cc_id in new_missing]
+                if catalog is not None:
+                    resolved, new_hints, unresolved = split_resolved(catalog, unresolved, ttl)
+                    local.update(resolved)
+                    hints.update(new_hints)
+                if unresolved:
+                    incoming.put(unresolved)
+            stage.set(cc_ids=len(sources), missing=len(missing), resolved_locally=len(local))
+    finally:
+        if catalog is not None:
+            catalog.close()
+    stage_cache.prune('analyze', file_paths)
+    if local:
+        logging.info(f"{len(local)} von {len(missing)} fehlenden IDs lokal aufgelöst, "
+                     f"{len(missing) - len(local)} werden online gesucht.")
+    return sources_as_hex(sources), [hex(cc_id) for cc_id in sorted(missing)], local, hints
+
+def _search_stage(config, db_path, scan_future, incoming, stop):
+    from cc_searcher import search_alternatives
+    from search_cache import cache_from_config
+    from search_queue import SearchQueue
+
+    # Fehlende IDs gibt es erst nach dem Scan; bis dahin nicht parallel in dieselbe Datenbank schreiben
+    scan_future.result()
+    with span('search'):
+        search_cache = cache_from_config(config)
+        try:
+            search_queue = SearchQueue(db_path, search_cache.ttl, search_cache.negative_ttl)
+            try:
+                return search_alternatives([], queue=search_queue, cache=search_cache, incoming=incoming,
+                                           stop=stop)
+            finally:
+                search_queue.close()
+        finally:
+            search_cache.close()
+
+def _report_stage(config, db_path, missing_cc, cc_alternatives, stage_cache):
+    from report_generator import generate_report, generate_delta_report, write_report
+
+    report_mode = config.get("report_mode", "full")
+    formats = config.get("report_formats")
+    with span('report', mode=report_mode) as stage:
+        if report_mode == "delta":
+            # Delta-Berichte schreiben ohnehin nur Änderungen
+            generate_delta_report(missing_cc, cc_alternatives, db_path=db_path, formats=formats)
+            return
+        report_fingerprint = fingerprint(formats, db_path, missing_cc,
+                                         [cc_alternatives.get(cc_id, []) for cc_id in missing_cc])
+        # Gespeichert sind die Pfade des zuletzt geschriebenen Berichts
+        cached = stage_cache.get('report', 'full', report_fingerprint)
+        paths = json.loads(cached) if cached else {}
+        if paths and all(map(os.path.exists, paths.values())):
+            logging.info("Fehlende CCs und Suchergebnisse unverändert, Berichtsdateien werden nicht neu erstellt.")
+            # Der Lauf gehört trotzdem in die Verlaufsdaten (runs/cc_items)
+            write_report(((cc_id, cc_alternatives.get(cc_id, [])) for cc_id in missing_cc),
+                         db_path=db_path, formats=[])
+            stage.set(cached=True)
+            return
+        paths = generate_report(missing_cc, cc_alternatives, db_path=db_path, formats=formats)
+        stage_cache.put('report', 'full', report_fingerprint, json.dumps(paths).encode('utf-8'))
+
+def run_pipeline(config):
+    """
+    Führt Analyse, Scan, Abgleich, Suche und Bericht aus.
+
+    Savegame-Analyse und Mods-Scan laufen gleichzeitig; die Suche startet
+    mit den fehlenden IDs des ersten fertigen Savegames und erhält weitere
+    IDs, sobald andere Savegames fertig analysiert sind. Was der lokale
+    Katalog auflöst, wird nicht online gesucht.
+
+    Returns:
+        dict: {"cc_sources", "missing_cc", "alternatives"}
+    """
+    from cc_catalog import merge_hints
+
+    db_path = config["database"]["sqlite_path"]
+    stage_cache = StageCache(config.get("pipeline", {}).get("cache_path", "pipeline_cache.db"))
+    try:
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            incoming = queue.Queue()
+            stop_search = threading.Event()
+            scan_future = executor.submit(_scan_stage, config, db_path)
+            search_future = executor.submit(_search_stage, config, db_path, scan_future, incoming, stop_search)
+            try:
+                cc_sources, missing_cc, local, hints = _analyze_stage(config, db_path, stage_cache, scan_future, incoming)
+                # Mods-Scan auch ohne Savegames abschließen (und dessen Fehler melden)
+                scan_future.result()
+            except BaseException:
+                # Fehler sofort melden, statt erst die bereits eingereihten Suchaufträge abzuarbeiten
+                stop_search.set()
+                raise
+            finally:
+                incoming.put(None)
+            cc_alternatives = {**merge_hints(search_future.result(), hints), **local}
+        _report_stage(config, db_path, missing_cc, cc_alternatives, stage_cache)
+    finally:
+        stage_cache.close()
+    return {"cc_sources": cc_sources, "missing_cc": missing_cc, "alternatives": cc_alternatives}
@@ -23,6 +23,13 @@
 
 # Strukturvorschlag:
 # - Funktion: generate_report(missing_cc, cc_alternatives) → Erstellt HTML, CSV, JSON, Markdown Berichte und speichert zusätzlich in einer SQLite-Datenbank
+# - Funktion: write_report(records, formats) → Single-Pass: jeder (ID, Alternativen)-Datensatz wird
+#   genau einmal gelesen und an alle Format-Sinks verteilt (konstanter Speicher, auch für Streams)
+# - Klassen: HtmlSink, CsvSink, JsonSink, MarkdownSink, SqliteSink (Registry: REPORT_SINKS)
+# - Datenbank-Speicherung: report_storage.ReportStore (versioniert je Lauf)
+# - Funktion: generate_delta_report(missing_cc, cc_alternatives) → nur hinzugekommene, gelöste und
+#   geänderte Einträge gegenüber dem vorherigen Lauf; rollierender Gesamtbericht report_latest.*
+#   wird in SQLite um diese Änderungen fortgeschrieben und bei Änderungen daraus gerendert
 
 # Anmerkung:
 # - MySQL- oder PostgreSQL-Support wird als **separates Plugin für Fortgeschrittene** implementiert.
@@ -30,73 +37,269 @@
 import os
 import json
 import csv
-import sqlite3
+import time
 from datetime import datetime
 
-def generate_report(missing_cc, cc_alternatives, output_dir='reports', db_path='simvault_data.db'):
+from report_storage import ReportStore, INSERT_BATCH_SIZE
+from instrumentation import record, tracing_enabled
+
+def _links(alternatives):
+    """Alternativen als Link-Liste ({Seite: URL} oder Liste von URLs)."""
+    if isinstance(alternatives, dict):
+        return list(alternatives.values())
+    return list(alternatives)
+
+class HtmlSink:
+    extension = 'html'
+
+    def __init__(self, path):
+        self.f = open(path, 'w', encoding='utf-8')
+        self.f.write("<html><head><title>SimVault Report</title>")
+        self.f.write('<link href="https://cdn.jsdelivr.net/npm/bootstrap@5.3.0/dist/css/bootstrap.min.css" rel="stylesheet"></head><body>')
+        self.f.write("<div class='container'><h1>Missing CC Report</h1><table class='table table-striped'>")
+        self.f.write("<thead><tr><th>ID</th><th>Alternative Sources</th></tr></thead><tbody>")
+
+    def write(self, cc_id, alternatives):
+        alt_links = ' | '.join(f"<a href='{link}' target='_blank'>{link}</a>" for link in _links(alternatives))
+        self.f.write(f"<tr><td>{cc_id}</td><td>{alt_links}</td></tr>")
+
+    def close(self):
+        self.f.write("</tbody></table></div></body></html>")
+        self.f.close()
+
+class CsvSink:
+    extension = 'csv'
+
+    def __init__(self, path):
+        self.f = open(path, 'w', newline='', encoding='utf-8')
+        self.writer = csv.writer(self.f)
+        self.writer.writerow(['ID', 'Alternative Sources'])
+
+    def write(self, cc_id, alternatives):
+        self.writer.writerow([cc_id, ', '.join(_links(alternatives))])
+
+    def close(self):
+        self.f.close()
+
+_json_string = json.JSONEncoder(ensure_ascii=False).encode
+
+def _json_value(value):
+    """
+    Kodiert Alternativen wie json.dump(indent=4) auf Ebene 1.
+
+    Listen und Dicts aus Strings werden direkt zusammengesetzt, da indent
+    sonst den langsamen Python-Encoder erzwingt.
+    """
+    if isinstance(value, list) and all(isinstance(item, str) for item in value):
+        if not value:
+            return '[]'
+        return '[\n        ' + ',\n        '.join(map(_json_string, value)) + '\n    ]'
+    if isinstance(value, dict) and all(isinstance(k, str) and isinstance(v, str) for k, v in value.items()):
+        if not value:
+            return '{}'
+        return '{\n        ' + ',\n        '.join(f"{_json_string(k)}: {_json_string(v)}"
+                                                  for k, v in value.items()) + '\n    }'
+    return json.dumps(value, indent=4, ensure_ascii=False).replace('\n', '\n    ')
+
+class JsonSink:
+    """Schreibt das JSON-Objekt inkrementell, ohne es im Speicher aufzubauen."""
+    extension = 'json'
+
+    def __init__(self, path):
+        self.f = open(path, 'w', encoding='utf-8')
+        self.f.write('{')
+        self.first = True
+
+    def write(self, cc_id, alternatives):
+        self.f.write(f"{'' if self.first else ','}\n    {_json_string(cc_id)}: {_json_value(alternatives)}")
+        self.first = False
+
+    def close(self):
+        self.f.write('}' if self.first else '\n}')
+        self.f.close()
+
+class MarkdownSink:
+    extension = 'md'
+
+    def __init__(self, path):
+        self.f = open(path, 'w', encoding='utf-8')
+        self.f.write("# SimVault Missing CC Report\n\n")
+        self.f.write("| ID | Alternative Sources |\n")
+        self.f.write("|----|---------------------|\n")
+
+    def write(self, cc_id, alternatives):
+        alt_links = ', '.join(_links(alternatives))
+        self.f.write(f"| {cc_id} | {alt_links} |\n")
+
+    def close(self):
+        self.f.close()
+
+class SqliteSink:
+    """Speichert den Lauf versioniert über report_storage (gebündelte Inserts, WAL)."""
+
+    def __init__(self, db_path, timestamp):
+        self.store = ReportStore(db_path)
+        self.run_id = self.store.begin_run(timestamp)
+        self.buffer = []
+
+    def write(self, cc_id, alternatives):
+        self.buffer.append((cc_id, alternatives))
+        if len(self.buffer) >= INSERT_BATCH_SIZE:
+            self.store.add_items(self.run_id, self.buffer)
+            self.buffer = []
+
+    def close(self):
+        self.store.add_items(self.run_id, self.buffer)
+        self.store.close()
+
+class _TimedSink:
+    """Misst die Schreibzeit eines Sinks (nur bei aktiver Instrumentierung) und meldet sie beim Schließen."""
+
+    def __init__(self, sink, report_format, path):
+        self.sink = sink
+        self.report_format = report_format
+        self.path = path
+        self.seconds = 0.0
+        self.rows = 0
+
+    def write(self, cc_id, alternatives):
+        start = time.perf_counter()
+        self.sink.write(cc_id, alternatives)
+        self.seconds += time.perf_counter() - start
+        self.rows += 1
+
+    def close(self):
+        start = time.perf_counter()
+        self.sink.close()
+        self.seconds += time.perf_counter() - start
+        size = os.path.getsize(self.path) if self.path and os.path.exists(self.path) else 0
+        record('report.format', self.seconds, size, format=self.report_format, rows=self.rows)
+
+# Format-Name (wie in config["report_formats"]) → Sink-Klasse; weitere Formate hier registrieren
+REPORT_SINKS = {
+    "html": HtmlSink,
+    "csv": CsvSink,
+    "json": JsonSink,
+    "md": MarkdownSink,
+}
+
+DEFAULT_REPORT_FORMATS = ["html", "csv", "json", "md"]
+
+def report_paths(output_dir, name, formats=None):
+    """Pfade der Berichtsdateien je Format (Format → Pfad), ohne sie zu schreiben."""
+    formats = DEFAULT_REPORT_FORMATS if formats is None else formats
+    paths = {}
+    for report_format in formats:
+        sink_class = REPORT_SINKS.get(report_format)
+        if sink_class is None:
+            raise ValueError(f"Unbekanntes Berichtsformat: {report_format}")
+        paths[report_format] = os.path.join(output_dir, f'{name}.{sink_class.extension}')
+    return paths
+
+def write_report(records, output_dir='reports', db_path='simvault_data.db', formats=None, name=None):
+    """
+    Schreibt alle Berichte in einem einzigen Durchlauf über records.
+
+    Args:
+        records (iterable): (cc_id, alternatives)-Paare, auch als Generator.
+        output_dir (str): Zielordner der Berichtsdateien.
+        db_path (str): SQLite-Datenbank oder None, um die DB-Speicherung auszulassen.
+        formats (list): Formate aus REPORT_SINKS (config["report_formats"]).
+        name (str): Dateiname ohne Endung, Standard: report_<Zeitstempel>.
+
+    Returns:
+        dict: Format → geschriebener Pfad.
+    """
     os.makedirs(output_dir, exist_ok=True)
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    formats = DEFAULT_REPORT_FORMATS if formats is None else formats
+    paths = report_paths(output_dir, name or f'report_{timestamp}', formats)
 
-    # 1. HTML Export
-    html_path = os.path.join(output_dir, f'report_{timestamp}.html')
-    with open(html_path, 'w', encoding='utf-8') as f:
-        f.write("<html><head><title>SimVault Report</title>")
-        f.write('<link href="https://cdn.jsdelivr.net/npm/bootstrap@5.3.0/dist/css/bootstrap.min.css" rel="stylesheet"></head><body>')
-        f.write("<div class='container'><h1>Missing CC Report</h1><table class='table table-striped'>")
-        f.write("<thead><tr><th>ID</th><th>Alternative Sources</th></tr></thead><tbody>")
-        for cc_id in missing_cc:
-            alternatives = cc_alternatives.get(cc_id, [])
-            alt_links = ' | '.join(f"<a href='{link}' target='_blank'>{link}</a>" for link in alternatives)
-            f.write(f"<tr><td>{cc_id}</td><td>{alt_links}</td></tr>")
-        f.write("</tbody></table></div></body></html>")
-
-    # 2. CSV Export
-    csv_path = os.path.join(output_dir, f'report_{timestamp}.csv')
-    with open(csv_path, 'w', newline='', encoding='utf-8') as f:
-        writer = csv.writer(f)
-        writer.writerow(['ID', 'Alternative Sources'])
-        for cc_id in missing_cc:
-            alternatives = cc_alternatives.get(cc_id, [])
-            writer.writerow([cc_id, ', '.join(alternatives)])
-
-    # 3. JSON Export
-    json_path = os.path.join(output_dir, f'report_{timestamp}.json')
-    with open(json_path, 'w', encoding='utf-8') as f:
-        data = {cc_id: cc_alternatives.get(cc_id, []) for cc_id in missing_cc}
-        json.dump(data, f, indent=4, ensure_ascii=False)
-
-    # 4. Markdown Export
-    md_path = os.path.join(output_dir, f'report_{timestamp}.md')
-    with open(md_path, 'w', encoding='utf-8') as f:
-        f.write("# SimVault Missing CC Report\n\n")
-        f.write("| ID | Alternative Sources |\n")
-        f.write("|----|---------------------|\n")
-        for cc_id in missing_cc:
-            alternatives = cc_alternatives.get(cc_id, [])
-            alt_links = ', '.join(alternatives)
-            f.write(f"| {cc_id} | {alt_links} |\n")
-
-    # 5. SQLite Export
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS missing_cc (
-            id TEXT PRIMARY KEY,
-            alternatives TEXT,
-            timestamp TEXT
-        )
-    ''')
-    for cc_id in missing_cc:
-        alternatives = ', '.join(cc_alternatives.get(cc_id, []))
-        cursor.execute('''
-            INSERT OR REPLACE INTO missing_cc (id, alternatives, timestamp)
-            VALUES (?, ?, ?)
-        ''', (cc_id, alternatives, timestamp))
-    conn.commit()
-    conn.close()
+    sinks = []
+    # (Format, Pfad) je Sink in derselben Reihenfolge, damit die Messwerte richtig beschriftet sind
+    labels = []
+    try:
+        for report_format, path in paths.items():
+            sinks.append(REPORT_SINKS[report_format](path))
+            labels.append((report_format, path))
+        if db_path:
+            sinks.append(SqliteSink(db_path, timestamp))
+            labels.append(('sqlite', None))
+        if tracing_enabled():
+            sinks = [_TimedSink(sink, report_format, path)
+                     for sink, (report_format, path) in zip(sinks, labels)]
+
+        for cc_id, alternatives in records:
+            for sink in sinks:
+                sink.write(cc_id, alternatives)
+    finally:
+        for sink in sinks:
+            sink.close()
+    return paths
+
+def generate_report(missing_cc, cc_alternatives, output_dir='reports', db_path='simvault_data.db', formats=None):
+    """Schreibt den vollständigen Bericht und speichert den Lauf; gibt Format → Pfad zurück."""
+    records = ((cc_id, cc_alternatives.get(cc_id, [])) for cc_id in missing_cc)
+    paths = write_report(records, output_dir, db_path, formats)
 
     print(f"Reports generated successfully in '{output_dir}' and saved to database '{db_path}'.")
 
     # Hinweis:
     # Für Profi-User: MySQL-Support könnte später als Plugin eingebaut werden.
     # -> Einfach einen weiteren Database Adapter schreiben!
+    return paths
+
+def _canonical(alternatives):
+    return json.dumps(alternatives, sort_keys=True, ensure_ascii=False)
+
+def generate_delta_report(missing_cc, cc_alternatives, output_dir='reports', db_path='simvault_data.db', formats=None):
+    """
+    Erstellt einen Delta-Bericht gegenüber dem vorherigen Lauf in der Datenbank.
+
+    Der Lauf wird wie bei generate_report vollständig gespeichert (runs/cc_items),
+    damit Verlaufsabfragen und der nächste Vergleich ihn sehen. Der Vergleich mit
+    dem vorherigen Lauf läuft in SQLite; delta_<Zeitstempel>.json enthält nur
+    added, changed und resolved. Der rollierende Gesamtbericht liegt in SQLite
+    (report_latest) und wird nur um diese Änderungen fortgeschrieben; die Dateien
+    report_latest.* werden daraus nur gerendert, wenn sich etwas geändert hat oder
+    eine von ihnen fehlt.
+
+    Returns:
+        dict: Anzahl 'added', 'changed' und 'resolved'.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    store = ReportStore(db_path)
+    try:
+        previous_runs = store.last_runs(1)
+        run_id = store.begin_run(timestamp)
+        # missing_cc darf ein Generator sein: einmal durchlaufen und direkt in SQLite streamen
+        store.add_items(run_id, ((cc_id, cc_alternatives.get(cc_id, [])) for cc_id in missing_cc))
+        if previous_runs:
+            added, changed, resolved = store.run_delta(run_id, previous_runs[0])
+        else:
+            added, changed, resolved = store.run_ids(run_id), [], []
+        added = {cc_id: cc_alternatives.get(cc_id, []) for cc_id in added}
+        changed = {cc_id: cc_alternatives.get(cc_id, []) for cc_id in changed}
+
+        # Gibt der rollierende Bericht nicht den vorherigen Lauf wieder (erster Delta-Lauf oder
+        # zwischenzeitlicher Voll-Lauf), wird er einmalig aus dem aktuellen Lauf neu aufgebaut
+        rebuilt = not previous_runs or store.latest_run() != previous_runs[0]
+        if rebuilt:
+            store.reset_latest(run_id, ((cc_id, _canonical(cc_alternatives.get(cc_id, [])))
+                                        for cc_id in store.run_ids(run_id)))
+        store.record_changes(run_id, {cc_id: _canonical(value) for cc_id, value in added.items()},
+                             {cc_id: _canonical(value) for cc_id, value in changed.items()}, resolved)
+
+        if added or changed or resolved:
+            delta = {"run_id": run_id, "added": added, "changed": changed, "resolved": resolved}
+            with open(os.path.join(output_dir, f'delta_{timestamp}.json'), 'w', encoding='utf-8') as f:
+                json.dump(delta, f, indent=4, ensure_ascii=False)
+        latest_paths = report_paths(output_dir, 'report_latest', formats)
+        if added or changed or resolved or rebuilt or not all(map(os.path.exists, latest_paths.values())):
+            write_report(store.latest_items(), output_dir, None, formats, name='report_latest')
+    finally:
+        store.close()
+
+    print(f"Delta report: {len(added)} added, {len(changed)} changed, {len(resolved)} resolved.")
+    return {"added": len(added), "changed": len(changed), "resolved": len(resolved)}
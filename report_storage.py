@@ -0,0 +1,233 @@
+# Modul: report_storage.py
+# Funktion: Versionierte SQLite-Speicherung der Berichte (ein Datensatz je Analyselauf)
+
+# Aufgaben:
+# - WAL-Modus und gebündelte, transaktionale Inserts (executemany)
+# - Normalisierte Tabellen: runs, cc_items, alternatives (mit Indizes)
+# - CC-IDs als INTEGER statt Hex-Text (kompakter, deutlich schnellere Inserts)
+# - Historie bleibt erhalten: jeder Lauf bekommt eine eigene run_id
+# - Kleine Abfrage-API, z.B. "in den letzten N Läufen fehlende IDs" oder "Quellen je Seite"
+
+# Strukturvorschlag:
+# - Klasse: ReportStore(db_path)
+#   - begin_run() → run_id
+#   - add_items(run_id, records) → (cc_id, Alternativen)-Datensätze gebündelt speichern
+#   - last_runs(n), missing_in_last_runs(n), sources_per_site(run_id), run_ids(run_id), run_items(run_id)
+#   - run_delta(run_id, previous_run_id) / record_changes(...) → Vergleich zweier Läufe für Delta-Berichte
+#   - latest_run() / reset_latest(...) / latest_items() → rollierender Gesamtbericht, per Delta fortgeschrieben
+
+import json
+import sqlite3
+from datetime import datetime
+
+from dbpf_reader import to_hex, to_signed64
+
+# Zeilen pro executemany-Aufruf
+INSERT_BATCH_SIZE = 10000
+
+def connect(db_path):
+    """Öffnet die Datenbank im WAL-Modus (parallele Leser, schnelle Schreibvorgänge)."""
+    conn = sqlite3.connect(db_path)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    return conn
+
+class ReportStore:
+    """Speichert fehlende CC-IDs und ihre Alternativen je Lauf und beantwortet Abfragen darauf."""
+
+    def __init__(self, db_path='simvault_data.db'):
+        self.conn = connect(db_path)
+        self.conn.executescript('''
+            CREATE TABLE IF NOT EXISTS runs (
+                id INTEGER PRIMARY KEY,
+                timestamp TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS cc_items (
+                id INTEGER PRIMARY KEY,
+                run_id INTEGER NOT NULL REFERENCES runs (id),
+                cc_id INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS alternatives (
+                item_id INTEGER NOT NULL REFERENCES cc_items (id),
+                site TEXT,
+                url TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS report_changes (
+                run_id INTEGER NOT NULL REFERENCES runs (id),
+                cc_id INTEGER NOT NULL,
+                change TEXT NOT NULL,
+                alternatives TEXT
+            );
+            -- Rollierender Gesamtbericht: Stand nach dem Lauf in report_latest_state
+            CREATE TABLE IF NOT EXISTS report_latest (
+                cc_id INTEGER PRIMARY KEY,
+                alternatives TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS report_latest_state (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                run_id INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_cc_items_run ON cc_items (run_id);
+            CREATE INDEX IF NOT EXISTS idx_report_changes_run ON report_changes (run_id);
+            CREATE INDEX IF NOT EXISTS idx_alternatives_item ON alternatives (item_id);
+            CREATE INDEX IF NOT EXISTS idx_alternatives_site ON alternatives (site);
+        ''')
+
+    def begin_run(self, timestamp=None):
+        """Legt einen neuen Lauf an und gibt dessen run_id zurück."""
+        timestamp = timestamp or datetime.now().strftime("%Y%m%d_%H%M%S")
+        with self.conn:
+            return self.conn.execute('INSERT INTO runs (timestamp) VALUES (?)', (timestamp,)).lastrowid
+
+    def add_items(self, run_id, records):
+        """
+        Speichert (cc_id, Alternativen)-Datensätze gebündelt in einer Transaktion.
+
+        cc_id ist die Hex-ID (z.B. '0x8000…'); Alternativen sind {Seite: URL}
+        oder eine Liste von URLs (Seite = NULL).
+        """
+        items = []
+        links = []
+        with self.conn:
+            # Schreibsperre vor dem Lesen der höchsten ID, sonst vergeben zwei Schreiber dieselben IDs
+            self.conn.execute('BEGIN IMMEDIATE')
+            item_id = self.conn.execute('SELECT COALESCE(MAX(id), 0) FROM cc_items').fetchone()[0]
+            for cc_id, alternatives in records:
+                # IDs fortlaufend selbst vergeben, damit alternatives ohne Rückfrage referenzieren kann
+                item_id += 1
+                items.append((item_id, run_id, to_signed64(int(cc_id, 16))))
+                if isinstance(alternatives, dict):
+                    links.extend((item_id, site, url) for site, url in alternatives.items())
+                else:
+                    links.extend((item_id, None, url) for url in alternatives)
+                if len(items) >= INSERT_BATCH_SIZE:
+                    self._flush(items, links)
+            self._flush(items, links)
+
+    def _flush(self, items, links):
+        self.conn.executemany('INSERT INTO cc_items (id, run_id, cc_id) VALUES (?, ?, ?)', items)
+        self.conn.executemany('INSERT INTO alternatives (item_id, site, url) VALUES (?, ?, ?)', links)
+        items.clear()
+        links.clear()
+
+    def last_runs(self, n=1):
+        """Gibt die run_ids der letzten n Läufe zurück (neueste zuerst)."""
+        return [run_id for (run_id,) in self.conn.execute('SELECT id FROM runs ORDER BY id DESC LIMIT ?', (n,))]
+
+    def missing_in_last_runs(self, n):
+        """IDs, die in jedem der letzten n Läufe gefehlt haben."""
+        run_ids = self.last_runs(n)
+        if not run_ids:
+            return []
+        placeholders = ', '.join('?' * len(run_ids))
+        rows = self.conn.execute(f'''
+            SELECT cc_id FROM cc_items WHERE run_id IN ({placeholders})
+            GROUP BY cc_id HAVING COUNT(DISTINCT run_id) = ?
+        ''', [*run_ids, len(run_ids)])
+        return sorted((to_hex(cc_id) for (cc_id,) in rows), key=lambda cc_id: int(cc_id, 16))
+
+    def sources_per_site(self, run_id=None):
+        """Anzahl gefundener Quellen je Seite für einen Lauf (Standard: letzter Lauf)."""
+        if run_id is None:
+            run_ids = self.last_runs(1)
+            if not run_ids:
+                return {}
+            run_id = run_ids[0]
+        rows = self.conn.execute('''
+            SELECT a.site, COUNT(*) FROM alternatives a JOIN cc_items i ON i.id = a.item_id
+            WHERE i.run_id = ? GROUP BY a.site ORDER BY COUNT(*) DESC
+        ''', (run_id,))
+        return dict(rows.fetchall())
+
+    def run_ids(self, run_id):
+        """Liefert die Hex-IDs eines Laufs, aufsteigend sortiert (ohne Alternativen)."""
+        return self._sorted_hex(self.conn.execute('SELECT cc_id FROM cc_items WHERE run_id = ?', (run_id,)))
+
+    def run_items(self, run_id):
+        """Liefert (cc_id, {Seite: URL}) eines Laufs, sortiert nach ID."""
+        rows = self.conn.execute('''
+            SELECT i.id, i.cc_id, a.site, a.url FROM cc_items i
+            LEFT JOIN alternatives a ON a.item_id = i.id
+            WHERE i.run_id = ? ORDER BY i.id
+        ''', (run_id,))
+        items = []
+        current_id, alternatives = None, {}
+        for item_id, cc_id, site, url in rows:
+            if item_id != current_id:
+                current_id, alternatives = item_id, {}
+                items.append((to_hex(cc_id), alternatives))
+            if url is not None:
+                # Alternativen ohne Seite (Liste von URLs) unter der URL selbst
+                alternatives[site if site is not None else url] = url
+        items.sort(key=lambda item: int(item[0], 16))
+        return items
+
+    def run_delta(self, run_id, previous_run_id):
+        """
+        Vergleicht zwei gespeicherte Läufe in SQLite, ohne sie in den Speicher zu laden.
+
+        Returns:
+            tuple: (added, changed, resolved) als sortierte Listen von Hex-IDs; changed sind
+            IDs, die in beiden Läufen fehlen, deren Alternativen sich aber unterscheiden.
+        """
+        ids = 'SELECT cc_id FROM cc_items WHERE run_id = ?'
+        links = ('SELECT i.cc_id, a.site, a.url FROM cc_items i LEFT JOIN alternatives a ON a.item_id = i.id '
+                 'WHERE i.run_id = ?')
+        added = self._sorted_hex(self.conn.execute(f'{ids} EXCEPT {ids}', (run_id, previous_run_id)))
+        resolved = self._sorted_hex(self.conn.execute(f'{ids} EXCEPT {ids}', (previous_run_id, run_id)))
+        # Unterschiedliche (ID, Seite, URL)-Zeilen, beschränkt auf IDs, die in beiden Läufen vorkommen
+        changed = self._sorted_hex(self.conn.execute(f'''
+            SELECT cc_id FROM ({links} EXCEPT {links})
+            UNION SELECT cc_id FROM ({links} EXCEPT {links})
+            INTERSECT {ids} INTERSECT {ids}
+        ''', (run_id, previous_run_id, previous_run_id, run_id, run_id, previous_run_id)))
+        return added, changed, resolved
+
+    @staticmethod
+    def _sorted_hex(rows):
+        return [hex(cc_id) for cc_id in sorted(cc_id + (1 << 64) if cc_id < 0 else cc_id for (cc_id,) in rows)]
+
+    def record_changes(self, run_id, added, changed, resolved):
+        """
+        Protokolliert die Änderungen eines Delta-Laufs (report_changes) und schreibt
+        den rollierenden Gesamtbericht in derselben Transaktion fort.
+
+        added/changed sind {cc_id: Alternativen als JSON}, resolved eine Liste von cc_ids.
+        """
+        changes = ([(run_id, to_signed64(int(cc_id, 16)), 'added', value) for cc_id, value in added.items()]
+                   + [(run_id, to_signed64(int(cc_id, 16)), 'changed', value) for cc_id, value in changed.items()]
+                   + [(run_id, to_signed64(int(cc_id, 16)), 'resolved', None) for cc_id in resolved])
+        with self.conn:
+            self.conn.executemany(
+                'INSERT INTO report_changes (run_id, cc_id, change, alternatives) VALUES (?, ?, ?, ?)', changes)
+            self.conn.executemany('INSERT OR REPLACE INTO report_latest (cc_id, alternatives) VALUES (?, ?)',
+                                  ((cc_id, value) for _, cc_id, change, value in changes if change != 'resolved'))
+            self.conn.executemany('DELETE FROM report_latest WHERE cc_id = ?',
+                                  ((cc_id,) for _, cc_id, change, _ in changes if change == 'resolved'))
+            self._set_latest_run(run_id)
+
+    def latest_run(self):
+        """run_id, deren Stand der rollierende Gesamtbericht wiedergibt (None, wenn es keinen gibt)."""
+        row = self.conn.execute('SELECT run_id FROM report_latest_state WHERE id = 1').fetchone()
+        return row[0] if row else None
+
+    def reset_latest(self, run_id, records):
+        """Ersetzt den rollierenden Gesamtbericht vollständig durch records ((cc_id, Alternativen als JSON))."""
+        with self.conn:
+            self.conn.execute('DELETE FROM report_latest')
+            self.conn.executemany('INSERT OR REPLACE INTO report_latest (cc_id, alternatives) VALUES (?, ?)',
+                                  ((to_signed64(int(cc_id, 16)), value) for cc_id, value in records))
+            self._set_latest_run(run_id)
+
+    def _set_latest_run(self, run_id):
+        self.conn.execute('INSERT OR REPLACE INTO report_latest_state (id, run_id) VALUES (1, ?)', (run_id,))
+
+    def latest_items(self):
+        """Liefert (cc_id, Alternativen) des rollierenden Gesamtberichts, aufsteigend nach ID (uint64)."""
+        # Vorzeichenbehaftete Werte: erst die positiven, dann die ab 0x8000… negativ gespeicherten
+        rows = self.conn.execute('SELECT cc_id, alternatives FROM report_latest ORDER BY cc_id < 0, cc_id')
+        for cc_id, alternatives in rows:
+            yield to_hex(cc_id), json.loads(alternatives)
+
+    def close(self):
+        self.conn.close()
@@ -10,52 +10,266 @@
 # Strukturvorschlag:
 # - Funktion: load_savegame(file_path)
 # - Funktion: extract_cc_ids(savegame_binary_data)
+# - Funktion: extract_cc_id_array(buffer, unaligned=False) → uint64-Array
+# - Funktion: extract_cc_references(file_path) → CC-IDs mit typisierter Quell-Ressource (DBPF)
 # - Funktion: analyze_savegame(file_path) → Main Entry
+# - Funktion: analyze_savegames_folder(folder_path) → alle Slots + Rollbacks parallel, IDs mit Herkunft
+# - Funktion: merge_savegame_ids(results, sources) / sources_as_hex(sources) → Zusammenführen der Ergebnisse
+#   (auch von pipeline.py genutzt)
 
 # savegame_analyzer.py
 
-import struct
+import os
+import re
+import mmap
+import time
 import logging
+import zlib
+import multiprocessing
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
-# Logging konfigurieren
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+import numpy as np
+
+from dbpf_reader import is_dbpf, iter_resources
+from instrumentation import record
+
+# Filter: Nur CC-relevante IDs (oberstes Bit gesetzt)
+CC_ID_THRESHOLD = 0x8000000000000000
+
+# Anzahl 64-Bit-Wörter pro Block, begrenzt den Speicher für Masken/Zwischenergebnisse
+SCAN_BLOCK_WORDS = 4 * 1024 * 1024
+
+# Ressourcentypen im Savegame, die CC-Referenzen tragen (Sims, Haushalte, Grundstücke)
+SAVEGAME_RESOURCE_TYPES = {
+    0x0000000D: "SaveGameData",
+}
+
+# Savegame-Slots (Slot_00000001.save) und deren Rollback-Versionen (.ver0 – .ver4)
+SAVEGAME_FILE_PATTERN = re.compile(r'\.save(\.ver[0-4])?$', re.IGNORECASE)
+
+# CC-ID (Instance) zusammen mit der Savegame-Ressource, in der sie gefunden wurde
+CCReference = namedtuple('CCReference', ['instance', 'source'])
+
+def _sorted_unique(values):
+    """Sortiert ein uint64-Array und entfernt Duplikate (schneller als np.unique)."""
+    values = np.sort(values)
+    if values.size < 2:
+        return values
+    keep = np.empty(values.size, dtype=bool)
+    keep[0] = True
+    np.not_equal(values[1:], values[:-1], out=keep[1:])
+    return values[keep]
 
 def load_savegame(file_path):
-    """Lädt die Savegame-Datei im Binärmodus."""
+    """
+    Öffnet die Savegame-Datei im Binärmodus als read-only Memory-Map.
+
+    Die Datei wird nicht in den Speicher kopiert; der Aufrufer muss die
+    zurückgegebene Map mit close() schließen.
+    """
     try:
         with open(file_path, 'rb') as f:
-            data = f.read()
+            # Leere Dateien lassen sich nicht mappen
+            if os.fstat(f.fileno()).st_size == 0:
+                data = b''
+            else:
+                data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
         logging.info(f"Savegame {file_path} erfolgreich geladen.")
         return data
     except Exception as e:
         logging.error(f"Fehler beim Laden des Savegames: {e}")
         return None
 
-def extract_cc_ids(savegame_binary_data):
+def extract_cc_id_array(buffer, unaligned=False):
+    """
+    Extrahiert CC-IDs als sortiertes, eindeutiges uint64-Array.
+
+    Der Puffer (bytes, memoryview oder mmap) wird ohne Kopie über
+    np.frombuffer als Little-Endian-uint64 gelesen und blockweise gefiltert.
+
+    Args:
+        buffer: Binärdaten des Savegames.
+        unaligned (bool): Zusätzlich alle 8 Byte-Offsets prüfen statt nur
+            8-Byte-ausgerichtete Wörter.
+
+    Returns:
+        numpy.ndarray: Eindeutige IDs (dtype uint64).
+    """
+    size = len(buffer)
+    threshold = np.uint64(CC_ID_THRESHOLD)
+    found = []
+    for offset in range(8 if unaligned else 1):
+        count = (size - offset) // 8
+        if count <= 0:
+            continue
+        words = np.frombuffer(buffer, dtype='<u8', count=count, offset=offset)
+        for start in range(0, count, SCAN_BLOCK_WORDS):
+            block = words[start:start + SCAN_BLOCK_WORDS]
+            hits = block[block > threshold]
+            if hits.size:
+                found.append(_sorted_unique(hits))
+        # View freigeben, damit eine zugrundeliegende mmap geschlossen werden kann
+        del words
+    if not found:
+        return np.empty(0, dtype=np.uint64)
+    return _sorted_unique(np.concatenate(found)).astype(np.uint64, copy=False)
+
+def extract_cc_ids(savegame_binary_data, unaligned=False):
     """Extrahiert CC-IDs aus dem Binärdaten des Savegames."""
-    cc_ids = set()
+    cc_ids = []
     try:
-        # Suche nach typischem CC-ID-Muster
-        for i in range(0, len(savegame_binary_data) - 8, 8):
-            chunk = savegame_binary_data[i:i+8]
-            if len(chunk) == 8:
-                try:
-                    cc_id = struct.unpack('<Q', chunk)[0]
-                    # Filter: Nur CC-relevante IDs
-                    if cc_id > 0x8000000000000000:
-                        cc_ids.add(hex(cc_id))
-                except struct.error:
-                    continue
+        id_array = extract_cc_id_array(savegame_binary_data, unaligned=unaligned)
+        cc_ids = [hex(cc_id) for cc_id in id_array.tolist()]
         logging.info(f"{len(cc_ids)} CC-IDs extrahiert.")
     except Exception as e:
         logging.error(f"Fehler beim Extrahieren der CC-IDs: {e}")
-    return list(cc_ids)
+    return cc_ids
+
+def iter_dbpf_cc_id_arrays(file_path, resource_types=SAVEGAME_RESOURCE_TYPES, unaligned=True):
+    """
+    Liefert je relevanter Savegame-Ressource (ResourceKey, uint64-Array der CC-IDs).
+
+    Nur die Ressourcen aus resource_types werden gelesen und dekomprimiert,
+    jeweils eine zur Zeit. Die Nutzdaten sind Protobuf-kodiert, 64-Bit-Felder
+    liegen daher nicht ausgerichtet – standardmäßig werden alle Offsets geprüft.
+    """
+    with open(file_path, 'rb') as f:
+        for key, payload in iter_resources(f, resource_types):
+            yield key, extract_cc_id_array(payload, unaligned=unaligned)
+
+def extract_cc_references(file_path, resource_types=SAVEGAME_RESOURCE_TYPES, unaligned=True):
+    """
+    Extrahiert CC-IDs aus einem DBPF-Savegame mit typisierter Quell-Ressource.
+
+    Returns:
+        list: CCReference(instance, source) nach Instance sortiert; source ist
+        der ResourceKey der Savegame-Ressource, in der die ID vorkommt.
+    """
+    references = []
+    try:
+        for key, id_array in iter_dbpf_cc_id_arrays(file_path, resource_types, unaligned):
+            references.extend(CCReference(instance, key) for instance in id_array.tolist())
+        references.sort()
+        logging.info(f"{len(references)} CC-Referenzen aus {file_path} extrahiert.")
+    except (OSError, ValueError, zlib.error) as e:
+        logging.error(f"Fehler beim Lesen des DBPF-Savegames {file_path}: {e}")
+    return references
+
+def analyze_savegame_array(file_path, unaligned=False):
+    """
+    Liefert die CC-IDs eines Savegames als eindeutiges uint64-Array.
+
+    DBPF-Savegames werden über den Ressourcen-Index gelesen (nur relevante,
+    dekomprimierte Ressourcen); andere Dateien werden roh gescannt.
+    """
+    try:
+        with open(file_path, 'rb') as f:
+            dbpf = is_dbpf(f)
+    except OSError as e:
+        logging.error(f"Fehler beim Laden des Savegames: {e}")
+        return np.empty(0, dtype=np.uint64)
+
+    if dbpf:
+        try:
+            arrays = [id_array for _, id_array in iter_dbpf_cc_id_arrays(file_path)]
+        except (OSError, ValueError, zlib.error) as e:
+            logging.error(f"Fehler beim Lesen des DBPF-Savegames {file_path}: {e}")
+            arrays = []
+        if not arrays:
+            return np.empty(0, dtype=np.uint64)
+        return _sorted_unique(np.concatenate(arrays))
 
-def analyze_savegame(file_path):
-    """Hauptfunktion: lädt Savegame und extrahiert CC-IDs."""
     savegame_data = load_savegame(file_path)
-    if savegame_data:
-        cc_ids = extract_cc_ids(savegame_data)
-        return cc_ids
-    else:
+    if isinstance(savegame_data, mmap.mmap):
+        try:
+            return extract_cc_id_array(savegame_data, unaligned=unaligned)
+        finally:
+            savegame_data.close()
+    return np.empty(0, dtype=np.uint64)
+
+def analyze_savegame(file_path, unaligned=False):
+    """Hauptfunktion: lädt Savegame und extrahiert CC-IDs."""
+    cc_ids = [hex(cc_id) for cc_id in analyze_savegame_array(file_path, unaligned).tolist()]
+    logging.info(f"{len(cc_ids)} CC-IDs aus {file_path} extrahiert.")
+    return cc_ids
+
+def find_savegames(folder_path):
+    """Listet alle Savegame-Slots und Rollback-Versionen im Savegames-Ordner."""
+    try:
+        with os.scandir(folder_path) as entries:
+            paths = [entry.path for entry in entries
+                     if entry.is_file() and SAVEGAME_FILE_PATTERN.search(entry.name)]
+    except OSError as e:
+        logging.error(f"Fehler beim Lesen des Savegames-Ordners: {e}")
         return []
+    return sorted(paths)
+
+def _analyze_savegame_timed(file_path, unaligned):
+    """Worker: analysiert ein Savegame und misst Laufzeit und Dateigröße im Worker-Prozess."""
+    start = time.perf_counter()
+    id_array = analyze_savegame_array(file_path, unaligned)
+    try:
+        size = os.path.getsize(file_path)
+    except OSError:
+        size = 0
+    return id_array, time.perf_counter() - start, size
+
+def iter_analyze_savegames(file_paths, max_workers=None, unaligned=False):
+    """
+    Analysiert mehrere Savegames in einem Prozess-Pool.
+
+    Liefert (file_path, uint64-Array) in der Reihenfolge, in der die
+    Analysen fertig werden. Fehlgeschlagene Savegames werden geloggt und
+    übersprungen.
+    """
+    # spawn statt fork: Aufrufer wie pipeline.py lassen währenddessen Threads laufen (Scan, Suche),
+    # deren Sperren ein geforkter Prozess in gesperrtem Zustand erben könnte; unter Windows ohnehin Standard
+    with ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context('spawn')) as executor:
+        futures = {executor.submit(_analyze_savegame_timed, path, unaligned): path
+                   for path in file_paths}
+        for future in as_completed(futures):
+            path = futures[future]
+            try:
+                id_array, seconds, size = future.result()
+            except Exception as e:
+                logging.error(f"Fehler bei der Analyse von {path}: {e}")
+                continue
+            record('analyze.file', seconds, size, file=os.path.basename(path), cc_ids=id_array.size)
+            yield path, id_array
+
+def analyze_savegames_folder(folder_path, max_workers=None, unaligned=False):
+    """
+    Analysiert alle Savegames im Ordner parallel und führt die Ergebnisse zusammen.
+
+    Args:
+        folder_path (str): Savegames-Ordner (config["savegames_folder"]).
+        max_workers (int): Anzahl Prozesse, Standard: Anzahl CPU-Kerne.
+        unaligned (bool): Roh-Scan über alle Byte-Offsets (nur Nicht-DBPF-Dateien).
+
+    Returns:
+        dict: Dedupliziert {CC-ID (hex): sortierte Liste der Savegame-Dateinamen}.
+    """
+    file_paths = find_savegames(folder_path)
+    sources = {}
+    for path, id_array in merge_savegame_ids(iter_analyze_savegames(file_paths, max_workers, unaligned), sources):
+        logging.info(f"{os.path.basename(path)}: {id_array.size} CC-IDs.")
+    logging.info(f"{len(sources)} eindeutige CC-IDs aus {len(file_paths)} Savegames.")
+    return sources_as_hex(sources)
+
+def merge_savegame_ids(results, sources):
+    """
+    Trägt (Pfad, uint64-Array)-Ergebnisse als {CC-ID: Savegame-Namen} in sources ein.
+
+    Reicht jedes Ergebnis danach weiter, damit Aufrufer es zusätzlich verarbeiten
+    können (z.B. fehlende IDs je Savegame in pipeline.py).
+    """
+    for path, id_array in results:
+        name = os.path.basename(path)
+        for cc_id in id_array.tolist():
+            sources.setdefault(cc_id, []).append(name)
+        yield path, id_array
+
+def sources_as_hex(sources):
+    """{CC-ID: Savegame-Namen} → nach ID sortiert {CC-ID (hex): sortierte Savegame-Namen}."""
+    return {hex(cc_id): sorted(names) for cc_id, names in sorted(sources.items())}
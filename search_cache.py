@@ -0,0 +1,134 @@
+# Modul: search_cache.py
+# Funktion: Persistenter HTTP-Antwort-Cache für die CC-Suche (SQLite)
+
+# Aufgaben:
+# - Antworten je (Seite, normalisierte Suchanfrage) speichern
+# - Konfigurierbare TTL; leere/fehlgeschlagene Ergebnisse mit eigener (kürzerer) TTL cachen
+# - ETag/Last-Modified speichern, damit veraltete Einträge per Conditional Request
+#   (If-None-Match / If-Modified-Since) revalidiert werden können
+# - Größenbegrenzung mit LRU-Verdrängung
+
+# Strukturvorschlag:
+# - Funktion: normalize_query(query)
+# - Klasse: SearchCache(path, ttl, negative_ttl, max_bytes)
+#   - get(site, query) → CacheEntry oder None
+#   - body(site, query) → gespeicherte Antwort (wird nur bei Bedarf entpackt)
+#   - put(site, query, result, body, etag, last_modified)
+#   - refresh(site, query) → nach 304 Not Modified
+
+import sqlite3
+import threading
+import time
+import zlib
+from collections import namedtuple
+
+DEFAULT_TTL = 7 * 24 * 3600          # Treffer: 7 Tage
+DEFAULT_NEGATIVE_TTL = 24 * 3600     # Keine Treffer / Fehler: 1 Tag
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+CacheEntry = namedtuple('CacheEntry', ['result', 'etag', 'last_modified', 'fresh'])
+
+def normalize_query(query):
+    """Normalisiert eine Suchanfrage (Groß-/Kleinschreibung, Leerraum)."""
+    return ' '.join(str(query).lower().split())
+
+def cache_from_config(config):
+    """Erstellt einen SearchCache aus config["search_cache"] (fehlende Werte → Standard)."""
+    settings = config.get("search_cache", {})
+    return SearchCache(
+        settings.get("path", "search_cache.db"),
+        ttl=settings.get("ttl_hours", DEFAULT_TTL / 3600) * 3600,
+        negative_ttl=settings.get("negative_ttl_hours", DEFAULT_NEGATIVE_TTL / 3600) * 3600,
+        max_bytes=settings.get("max_size_mb", DEFAULT_MAX_BYTES / 1024 / 1024) * 1024 * 1024,
+    )
+
+class SearchCache:
+    """Thread-sicherer, persistenter Antwort-Cache mit TTL und LRU-Verdrängung."""
+
+    def __init__(self, path='search_cache.db', ttl=DEFAULT_TTL, negative_ttl=DEFAULT_NEGATIVE_TTL,
+                 max_bytes=DEFAULT_MAX_BYTES):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS responses (
+                site TEXT NOT NULL,
+                query TEXT NOT NULL,
+                result TEXT,
+                body BLOB,
+                etag TEXT,
+                last_modified TEXT,
+                fetched_at REAL NOT NULL,
+                accessed_at REAL NOT NULL,
+                size INTEGER NOT NULL,
+                PRIMARY KEY (site, query)
+            )
+        ''')
+        self.conn.execute('CREATE INDEX IF NOT EXISTS idx_responses_accessed ON responses (accessed_at)')
+        self.total_bytes = self.conn.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+
+    def get(self, site, query):
+        """Liefert den Cache-Eintrag (fresh=False, wenn die TTL abgelaufen ist) oder None."""
+        key = (site, normalize_query(query))
+        now = time.time()
+        with self.lock:
+            row = self.conn.execute(
+                'SELECT result, etag, last_modified, fetched_at FROM responses WHERE site = ? AND query = ?',
+                key).fetchone()
+            if row is None:
+                return None
+            with self.conn:
+                self.conn.execute('UPDATE responses SET accessed_at = ? WHERE site = ? AND query = ?',
+                                  (now,) + key)
+        result, etag, last_modified, fetched_at = row
+        ttl = self.ttl if result else self.negative_ttl
+        return CacheEntry(result, etag, last_modified, now - fetched_at < ttl)
+
+    def body(self, site, query):
+        """Liefert die gespeicherte Antwort (entpackt) oder None."""
+        with self.lock:
+            row = self.conn.execute('SELECT body FROM responses WHERE site = ? AND query = ?',
+                                    (site, normalize_query(query))).fetchone()
+        return zlib.decompress(row[0]) if row and row[0] else None
+
+    def put(self, site, query, result, body=None, etag=None, last_modified=None):
+        """Speichert eine Antwort; result=None markiert einen negativen Eintrag."""
+        compressed = zlib.compress(body) if body else None
+        size = len(compressed or b'') + len(result or '')
+        now = time.time()
+        with self.lock, self.conn:
+            old = self.conn.execute('SELECT size FROM responses WHERE site = ? AND query = ?',
+                                    (site, normalize_query(query))).fetchone()
+            self.conn.execute('''
+                INSERT OR REPLACE INTO responses
+                    (site, query, result, body, etag, last_modified, fetched_at, accessed_at, size)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (site, normalize_query(query), result, compressed, etag, last_modified, now, now, size))
+            self.total_bytes += size - (old[0] if old else 0)
+            if self.total_bytes > self.max_bytes:
+                self._evict()
+
+    def refresh(self, site, query):
+        """Markiert einen Eintrag nach 304 Not Modified wieder als frisch."""
+        now = time.time()
+        with self.lock, self.conn:
+            self.conn.execute('UPDATE responses SET fetched_at = ?, accessed_at = ? WHERE site = ? AND query = ?',
+                              (now, now, site, normalize_query(query)))
+
+    def _evict(self):
+        """Entfernt die am längsten nicht genutzten Einträge, bis die Größengrenze eingehalten ist."""
+        rows = self.conn.execute('SELECT rowid, size FROM responses ORDER BY accessed_at')
+        evicted = []
+        for rowid, size in rows:
+            if self.total_bytes <= self.max_bytes:
+                break
+            evicted.append((rowid,))
+            self.total_bytes -= size
+        self.conn.executemany('DELETE FROM responses WHERE rowid = ?', evicted)
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
@@ -0,0 +1,217 @@
+# Modul: search_queue.py
+# Funktion: Persistente, fortsetzbare Auftragswarteschlange für die CC-Suche (SQLite)
+
+# Aufgaben:
+# - Je (CC-ID, Seite) einen Auftrag mit Status speichern (pending, running, done, failed)
+# - Deduplizierung über Läufe hinweg (erledigte Aufträge werden erst nach Ablauf der TTL erneut gesucht)
+# - Fehlgeschlagene Aufträge mit exponentiellem Backoff wiederholen; endgültig fehlgeschlagene beim
+#   nächsten Einreihen erneut versuchen
+# - Laufende Aufträge mit Lease: nur abgelaufene (abgebrochener Prozess) werden neu vergeben
+# - Beim Start werden Aufträge beendeter Prozesse desselben Rechners sofort freigegeben,
+#   damit ein Neustart direkt nach einem Abbruch sie nicht überspringt
+# - Ergebnisse sofort beim Eintreffen speichern, statt sie bis zum Ende im Speicher zu halten
+# - Nach einem Abbruch nur die unerledigten Aufträge fortsetzen
+
+# Strukturvorschlag:
+# - Klasse: SearchQueue(db_path, ttl, negative_ttl, lease)
+#   - release_dead_leases() → Aufträge beendeter lokaler Prozesse freigeben (beim Start)
+#   - enqueue(cc_ids, sites)
+#   - claim(limit, sites) → Liste (cc_id, site)
+#   - complete(cc_id, site, result) / fail(cc_id, site, error)
+#   - results(cc_ids) → {cc_id: {site: url}}
+
+import os
+import socket
+import sqlite3
+import time
+
+from search_cache import DEFAULT_TTL, DEFAULT_NEGATIVE_TTL
+
+MAX_ATTEMPTS = 5
+BACKOFF_BASE_SECONDS = 2.0
+BACKOFF_MAX_SECONDS = 300.0
+
+# Solange gilt ein laufender Auftrag als vergeben; danach darf ihn ein anderer Prozess übernehmen
+# (deutlich länger als Rate-Limit-Wartezeit plus Timeout einer Anfrage)
+LEASE_SECONDS = 120.0
+
+STATUS_PENDING = 'pending'
+STATUS_RUNNING = 'running'
+STATUS_DONE = 'done'
+STATUS_FAILED = 'failed'
+
+# Windows: Rechte für GetExitCodeProcess und Exit-Code eines noch laufenden Prozesses
+_PROCESS_QUERY_LIMITED_INFORMATION = 0x1000
+_STILL_ACTIVE = 259
+
+def _process_alive(pid):
+    """Prüft, ob ein Prozess dieses Rechners noch läuft (im Zweifel: ja)."""
+    if os.name == 'nt':
+        import ctypes
+        kernel32 = ctypes.WinDLL('kernel32', use_last_error=True)
+        handle = kernel32.OpenProcess(_PROCESS_QUERY_LIMITED_INFORMATION, False, pid)
+        if not handle:
+            # Zugriff verweigert heißt: der Prozess existiert
+            return ctypes.get_last_error() == 5
+        try:
+            code = ctypes.c_ulong()
+            return not kernel32.GetExitCodeProcess(handle, ctypes.byref(code)) or code.value == _STILL_ACTIVE
+        finally:
+            kernel32.CloseHandle(handle)
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+class SearchQueue:
+    """Durable Job-Queue für Suchaufträge in der SimVault-Datenbank."""
+
+    def __init__(self, db_path='simvault_data.db', ttl=DEFAULT_TTL, negative_ttl=DEFAULT_NEGATIVE_TTL,
+                 lease=LEASE_SECONDS):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.lease = lease
+        self.host = socket.gethostname()
+        self.owner = f"{self.host}:{os.getpid()}"
+        self.conn = sqlite3.connect(db_path)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS search_tasks (
+                cc_id TEXT NOT NULL,
+                site TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                next_attempt_at REAL NOT NULL DEFAULT 0,
+                result TEXT,
+                error TEXT,
+                updated_at REAL,
+                owner TEXT,
+                PRIMARY KEY (cc_id, site)
+            )
+        ''')
+        # Datenbanken aus älteren Versionen haben noch keine owner-Spalte
+        if 'owner' not in {row[1] for row in self.conn.execute('PRAGMA table_info(search_tasks)')}:
+            self.conn.execute('ALTER TABLE search_tasks ADD COLUMN owner TEXT')
+        self.conn.execute('CREATE INDEX IF NOT EXISTS idx_search_tasks_status ON search_tasks (status, next_attempt_at)')
+        self.release_dead_leases()
+
+    def release_dead_leases(self):
+        """
+        Gibt laufende Aufträge frei, deren Prozess auf diesem Rechner nicht mehr läuft.
+
+        Aufträge anderer Rechner (gemeinsame Datenbank) bleiben bis zum Ablauf der Lease vergeben.
+        Gibt die Anzahl freigegebener Aufträge zurück.
+        """
+        owners = [owner for (owner,) in self.conn.execute(
+            "SELECT DISTINCT owner FROM search_tasks WHERE status = 'running' AND owner IS NOT NULL")]
+        dead = []
+        for owner in owners:
+            host, _, pid = owner.rpartition(':')
+            if host == self.host and pid.isdigit() and not _process_alive(int(pid)):
+                dead.append(owner)
+        if not dead:
+            return 0
+        with self.conn:
+            return self.conn.executemany('''
+                UPDATE search_tasks SET status = 'pending', next_attempt_at = 0, owner = NULL
+                WHERE status = 'running' AND owner = ?
+            ''', ((owner,) for owner in dead)).rowcount
+
+    def enqueue(self, cc_ids, sites):
+        """
+        Legt Aufträge für alle (ID, Seite)-Paare an.
+
+        Vorhandene Aufträge bleiben unverändert, außer sie sind endgültig
+        fehlgeschlagen oder ihr Ergebnis ist älter als die TTL (Treffer: ttl,
+        kein Treffer: negative_ttl); diese werden erneut eingereiht.
+        """
+        cc_ids = list(cc_ids)
+        now = time.time()
+        with self.conn:
+            self.conn.executemany('''
+                INSERT INTO search_tasks (cc_id, site, updated_at) VALUES (?, ?, ?)
+                ON CONFLICT (cc_id, site) DO UPDATE SET
+                    status = 'pending', attempts = 0, next_attempt_at = 0, error = NULL, updated_at = ?
+                WHERE status = 'failed'
+                   OR (status = 'done' AND updated_at < CASE WHEN result IS NULL THEN ? ELSE ? END)
+            ''', ((cc_id, site, now, now, now - self.negative_ttl, now - self.ttl)
+                  for cc_id in cc_ids for site in sites))
+        return cc_ids
+
+    def claim(self, limit, sites):
+        """
+        Reserviert bis zu limit fällige Aufträge der angegebenen Seiten.
+
+        Laufende Aufträge anderer Prozesse werden erst übernommen, wenn ihre
+        Lease abgelaufen ist (z.B. nach einem Absturz).
+        """
+        sites = list(sites)
+        placeholders = ', '.join('?' * len(sites))
+        now = time.time()
+        with self.conn:
+            rows = self.conn.execute(f'''
+                SELECT rowid, cc_id, site FROM search_tasks
+                WHERE ((status = 'pending' AND next_attempt_at <= ?) OR (status = 'running' AND updated_at < ?))
+                  AND site IN ({placeholders})
+                ORDER BY rowid LIMIT ?
+            ''', [now, now - self.lease, *sites, limit]).fetchall()
+            self.conn.executemany(
+                "UPDATE search_tasks SET status = 'running', updated_at = ?, owner = ? WHERE rowid = ?",
+                ((now, self.owner, rowid) for rowid, _, _ in rows))
+        return [(cc_id, site) for _, cc_id, site in rows]
+
+    def complete(self, cc_id, site, result):
+        """Speichert das Ergebnis (None = kein Treffer) und schließt den Auftrag ab."""
+        with self.conn:
+            self.conn.execute('''
+                UPDATE search_tasks SET status = 'done', result = ?, error = NULL, updated_at = ?
+                WHERE cc_id = ? AND site = ?
+            ''', (result, time.time(), cc_id, site))
+
+    def fail(self, cc_id, site, error):
+        """Vermerkt einen Fehlschlag; plant eine Wiederholung mit Backoff oder gibt auf."""
+        attempts = self.conn.execute('SELECT attempts FROM search_tasks WHERE cc_id = ? AND site = ?',
+                                     (cc_id, site)).fetchone()[0] + 1
+        now = time.time()
+        status = STATUS_FAILED if attempts >= MAX_ATTEMPTS else STATUS_PENDING
+        delay = min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2 ** (attempts - 1))
+        with self.conn:
+            self.conn.execute('''
+                UPDATE search_tasks SET status = ?, attempts = ?, next_attempt_at = ?, error = ?, updated_at = ?
+                WHERE cc_id = ? AND site = ?
+            ''', (status, attempts, now + delay, str(error), now, cc_id, site))
+
+    def next_retry_in(self, sites):
+        """
+        Sekunden bis zum nächsten fälligen Auftrag oder None, wenn nichts mehr offen ist.
+
+        Aufträge, die ein anderer Prozess gerade bearbeitet, zählen nicht als offen.
+        """
+        sites = list(sites)
+        placeholders = ', '.join('?' * len(sites))
+        row = self.conn.execute(f'''
+            SELECT MIN(CASE WHEN status = 'running' THEN 0 ELSE next_attempt_at END) FROM search_tasks
+            WHERE (status = 'pending' OR (status = 'running' AND updated_at < ?)) AND site IN ({placeholders})
+        ''', [time.time() - self.lease, *sites]).fetchone()
+        if row[0] is None:
+            return None
+        return max(0.0, row[0] - time.time())
+
+    def results(self, cc_ids=None):
+        """Gibt die gespeicherten Treffer als {cc_id: {site: url}} zurück."""
+        rows = self.conn.execute("SELECT cc_id, site, result FROM search_tasks WHERE status = 'done'")
+        wanted = set(cc_ids) if cc_ids is not None else None
+        search_results = {cc_id: {} for cc_id in cc_ids} if cc_ids is not None else {}
+        for cc_id, site, result in rows:
+            if wanted is not None and cc_id not in wanted:
+                continue
+            site_results = search_results.setdefault(cc_id, {})
+            if result:
+                site_results[site] = result
+        return search_results
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,121 @@
+# Modul: synthetic_data.py
+# Funktion: Synthetische, reproduzierbare Eingabedaten für Tests und Benchmarks (offline, über Seed)
+
+# Aufgaben:
+# - Minimale DBPF-Container schreiben (Savegames und .package-Dateien)
+# - Savegame-Binärdaten mit eingestreuten CC-IDs erzeugen
+# - Mods-Ordner mit Dateianzahl und Tiefe sowie Suchergebnisse erzeugen
+
+# Strukturvorschlag:
+# - Funktion: write_dbpf(path, resources, compress)
+# - Funktion: make_synthetic_save(path, size_bytes, id_count, seed) / make_synthetic_package(path, ...)
+# - Funktion: make_synthetic_savegame(size_bytes, id_count, seed)
+# - Funktion: make_synthetic_mods_tree(root, file_count, file_size, depth, seed)
+# - Funktion: make_fake_search_results(count, seed)
+
+import os
+import zlib
+import struct
+
+import numpy as np
+
+from savegame_analyzer import CC_ID_THRESHOLD
+from dbpf_reader import HEADER_SIZE, COMPRESSION_NONE, COMPRESSION_ZLIB, EXTENDED_ENTRY_BIT
+
+# Ressourcentypen der synthetischen Dateien
+SAVEGAME_DATA_TYPE = 0x0000000D
+CAS_PART_TYPE = 0x034AEECB
+
+def write_dbpf(path, resources, compress=True):
+    """
+    Schreibt einen minimalen DBPF-2.1-Container.
+
+    Args:
+        resources: Iterable von (type, group, instance, payload).
+        compress (bool): Ressourcen mit zlib komprimieren (wie die meisten echten Packages).
+    """
+    entries = []
+    with open(path, 'wb') as f:
+        f.write(b'\0' * HEADER_SIZE)
+        for resource_type, group, instance, payload in resources:
+            data = zlib.compress(payload, 1) if compress else payload
+            entries.append((resource_type, group, instance, f.tell(), len(data), len(payload)))
+            f.write(data)
+        index_offset = f.tell()
+        index = bytearray(struct.pack('<I', 0))
+        for resource_type, group, instance, offset, file_size, mem_size in entries:
+            index += struct.pack('<IIIIIIIHH', resource_type, group, instance >> 32, instance & 0xFFFFFFFF,
+                                 offset, file_size | EXTENDED_ENTRY_BIT, mem_size,
+                                 COMPRESSION_ZLIB if compress else COMPRESSION_NONE, 1)
+        f.write(index)
+        header = bytearray(HEADER_SIZE)
+        struct.pack_into('<4sII', header, 0, b'DBPF', 2, 1)
+        struct.pack_into('<III', header, 36, len(entries), 0, len(index))
+        struct.pack_into('<II', header, 60, 3, index_offset)
+        f.seek(0)
+        f.write(header)
+
+def make_synthetic_savegame(size_bytes, id_count=10000, seed=0):
+    """Erzeugt Binärdaten mit kleinen Werten und eingestreuten CC-IDs."""
+    rng = np.random.default_rng(seed)
+    words = rng.integers(0, 2**31, size=size_bytes // 8, dtype=np.uint64)
+    positions = rng.integers(0, words.size, size=min(id_count, words.size))
+    ids = rng.integers(CC_ID_THRESHOLD + 1, 2**64 - 1, size=positions.size, dtype=np.uint64)
+    words[positions] = ids
+    return words.astype('<u8').tobytes()
+
+def make_synthetic_save(path, size_bytes, id_count=10000, seed=0, compress=True):
+    """Erzeugt ein DBPF-Savegame mit einer SaveGameData-Ressource voller eingestreuter CC-IDs."""
+    rng = np.random.default_rng(seed)
+    filler = [(CAS_PART_TYPE, 0, int(instance), rng.integers(0, 256, size=4096, dtype=np.uint8).tobytes())
+              for instance in rng.integers(1, 2**63, size=16, dtype=np.uint64)]
+    write_dbpf(path, filler + [(SAVEGAME_DATA_TYPE, 0, 1, make_synthetic_savegame(size_bytes, id_count, seed))],
+               compress)
+
+def make_synthetic_package(path, resource_count=64, payload_size=4096, seed=0, compress=True, compressible=False):
+    """
+    Erzeugt ein .package mit resource_count Ressourcen.
+
+    compressible=True erzeugt Nutzdaten mit vielen Wiederholungen (wie unkomprimierte
+    Tuning-Ressourcen), sonst zufällige Bytes. Gibt die Instanz-IDs zurück.
+    """
+    rng = np.random.default_rng(seed)
+    instances = rng.integers(CC_ID_THRESHOLD + 1, 2**64 - 1, size=resource_count, dtype=np.uint64).tolist()
+    high = 16 if compressible else 256
+    write_dbpf(path, ((CAS_PART_TYPE, 0, instance, rng.integers(0, high, size=payload_size, dtype=np.uint8).tobytes())
+                      for instance in instances), compress)
+    return instances
+
+def make_fake_search_results(count, seed=0):
+    """Liefert (cc_id, Alternativen)-Datensätze als Generator (0–3 Treffer je ID)."""
+    rng = np.random.default_rng(seed)
+    for cc_id, hits in zip(rng.integers(CC_ID_THRESHOLD + 1, 2**64 - 1, size=count, dtype=np.uint64).tolist(),
+                           rng.integers(0, 4, size=count).tolist()):
+        yield hex(cc_id), [f"https://example.invalid/search/{cc_id:x}/{n}" for n in range(hits)]
+
+def make_synthetic_mods_tree(root, file_count=400, file_size=512 * 1024, depth=2, seed=0):
+    """
+    Erzeugt einen Mods-Ordner mit DBPF-Packages und Skripten in depth Ebenen von Unterordnern.
+
+    Jede vierte Datei ist ein unkomprimiertes Package mit komprimierbaren Daten, die
+    übrigen sind zlib-komprimierte Packages und (zufällige) .ts4script-Dateien.
+    Gibt die Gesamtgröße in Bytes zurück.
+    """
+    rng = np.random.default_rng(seed)
+    payload_size = 4096
+    total = 0
+    for i in range(file_count):
+        parts = [f"Creator{i % 20:02d}"] + [f"Set{(i >> level) % 5}" for level in range(depth - 1)]
+        folder = os.path.join(root, *parts[:depth])
+        os.makedirs(folder, exist_ok=True)
+        kind = i % 4
+        if kind == 3:
+            path = os.path.join(folder, f"mod_{i:05d}.ts4script")
+            with open(path, 'wb') as f:
+                f.write(rng.integers(0, 256, size=file_size, dtype=np.uint8).tobytes())
+        else:
+            path = os.path.join(folder, f"mod_{i:05d}.package")
+            make_synthetic_package(path, max(1, file_size // payload_size), payload_size, seed=seed + i,
+                                   compress=kind != 0, compressible=kind == 0)
+        total += os.path.getsize(path)
+    return total
@@ -0,0 +1,47 @@
+import os
+import sys
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import pytest
+
+# Module liegen flach im Projektverzeichnis
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+class _StubHandler(BaseHTTPRequestHandler):
+    """Antwortet mit 200 und ETag, 304 bei passendem If-None-Match und 404 für Pfade mit "fail"."""
+    protocol_version = 'HTTP/1.1'
+    etag = '"v1"'
+
+    def do_GET(self):
+        self.server.requests.append(self.path)
+        if self.headers.get('If-None-Match') == self.etag:
+            self.send_response(304)
+            self.send_header('ETag', self.etag)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        if self.server.delay:
+            self.server.delay.wait(self.server.delay_seconds)
+        body = b'<html>ok</html>'
+        self.send_response(404 if 'fail' in self.path else 200)
+        self.send_header('ETag', self.etag)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def stub_server():
+    """Lokaler HTTP-Server als Suchseite; server.requests protokolliert die angefragten Pfade."""
+    server = ThreadingHTTPServer(('127.0.0.1', 0), _StubHandler)
+    server.requests = []
+    server.delay = None
+    server.delay_seconds = 0
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
@@ -0,0 +1,96 @@
+import os
+
+import pytest
+
+import backup_catalog
+from backup_catalog import open_catalog, restore_path, restore_tree
+
+class _Clock:
+    now = 0.0
+
+    @classmethod
+    def time(cls):
+        return cls.now
+
+def _read(path):
+    with open(path, encoding='utf-8') as f:
+        return f.read()
+
+@pytest.fixture
+def history(tmp_path, monkeypatch):
+    """
+    Drei Delta-Läufe (t=100, 200, 300) und ein Selective Backup (t=400):
+    a.txt ändert sich in Lauf 2 und im Selective Backup, b.txt wird in Lauf 3 gelöscht, c.txt kommt in Lauf 2 hinzu.
+    """
+    monkeypatch.setattr(backup_catalog, 'time', _Clock)
+    source, backup_root = str(tmp_path / 'saves'), str(tmp_path / 'backups')
+
+    def run(name, created, files, contents, complete=True):
+        location = os.path.join(backup_root, name)
+        for path, content in contents.items():
+            os.makedirs(location, exist_ok=True)
+            with open(os.path.join(location, path), 'w', encoding='utf-8') as f:
+                f.write(content)
+        _Clock.now = created
+        catalog = open_catalog(backup_root)
+        try:
+            return catalog.record_snapshot(source, 'delta' if complete else 'selective', location, files,
+                                           set(contents), complete=complete)
+        finally:
+            catalog.close()
+
+    ids = [
+        run('d1', 100, {'a.txt': (2, 1), 'b.txt': (1, 1)}, {'a.txt': 'a1', 'b.txt': 'b'}),
+        run('d2', 200, {'a.txt': (2, 2), 'b.txt': (1, 1), 'c.txt': (1, 2)}, {'a.txt': 'a2', 'c.txt': 'c'}),
+        run('d3', 300, {'a.txt': (2, 2), 'c.txt': (1, 2)}, {}),
+        run('s4', 400, {'a.txt': (2, 3)}, {'a.txt': 'a3'}, complete=False),
+    ]
+    _Clock.now = 500
+    return source, backup_root, ids
+
+def test_versions_at_each_snapshot(history):
+    source, backup_root, (first, second, third, selective) = history
+    catalog = open_catalog(backup_root)
+    try:
+        assert catalog.snapshot_at(source, 50) is None
+        assert catalog.snapshot_at(source, 150).id == first
+        assert catalog.snapshot_at(source, 450).id == third
+
+        def holders(snapshot_id):
+            return {version.path: version.holder_id for version in catalog.versions_at(source, snapshot_id)}
+
+        assert holders(first) == {'a.txt': first, 'b.txt': first}
+        assert holders(second) == {'a.txt': second, 'b.txt': first, 'c.txt': second}
+        assert holders(third) == {'a.txt': second, 'c.txt': second}
+        assert catalog.version_at(source, 'a.txt', 450).holder_id == selective
+        assert catalog.version_at(source, 'b.txt', 350) is None
+    finally:
+        catalog.close()
+
+def test_point_in_time_restore_of_the_whole_tree(history, tmp_path):
+    source, backup_root, _ = history
+
+    assert restore_tree(backup_root, source, str(tmp_path / 't150'), at=150) == 2
+    assert restore_tree(backup_root, source, str(tmp_path / 't250'), at=250) == 3
+    assert restore_tree(backup_root, source, str(tmp_path / 'now')) == 2
+    assert restore_tree(backup_root, source, str(tmp_path / 't50'), at=50) == 0
+
+    assert _read(tmp_path / 't150' / 'a.txt') == 'a1'
+    assert not os.path.exists(tmp_path / 't150' / 'c.txt')
+    assert [_read(tmp_path / 't250' / name) for name in ('a.txt', 'b.txt', 'c.txt')] == ['a2', 'b', 'c']
+    # Selective Backups ändern den vollständigen Stand nicht
+    assert sorted(os.listdir(tmp_path / 'now')) == ['a.txt', 'c.txt']
+    assert _read(tmp_path / 'now' / 'a.txt') == 'a2'
+
+def test_selective_restore_of_single_files(history, tmp_path):
+    source, backup_root, _ = history
+
+    assert restore_path(backup_root, source, 'a.txt', str(tmp_path / 'a150.txt'), at=150)
+    assert restore_path(backup_root, source, 'a.txt', str(tmp_path / 'a_now.txt'))
+    assert restore_path(backup_root, source, 'b.txt', str(tmp_path / 'b250.txt'), at=250)
+    assert not restore_path(backup_root, source, 'c.txt', str(tmp_path / 'c150.txt'), at=150)
+
+    assert _read(tmp_path / 'a150.txt') == 'a1'
+    assert _read(tmp_path / 'a_now.txt') == 'a3'
+    assert _read(tmp_path / 'b250.txt') == 'b'
+    assert not os.path.exists(tmp_path / 'c150.txt')
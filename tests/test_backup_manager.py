@@ -0,0 +1,207 @@
+import os
+
+import pytest
+
+from backup_manager import delta_backup, hash_manifest_path
+
+def _write(path, content):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(content)
+
+def test_hash_manifest_is_kept_per_source_in_the_backup_folder(tmp_path):
+    saves, mods, backup_root = (str(tmp_path / name) for name in ('saves', 'mods', 'backups'))
+    _write(os.path.join(saves, 'a.save'), 'save')
+    _write(os.path.join(mods, 'a.save'), 'mod')
+
+    delta_backup(saves, backup_root)
+    delta_backup(mods, backup_root)
+
+    assert hash_manifest_path(saves, backup_root) != hash_manifest_path(mods, backup_root)
+    assert os.path.dirname(hash_manifest_path(saves, backup_root)) == backup_root
+    assert os.path.exists(hash_manifest_path(saves, backup_root))
+    assert os.path.exists(hash_manifest_path(mods, backup_root))
+
+def test_repository_reuses_only_snapshots_of_the_same_source(tmp_path):
+    from backup_repository import backup_to_repository, load_snapshot
+
+    saves, mods, repo = (str(tmp_path / name) for name in ('saves', 'mods', 'repo'))
+    _write(os.path.join(saves, 'same.txt'), 'save')
+    _write(os.path.join(mods, 'same.txt'), 'mod!')
+    # Gleiche Größe und mtime, aber anderer Inhalt in einem anderen Quellordner
+    stat = os.stat(os.path.join(saves, 'same.txt'))
+    os.utime(os.path.join(mods, 'same.txt'), ns=(stat.st_atime_ns, stat.st_mtime_ns))
+
+    save_snapshot = backup_to_repository(saves, repo)
+    mod_snapshot = backup_to_repository(mods, repo)
+
+    save_chunks = load_snapshot(repo, save_snapshot)['files']['same.txt']['chunks']
+    mod_chunks = load_snapshot(repo, mod_snapshot)['files']['same.txt']['chunks']
+    assert save_chunks != mod_chunks
+
+def test_full_zip_backup_round_trip_in_walk_order(tmp_path, monkeypatch):
+    import zipfile
+
+    import backup_manager
+    from fs_walker import walk_files
+
+    walk_order = []
+
+    def recording_walk(root, *args, **kwargs):
+        for entry in walk_files(root, *args, **kwargs):
+            walk_order.append(os.path.relpath(entry.path, root).replace(os.sep, '/'))
+            yield entry
+
+    monkeypatch.setattr(backup_manager, 'ZIP_MAX_PARALLEL_SIZE', 64 * 1024)
+    monkeypatch.setattr(backup_manager, 'walk_files', recording_walk)
+    source = str(tmp_path / 'mods')
+    _write(os.path.join(source, 'a.txt'), 'hello ' * 1000)
+    _write(os.path.join(source, 'sub', 'large.txt'), 'text ' * 100000)
+    _write(os.path.join(source, 'sub', 'ümlaut.package'), 'x')
+    with open(os.path.join(source, 'random.bin'), 'wb') as f:
+        f.write(os.urandom(200 * 1024))
+
+    zip_path = backup_manager.full_zip_backup(source, str(tmp_path / 'backups'), workers=2)
+
+    with zipfile.ZipFile(zip_path) as zipf:
+        assert zipf.testzip() is None
+        assert zipf.namelist() == walk_order
+        for name in walk_order:
+            with open(os.path.join(source, *name.split('/')), 'rb') as f:
+                assert zipf.read(name) == f.read()
+        assert zipf.getinfo('sub/large.txt').compress_type == zipfile.ZIP_DEFLATED
+        assert zipf.getinfo('random.bin').compress_type == zipfile.ZIP_STORED
+
+def test_delta_backup_copies_files_the_catalog_has_no_copy_of(tmp_path):
+    from backup_catalog import restore_tree
+
+    source, backup_root, target = (str(tmp_path / name) for name in ('saves', 'backups', 'restored'))
+    _write(os.path.join(source, 'a.save'), 'save')
+    delta_backup(source, backup_root)
+    # Neuer Katalog neben einem vorhandenen Manifest (z.B. nach einem Update)
+    os.remove(os.path.join(backup_root, 'backup_catalog.db'))
+
+    delta_backup(source, backup_root)
+
+    assert restore_tree(backup_root, source, target) == 1
+    with open(os.path.join(target, 'a.save'), encoding='utf-8') as f:
+        assert f.read() == 'save'
+
+def _count_hashes(monkeypatch, fail=()):
+    import backup_manager
+
+    hashed = []
+    calculate_hash = backup_manager.calculate_hash
+    def counting(file_path, *args):
+        hashed.append(os.path.basename(file_path))
+        if os.path.basename(file_path) in fail:
+            raise FileNotFoundError(2, 'verschwunden', file_path)
+        return calculate_hash(file_path, *args)
+    monkeypatch.setattr(backup_manager, 'calculate_hash', counting)
+    return hashed
+
+def test_delta_backup_hashes_only_changed_files(tmp_path, monkeypatch):
+    source, backup_root = str(tmp_path / 'saves'), str(tmp_path / 'backups')
+    for name in ('a.save', 'b.save', 'c.save'):
+        _write(os.path.join(source, name), name)
+    hashed = _count_hashes(monkeypatch)
+
+    delta_backup(source, backup_root)
+    assert sorted(hashed) == ['a.save', 'b.save', 'c.save']
+
+    hashed.clear()
+    _write(os.path.join(source, 'b.save'), 'b.save, geändert')
+    delta_backup(source, backup_root)
+    assert hashed == ['b.save']
+
+def test_delta_backup_skips_files_that_vanish_while_hashing(tmp_path, monkeypatch):
+    from backup_catalog import open_catalog
+
+    source, backup_root = str(tmp_path / 'saves'), str(tmp_path / 'backups')
+    _write(os.path.join(source, 'a.save'), 'a')
+    _write(os.path.join(source, 'gone.save'), 'gone')
+    hashed = _count_hashes(monkeypatch, fail={'gone.save'})
+
+    delta_backup(source, backup_root)
+
+    catalog = open_catalog(backup_root)
+    try:
+        assert catalog.held_paths(source) == {'a.save'}
+    finally:
+        catalog.close()
+    # Übersprungene Datei wird beim nächsten Lauf erneut versucht
+    monkeypatch.undo()
+    hashed = _count_hashes(monkeypatch)
+    delta_backup(source, backup_root)
+    assert hashed == ['gone.save']
+
+def test_pruning_repository_snapshots_removes_unreferenced_chunks(tmp_path, monkeypatch):
+    import backup_repository
+    from backup_manager import repository_backup
+    from backup_catalog import prune_backups, restore_tree
+
+    monkeypatch.setattr(backup_repository, 'GC_GRACE_SECONDS', -1)
+    source, backup_root, target = (str(tmp_path / name) for name in ('mods', 'backups', 'restored'))
+    objects = os.path.join(backup_root, 'repository', 'objects')
+
+    def chunk_count():
+        return sum(len(names) for _, _, names in os.walk(objects))
+
+    _write(os.path.join(source, 'old.package'), 'old content')
+    repository_backup(source, backup_root)
+    os.remove(os.path.join(source, 'old.package'))
+    _write(os.path.join(source, 'new.package'), 'new content')
+    repository_backup(source, backup_root)
+    assert chunk_count() == 2
+
+    prune_backups(backup_root, source, keep_last=1)
+
+    assert chunk_count() == 1
+    assert restore_tree(backup_root, source, target) == 1
+
+def test_full_zip_backup_bounds_the_in_flight_bytes(tmp_path, monkeypatch):
+    from concurrent.futures import ThreadPoolExecutor
+
+    import backup_manager
+    from zip_writer import ZipWriter
+
+    in_flight = []
+    peak = []
+
+    class RecordingExecutor(ThreadPoolExecutor):
+        def submit(self, fn, file_path, *args):
+            in_flight.append(os.path.getsize(file_path))
+            peak.append(sum(in_flight))
+            return super().submit(fn, file_path, *args)
+
+    class RecordingWriter(ZipWriter):
+        def write_compressed(self, zinfo, data):
+            in_flight.pop(0)
+            super().write_compressed(zinfo, data)
+
+    monkeypatch.setattr(backup_manager, 'ZIP_MAX_INFLIGHT_BYTES', 64 * 1024)
+    monkeypatch.setattr(backup_manager, 'ThreadPoolExecutor', RecordingExecutor)
+    monkeypatch.setattr(backup_manager, 'ZipWriter', RecordingWriter)
+    source = str(tmp_path / 'mods')
+    for i in range(12):
+        _write(os.path.join(source, f'{i}.txt'), 'x' * 20 * 1024)
+
+    backup_manager.full_zip_backup(source, str(tmp_path / 'backups'), workers=8)
+
+    assert len(peak) == 12
+    assert max(peak) <= 64 * 1024
+
+def test_failed_full_zip_backup_leaves_no_archive(tmp_path, monkeypatch):
+    import backup_manager
+
+    def failing_compress(file_path, arcname, compresslevel):
+        raise OSError("Datei verschwunden")
+
+    monkeypatch.setattr(backup_manager, '_compress_zip_entry', failing_compress)
+    source, backup_root = str(tmp_path / 'mods'), str(tmp_path / 'backups')
+    _write(os.path.join(source, 'a.txt'), 'a')
+
+    with pytest.raises(OSError):
+        backup_manager.full_zip_backup(source, backup_root)
+
+    assert [name for name in os.listdir(backup_root) if name.endswith('.zip')] == []
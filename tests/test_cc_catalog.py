@@ -0,0 +1,117 @@
+import os
+import time
+
+from synthetic_data import make_synthetic_package
+from cc_catalog import LocalCatalog, creator_from_name, merge_hints, split_resolved
+from mod_folder_scanner import update_mods_index
+from search_queue import SearchQueue
+
+def _catalog(tmp_path, packages):
+    """Legt die Packages im Mods-Ordner an, indexiert sie und gibt (Katalog, {Name: Instanzen}) zurück."""
+    mods = tmp_path / 'Mods'
+    mods.mkdir(exist_ok=True)
+    db_path = str(tmp_path / 'simvault.db')
+    instances = {name: make_synthetic_package(str(mods / name), resource_count=2, seed=seed)
+                 for seed, name in enumerate(packages)}
+    update_mods_index(str(mods), db_path)
+    catalog = LocalCatalog(db_path)
+    catalog.refresh()
+    return catalog, instances
+
+def test_creator_from_name():
+    assert creator_from_name('[Simsdom] Hair.package') == 'Simsdom'
+    assert creator_from_name('Peacemaker_Sofa.package') == 'Peacemaker'
+    assert creator_from_name('Felixandre - Dress.package') == 'Felixandre'
+    assert creator_from_name('Dress.package') is None
+
+def test_installed_files_resolve_ids(tmp_path):
+    catalog, instances = _catalog(tmp_path, ['Creator_Hair.package'])
+    try:
+        cc_id = hex(instances['Creator_Hair.package'][0])
+
+        resolved, hints, unresolved = split_resolved(catalog, [cc_id, '0x8000000000000001'])
+
+        assert resolved == {cc_id: {'Lokal: Creator_Hair.package': str(tmp_path / 'Mods' / 'Creator_Hair.package')}}
+        assert hints == {}
+        assert unresolved == ['0x8000000000000001']
+    finally:
+        catalog.close()
+
+def test_archived_files_are_only_hints(tmp_path):
+    catalog, instances = _catalog(tmp_path, ['Old_Sofa.package'])
+    try:
+        os.remove(tmp_path / 'Mods' / 'Old_Sofa.package')
+        update_mods_index(str(tmp_path / 'Mods'), str(tmp_path / 'simvault.db'))
+        assert catalog.refresh()["archived"] == 1
+        cc_id = hex(instances['Old_Sofa.package'][0])
+
+        candidates = catalog.resolve([cc_id])
+        resolved, hints, unresolved = split_resolved(catalog, [cc_id])
+
+        assert candidates[cc_id][0]["installed"] is False
+        assert resolved == {}
+        assert list(hints) == [cc_id]
+        assert unresolved == [cc_id]
+    finally:
+        catalog.close()
+
+def test_search_hits_resolve_only_within_the_ttl(tmp_path):
+    db_path = str(tmp_path / 'simvault.db')
+    queue = SearchQueue(db_path)
+    try:
+        queue.enqueue(['0x8000000000000001', '0x8000000000000002'], ['site'])
+        queue.claim(10, ['site'])
+        queue.complete('0x8000000000000001', 'site', 'http://fresh')
+        queue.complete('0x8000000000000002', 'site', 'http://stale')
+        with queue.conn:
+            queue.conn.execute("UPDATE search_tasks SET updated_at = ? WHERE cc_id = '0x8000000000000002'",
+                               (time.time() - 7200,))
+    finally:
+        queue.close()
+    catalog = LocalCatalog(db_path)
+    try:
+        resolved, hints, unresolved = split_resolved(
+            catalog, ['0x8000000000000001', '0x8000000000000002'], ttl=3600)
+
+        assert resolved == {'0x8000000000000001': {'site': 'http://fresh'}}
+        assert hints == {'0x8000000000000002': {'site': 'http://stale'}}
+        assert unresolved == ['0x8000000000000002']
+        assert merge_hints({'0x8000000000000002': {'site': 'http://new', 'other': 'http://o'}}, hints) == \
+            {'0x8000000000000002': {'site': 'http://new', 'other': 'http://o'}}
+    finally:
+        catalog.close()
+
+def test_search_by_name_creator_and_key_prefix(tmp_path):
+    catalog, instances = _catalog(tmp_path, ['Simsdom_Long_Hair.package', 'Peacemaker_Sofa.package'])
+    try:
+        assert catalog.search('long hair')[0]["name"] == 'Simsdom_Long_Hair.package'
+        assert catalog.search('peacemaker')[0]["name"] == 'Peacemaker_Sofa.package'
+        assert catalog.search('') == []
+
+        instance = instances['Peacemaker_Sofa.package'][1]
+        by_key = catalog.search(hex(instance)[:8])
+        assert hex(instance) in [candidate["instance"] for candidate in by_key]
+        assert all(candidate["instance"].startswith(hex(instance)[:8]) for candidate in by_key)
+        # Ein-Ziffer-Präfixe im vorzeichenbehaftet gespeicherten Bereich oberhalb von 0x8000…
+        all_instances = [hex(i) for names in instances.values() for i in names]
+        for digit in '89abcdef':
+            expected = sorted(i for i in all_instances if i.startswith(f'0x{digit}'))
+            assert sorted(c["instance"] for c in catalog.search(f'0x{digit}', limit=10)) == expected
+        assert catalog.search('0x1') == []
+    finally:
+        catalog.close()
+
+def test_duplicate_and_mixed_case_ids_are_resolved_for_every_spelling(tmp_path):
+    catalog, instances = _catalog(tmp_path, ['Creator_Hair.package'])
+    try:
+        cc_id = hex(instances['Creator_Hair.package'][0])
+        spellings = [cc_id, cc_id, '0x' + cc_id[2:].upper(), '0x8000000000000001']
+
+        candidates = catalog.resolve(spellings)
+        resolved, hints, unresolved = split_resolved(catalog, spellings)
+
+        assert sorted(candidates) == sorted({cc_id, '0x' + cc_id[2:].upper()})
+        assert sorted(resolved) == sorted(candidates)
+        assert unresolved == ['0x8000000000000001']
+    finally:
+        catalog.close()
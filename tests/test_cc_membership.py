@@ -0,0 +1,51 @@
+import numpy as np
+
+from synthetic_data import make_synthetic_package
+from cc_membership import InstalledKeySet, load_installed_key_set
+from mod_folder_scanner import update_mods_index
+
+def test_missing_matches_set_difference():
+    rng = np.random.default_rng(0)
+    installed = rng.integers(2**63, 2**64 - 1, size=5000, dtype=np.uint64)
+    queried = np.concatenate([installed[:2000], rng.integers(2**63, 2**64 - 1, size=3000, dtype=np.uint64)])
+
+    key_set = InstalledKeySet.from_instances(np.concatenate([installed, installed[:10]]))
+
+    expected = sorted(set(queried.tolist()) - set(installed.tolist()))
+    assert key_set.missing(queried).tolist() == expected
+    assert key_set.contains(installed).all()
+
+def test_hex_strings_and_empty_set():
+    key_set = InstalledKeySet.from_instances([0x8000000000000001, 0xFFFFFFFFFFFFFFFF])
+
+    assert key_set.missing(['0x8000000000000001', '0x8000000000000002', '0xffffffffffffffff']).tolist() == \
+        [0x8000000000000002]
+    assert InstalledKeySet.from_instances([]).missing(['0x5']).tolist() == [5]
+
+def test_save_and_load_round_trip(tmp_path):
+    prefix = str(tmp_path / 'installed')
+    key_set = InstalledKeySet.from_instances([3, 1, 2])
+    key_set.save(prefix, generation=7)
+
+    loaded = InstalledKeySet.load(prefix)
+
+    assert InstalledKeySet.saved_generation(prefix) == 7
+    assert loaded.keys.tolist() == [1, 2, 3]
+    assert loaded.missing([1, 4]).tolist() == [4]
+    assert InstalledKeySet.saved_generation(str(tmp_path / 'other')) is None
+
+def test_key_set_is_rebuilt_after_the_index_generation_changed(tmp_path):
+    mods = tmp_path / 'Mods'
+    mods.mkdir()
+    db_path = str(tmp_path / 'index.db')
+    prefix = str(tmp_path / 'installed')
+    first = make_synthetic_package(str(mods / 'a.package'), resource_count=2, seed=1)
+    update_mods_index(str(mods), db_path)
+
+    assert load_installed_key_set(db_path, prefix).keys.tolist() == sorted(first)
+
+    second = make_synthetic_package(str(mods / 'b.package'), resource_count=2, seed=2)
+    update_mods_index(str(mods), db_path)
+
+    # Ohne rebuild: die gespeicherte Generation passt nicht mehr zum Index
+    assert load_installed_key_set(db_path, prefix).keys.tolist() == sorted(first + second)
@@ -0,0 +1,59 @@
+import threading
+import time
+
+import cc_searcher
+
+def _engines(server, *names):
+    port = server.server_address[1]
+    return {name: f"http://127.0.0.1:{port}/{name}?q={{query}}" for name in names}
+
+def test_iter_search_results_against_stub_server(stub_server):
+    engines = _engines(stub_server, 'ok', 'fail')
+    results = list(cc_searcher.iter_search_results(['0x1', '0x2'], search_engines=engines, rate=1000, burst=10))
+
+    assert sorted(results) == [
+        ('0x1', 'fail', None),
+        ('0x1', 'ok', engines['ok'].format(query='0x1')),
+        ('0x2', 'fail', None),
+        ('0x2', 'ok', engines['ok'].format(query='0x2')),
+    ]
+    assert len(stub_server.requests) == 4
+
+def test_search_alternatives_groups_hits_per_id(stub_server):
+    engines = _engines(stub_server, 'ok', 'fail')
+    results = cc_searcher.search_alternatives(['0x1'], search_engines=engines, rate=1000, burst=10)
+
+    assert results == {'0x1': {'ok': engines['ok'].format(query='0x1')}}
+
+def test_closing_the_generator_early_does_not_run_queued_searches(stub_server):
+    stub_server.delay = threading.Event()
+    stub_server.delay_seconds = 0.2
+    engines = _engines(stub_server, 'a', 'b')
+    max_workers = 2
+
+    results = cc_searcher.iter_search_results((f"0x{i:x}" for i in range(200)), search_engines=engines,
+                                              max_workers=max_workers, rate=1000, burst=10)
+    next(results)
+    started = time.monotonic()
+    results.close()
+
+    # Nur die laufenden bzw. vorab eingereichten Aufträge werden noch beendet
+    assert time.monotonic() - started < 2
+    assert len(stub_server.requests) <= max_workers * 2 + 1
+
+def test_stopped_queue_search_leaves_open_tasks_for_the_next_run(stub_server, tmp_path):
+    from search_queue import SearchQueue
+
+    engines = _engines(stub_server, 'ok')
+    stop = threading.Event()
+    stop.set()
+    queue = SearchQueue(str(tmp_path / 'q.db'))
+    try:
+        results = cc_searcher.search_alternatives(['0x1'], queue=queue, search_engines=engines, stop=stop,
+                                                  rate=1000, burst=10)
+
+        assert results == {'0x1': {}}
+        assert stub_server.requests == []
+        assert queue.claim(10, engines) == [('0x1', 'ok')]
+    finally:
+        queue.close()
@@ -0,0 +1,86 @@
+import io
+import struct
+
+import pytest
+
+from synthetic_data import write_dbpf
+from dbpf_reader import (COMPRESSION_NONE, COMPRESSION_ZLIB, EXTENDED_ENTRY_BIT, HEADER_SIZE,
+                         INDEX_FLAG_CONST_GROUP, INDEX_FLAG_CONST_TYPE, ResourceKey,
+                         iter_resources, read_dbpf_index)
+from savegame_analyzer import analyze_savegame_array, extract_cc_references
+
+def _dbpf(index, index_count, body=b''):
+    """Baut einen DBPF-Container aus rohem Index und Ressourcen-Daten direkt hinter dem Header."""
+    header = bytearray(HEADER_SIZE)
+    struct.pack_into('<4sII', header, 0, b'DBPF', 2, 1)
+    struct.pack_into('<III', header, 36, index_count, 0, len(index))
+    struct.pack_into('<II', header, 60, 3, HEADER_SIZE + len(body))
+    return io.BytesIO(bytes(header) + body + index)
+
+def test_index_with_constant_fields_and_plain_entries():
+    payloads = [b'first', b'second!']
+    body = b''.join(payloads)
+    index = struct.pack('<III', INDEX_FLAG_CONST_TYPE | INDEX_FLAG_CONST_GROUP, 0x0D, 7)
+    offset = HEADER_SIZE
+    for instance, payload in enumerate(payloads, start=1):
+        index += struct.pack('<IIIII', 0x1, instance, offset, len(payload), len(payload))
+        offset += len(payload)
+
+    f = _dbpf(index, 2, body)
+    entries = read_dbpf_index(f)
+
+    assert [entry.key for entry in entries] == [ResourceKey(0x0D, 7, (1 << 32) | 1),
+                                                ResourceKey(0x0D, 7, (1 << 32) | 2)]
+    assert all(entry.compression == COMPRESSION_NONE for entry in entries)
+    assert [payload for _, payload in iter_resources(f)] == payloads
+
+def test_extended_entries_with_zlib_resources(tmp_path):
+    path = str(tmp_path / 'a.package')
+    write_dbpf(path, [(0x0D, 0, 0x8000000000000001, b'x' * 100), (0x2, 3, 5, b'other')])
+
+    with open(path, 'rb') as f:
+        entries = read_dbpf_index(f)
+        assert [entry.compression for entry in entries] == [COMPRESSION_ZLIB, COMPRESSION_ZLIB]
+        assert entries[0].mem_size == 100
+        assert list(iter_resources(f, {0x0D})) == [(ResourceKey(0x0D, 0, 0x8000000000000001), b'x' * 100)]
+
+@pytest.mark.parametrize('index_count, index_size', [(5, 8), (1, 2), (2, 32)])
+def test_index_smaller_than_its_entries_raises_value_error(index_count, index_size):
+    index = struct.pack('<I', 0) + b'\0' * (index_size - 4) if index_size >= 4 else b'\0' * index_size
+
+    with pytest.raises(ValueError):
+        read_dbpf_index(_dbpf(index, index_count))
+
+def test_extended_entry_past_the_index_end_raises_value_error():
+    index = struct.pack('<IIIIIIII', 0, 0x0D, 0, 0, 1, HEADER_SIZE, 4 | EXTENDED_ENTRY_BIT, 4)
+
+    with pytest.raises(ValueError):
+        read_dbpf_index(_dbpf(index, 1))
+
+def test_truncated_files_are_logged_and_yield_no_ids(tmp_path):
+    path = str(tmp_path / 'Slot_00000001.save')
+    payload = struct.pack('<QQ', 0x8000000000000005, 1)
+    write_dbpf(path, [(0x0D, 0, 1, payload)])
+    with open(path, 'rb') as f:
+        data = bytearray(f.read())
+    assert analyze_savegame_array(path).tolist() == [0x8000000000000005]
+
+    # Index verlangt mehr Einträge als vorhanden
+    struct.pack_into('<I', data, 36, 5)
+    with open(path, 'wb') as f:
+        f.write(data)
+    assert analyze_savegame_array(path).size == 0
+    assert extract_cc_references(path) == []
+
+    with open(path, 'wb') as f:
+        f.write(data[:HEADER_SIZE + 4])
+    assert analyze_savegame_array(path).size == 0
+
+def test_corrupt_zlib_resource_is_logged(tmp_path):
+    path = str(tmp_path / 'Slot_00000002.save')
+    write_dbpf(path, [(0x0D, 0, 1, b'y' * 64)])
+    with open(path, 'r+b') as f:
+        f.seek(HEADER_SIZE)
+        f.write(b'\xff' * 4)
+
+    assert analyze_savegame_array(path).size == 0
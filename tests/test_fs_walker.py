@@ -0,0 +1,64 @@
+import os
+import threading
+
+from fs_walker import walk_files
+
+def _tree(tmp_path):
+    for rel in ('a.package', 'b.ts4script', 'notes.txt', 'x.tmp',
+                'sub/c.PACKAGE', 'sub/deep/d.package', '__pycache__/e.package'):
+        path = tmp_path / rel
+        os.makedirs(path.parent, exist_ok=True)
+        path.write_bytes(b'x' * 3)
+    return tmp_path
+
+def _walk(root, **kwargs):
+    return sorted(os.path.relpath(entry.path, root).replace(os.sep, '/')
+                  for entry in walk_files(str(root), **kwargs))
+
+def test_walk_files_returns_every_file_with_stat(tmp_path):
+    entries = list(walk_files(str(_tree(tmp_path))))
+
+    assert _walk(tmp_path) == ['__pycache__/e.package', 'a.package', 'b.ts4script', 'notes.txt',
+                               'sub/c.PACKAGE', 'sub/deep/d.package', 'x.tmp']
+    assert all(entry.stat().st_size == 3 for entry in entries)
+
+def test_extensions_are_matched_case_insensitively(tmp_path):
+    _tree(tmp_path)
+
+    assert _walk(tmp_path, extensions=('.Package', '.ts4script')) == [
+        '__pycache__/e.package', 'a.package', 'b.ts4script', 'sub/c.PACKAGE', 'sub/deep/d.package']
+
+def test_ignore_patterns_skip_files_and_whole_directories(tmp_path):
+    _tree(tmp_path)
+
+    assert _walk(tmp_path, ignore_patterns=('*.tmp', '__pycache__', 'deep')) == [
+        'a.package', 'b.ts4script', 'notes.txt', 'sub/c.PACKAGE']
+
+def test_unreadable_directories_are_reported(tmp_path, monkeypatch):
+    _tree(tmp_path)
+    scandir = os.scandir
+    blocked = str(tmp_path / 'sub')
+    def failing_scandir(path):
+        if path == blocked:
+            raise PermissionError(13, 'Zugriff verweigert', path)
+        return scandir(path)
+    monkeypatch.setattr(os, 'scandir', failing_scandir)
+
+    errors = []
+    names = _walk(tmp_path, errors=errors)
+
+    assert errors == [blocked]
+    assert 'sub/c.PACKAGE' not in names
+    assert 'a.package' in names
+
+def test_closing_the_generator_early_stops_the_workers(tmp_path):
+    for i in range(50):
+        os.makedirs(tmp_path / f'dir{i}')
+        (tmp_path / f'dir{i}' / 'f.package').write_bytes(b'')
+    threads = threading.active_count()
+
+    walker = walk_files(str(tmp_path))
+    next(walker)
+    walker.close()
+
+    assert threading.active_count() == threads
@@ -0,0 +1,89 @@
+import json
+import os
+
+import pytest
+
+import main
+from report_generator import generate_delta_report
+
+def _config(tmp_path, **overrides):
+    config = {
+        "savegames_folder": str(tmp_path / 'saves'),
+        "mods_folder": str(tmp_path / 'Mods'),
+        "backup_folder": str(tmp_path / 'backups'),
+        "search_cache": {"path": str(tmp_path / 'search_cache.db')},
+        "pipeline": {"cache_path": str(tmp_path / 'pipeline_cache.db')},
+        "database": {"sqlite_path": str(tmp_path / 'simvault_data.db')},
+    }
+    config.update(overrides)
+    path = tmp_path / 'config.json'
+    path.write_text(json.dumps(config), encoding='utf-8')
+    return str(path)
+
+def test_parser_maps_commands_to_handlers():
+    parser = main.build_parser()
+
+    args = parser.parse_args(['search', '0x1', '0x2', '--online-only'])
+    assert args.handler is main.cmd_search
+    assert args.ids == ['0x1', '0x2'] and args.online_only
+
+    args = parser.parse_args(['backup', '--source', 'mods', '--mode', 'delta'])
+    assert args.handler is main.cmd_backup
+    assert (args.source, args.mode) == ('mods', 'delta')
+
+    with pytest.raises(SystemExit):
+        parser.parse_args(['backup', '--mode', 'weekly'])
+
+def test_run_is_the_default_command(tmp_path, monkeypatch):
+    calls = []
+    monkeypatch.setattr(main, 'cmd_run', lambda config, args: calls.append(config["report_mode"]))
+
+    assert main.main(['--config', _config(tmp_path), '-q']) == 0
+    assert calls == ['full']
+
+def test_invalid_config_exits_with_code_2(tmp_path):
+    broken = tmp_path / 'broken.json'
+    broken.write_text('{"report_mode": ', encoding='utf-8')
+
+    assert main.main(['--config', str(broken), '-q', 'scan']) == 2
+    assert main.main(['--config', _config(tmp_path, report_mode='weekly'), '-q', 'scan']) == 2
+
+def test_search_rejects_invalid_ids(tmp_path, caplog):
+    assert main.main(['--config', _config(tmp_path), '-q', 'search', '0x1', 'zz']) == 2
+    assert "'zz'" in caplog.text
+    assert main.main(['--config', _config(tmp_path), '-q', 'search', hex(1 << 64)]) == 2
+
+def test_search_normalizes_and_deduplicates_ids(tmp_path, monkeypatch, capsys):
+    import cc_searcher
+
+    searched = []
+    def fake_search(cc_ids, queue=None, cache=None, **kwargs):
+        searched.append(list(cc_ids))
+        return {cc_id: {'Stub': f'https://example.invalid/{cc_id}'} for cc_id in cc_ids}
+    monkeypatch.setattr(cc_searcher, 'search_alternatives', fake_search)
+
+    exit_code = main.main(['--config', _config(tmp_path), '-q', 'search',
+                           '0x8000000000000001', '0X8000000000000001', '8000000000000002'])
+
+    assert exit_code == 0
+    assert searched == [['0x8000000000000001', '0x8000000000000002']]
+    assert json.loads(capsys.readouterr().out) == {
+        '0x8000000000000001': {'Stub': 'https://example.invalid/0x8000000000000001'},
+        '0x8000000000000002': {'Stub': 'https://example.invalid/0x8000000000000002'},
+    }
+
+def test_report_in_delta_mode_writes_the_rolling_report(tmp_path, capsys):
+    config_path = _config(tmp_path, report_mode='delta', report_formats=['json'])
+    db_path = str(tmp_path / 'simvault_data.db')
+    output_dir = str(tmp_path / 'reports')
+    generate_delta_report(['0x1', '0x2'], {'0x1': ['http://a']}, output_dir, db_path, ['json'])
+    generate_delta_report(['0x1', '0x3'], {'0x1': ['http://a']}, output_dir, db_path, ['json'])
+    with open(os.path.join(output_dir, 'report_latest.json'), encoding='utf-8') as f:
+        expected = json.load(f)
+    os.remove(os.path.join(output_dir, 'report_latest.json'))
+
+    assert main.main(['--config', config_path, '-q', 'report', '--output-dir', output_dir]) == 0
+
+    assert capsys.readouterr().out.splitlines()[-1] == os.path.join(output_dir, 'report_latest.json')
+    with open(os.path.join(output_dir, 'report_latest.json'), encoding='utf-8') as f:
+        assert json.load(f) == expected == {'0x1': ['http://a'], '0x3': []}
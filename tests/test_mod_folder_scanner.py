@@ -0,0 +1,105 @@
+import os
+import struct
+
+from synthetic_data import make_synthetic_package
+from mod_folder_scanner import load_index_generation, load_installed_instances, update_mods_index
+
+def _installed(db_path):
+    return sorted(load_installed_instances(db_path).tolist())
+
+def test_update_mods_index_adds_changes_and_removes_files(tmp_path):
+    mods = tmp_path / 'Mods'
+    os.makedirs(mods / 'sub')
+    db_path = str(tmp_path / 'index.db')
+    first = make_synthetic_package(str(mods / 'a.package'), resource_count=3, seed=1)
+    second = make_synthetic_package(str(mods / 'sub' / 'b.package'), resource_count=2, seed=2)
+    (mods / 'script.ts4script').write_bytes(b'PK')
+
+    assert update_mods_index(str(mods), db_path) == {"files": 3, "updated": 3, "removed": 0}
+    assert _installed(db_path) == sorted(first + second)
+    generation = load_index_generation(db_path)
+
+    # Unverändert: nichts wird neu gelesen, der Zähler bleibt gleich
+    assert update_mods_index(str(mods), db_path) == {"files": 3, "updated": 0, "removed": 0}
+    assert load_index_generation(db_path) == generation
+
+    changed = make_synthetic_package(str(mods / 'a.package'), resource_count=4, seed=3)
+    stat = os.stat(mods / 'a.package')
+    os.utime(mods / 'a.package', ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    os.remove(mods / 'sub' / 'b.package')
+
+    assert update_mods_index(str(mods), db_path) == {"files": 2, "updated": 1, "removed": 1}
+    assert _installed(db_path) == sorted(changed)
+    assert load_index_generation(db_path) == generation + 1
+
+def test_corrupt_package_is_skipped_and_the_rest_is_indexed(tmp_path):
+    mods = tmp_path / 'Mods'
+    os.makedirs(mods)
+    db_path = str(tmp_path / 'index.db')
+    good = make_synthetic_package(str(mods / 'good.package'), resource_count=2, seed=1)
+    make_synthetic_package(str(mods / 'bad.package'), resource_count=1, seed=2)
+    # Gültiger Header, aber index_count passt nicht zu index_size
+    with open(mods / 'bad.package', 'r+b') as f:
+        f.seek(36)
+        f.write(struct.pack('<III', 5, 0, 8))
+
+    assert update_mods_index(str(mods), db_path) == {"files": 2, "updated": 2, "removed": 0}
+    assert _installed(db_path) == sorted(good)
+
+def test_unreadable_mods_folder_keeps_the_index(tmp_path):
+    mods = tmp_path / 'Mods'
+    os.makedirs(mods)
+    db_path = str(tmp_path / 'index.db')
+    instances = make_synthetic_package(str(mods / 'a.package'), resource_count=2)
+    update_mods_index(str(mods), db_path)
+
+    assert update_mods_index(str(tmp_path / 'missing'), db_path) == {"files": 1, "updated": 0, "removed": 0}
+    assert _installed(db_path) == sorted(instances)
+
+def test_unreadable_package_keeps_its_resources_and_is_retried(tmp_path, monkeypatch):
+    import mod_folder_scanner
+
+    mods = tmp_path / 'Mods'
+    os.makedirs(mods)
+    db_path = str(tmp_path / 'index.db')
+    old = make_synthetic_package(str(mods / 'a.package'), resource_count=2, seed=1)
+    update_mods_index(str(mods), db_path)
+    generation = load_index_generation(db_path)
+
+    new = make_synthetic_package(str(mods / 'a.package'), resource_count=3, seed=2)
+    stat = os.stat(mods / 'a.package')
+    os.utime(mods / 'a.package', ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+    read_header = mod_folder_scanner.read_dbpf_header
+    def locked(f):
+        raise PermissionError(13, 'Datei gesperrt')
+    monkeypatch.setattr(mod_folder_scanner, 'read_dbpf_header', locked)
+
+    # Nicht lesbar: alte Ressourcen bleiben, Größe/mtime werden nicht übernommen
+    assert update_mods_index(str(mods), db_path) == {"files": 1, "updated": 0, "removed": 0}
+    assert _installed(db_path) == sorted(old)
+    assert load_index_generation(db_path) == generation
+
+    monkeypatch.setattr(mod_folder_scanner, 'read_dbpf_header', read_header)
+    assert update_mods_index(str(mods), db_path) == {"files": 1, "updated": 1, "removed": 0}
+    assert _installed(db_path) == sorted(new)
+
+def test_files_under_an_unreadable_subfolder_stay_indexed(tmp_path, monkeypatch):
+    mods = tmp_path / 'Mods'
+    os.makedirs(mods / 'sub')
+    db_path = str(tmp_path / 'index.db')
+    kept = make_synthetic_package(str(mods / 'sub' / 'a.package'), resource_count=2, seed=1)
+    make_synthetic_package(str(mods / 'b.package'), resource_count=2, seed=2)
+    update_mods_index(str(mods), db_path)
+    os.remove(mods / 'b.package')
+
+    scandir = os.scandir
+    def failing_scandir(path):
+        if path == str(mods / 'sub'):
+            raise PermissionError(13, 'Zugriff verweigert', path)
+        return scandir(path)
+    monkeypatch.setattr(os, 'scandir', failing_scandir)
+
+    # Nur die tatsächlich gelöschte Datei verschwindet aus dem Index
+    assert update_mods_index(str(mods), db_path) == {"files": 0, "updated": 0, "removed": 1}
+    assert _installed(db_path) == sorted(kept)
@@ -0,0 +1,85 @@
+import os
+
+from pipeline import StageCache, _report_stage, analyze_savegames
+from report_storage import ReportStore
+from synthetic_data import make_synthetic_save
+
+def _run_report(tmp_path, stage_cache):
+    config = {"report_formats": ['csv']}
+    _report_stage(config, str(tmp_path / 'r.db'), ['0x1'], {'0x1': {'a': 'http://a'}}, stage_cache)
+
+def _report_files(tmp_path):
+    return sorted(os.listdir(tmp_path / 'reports'))
+
+def test_unchanged_report_is_stored_but_not_rendered_again(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    stage_cache = StageCache(str(tmp_path / 'cache.db'))
+    try:
+        _run_report(tmp_path, stage_cache)
+        files = _report_files(tmp_path)
+
+        _run_report(tmp_path, stage_cache)
+
+        assert _report_files(tmp_path) == files
+        store = ReportStore(str(tmp_path / 'r.db'))
+        try:
+            assert store.last_runs(2) == [2, 1]
+            assert store.missing_in_last_runs(2) == ['0x1']
+        finally:
+            store.close()
+    finally:
+        stage_cache.close()
+
+def test_deleted_report_files_are_written_again(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    stage_cache = StageCache(str(tmp_path / 'cache.db'))
+    try:
+        _run_report(tmp_path, stage_cache)
+        for name in _report_files(tmp_path):
+            os.remove(tmp_path / 'reports' / name)
+
+        _run_report(tmp_path, stage_cache)
+
+        assert len(_report_files(tmp_path)) == 1
+    finally:
+        stage_cache.close()
+
+def _analyzed_paths(monkeypatch):
+    import savegame_analyzer
+
+    analyzed = []
+    iter_analyze_savegames = savegame_analyzer.iter_analyze_savegames
+    def recording(file_paths, *args, **kwargs):
+        analyzed.extend(os.path.basename(path) for path in file_paths)
+        return iter_analyze_savegames(file_paths, *args, **kwargs)
+    monkeypatch.setattr(savegame_analyzer, 'iter_analyze_savegames', recording)
+    return analyzed
+
+def test_analyze_cache_is_invalidated_by_changed_inputs(tmp_path, monkeypatch):
+    saves = tmp_path / 'saves'
+    os.makedirs(saves)
+    for seed, name in enumerate(['Slot_00000001.save', 'Slot_00000002.save']):
+        make_synthetic_save(str(saves / name), 4096, id_count=5, seed=seed)
+    config = {"savegames_folder": str(saves), "pipeline": {"cache_path": str(tmp_path / 'cache.db')}}
+    analyzed = _analyzed_paths(monkeypatch)
+
+    first = analyze_savegames(config)
+    assert sorted(analyzed) == ['Slot_00000001.save', 'Slot_00000002.save']
+
+    # Unverändert: alles aus dem Cache, gleiches Ergebnis
+    analyzed.clear()
+    assert analyze_savegames(config) == first
+    assert analyzed == []
+
+    # Geänderter Inhalt (Größe/mtime) eines Savegames: nur dieses wird neu analysiert
+    make_synthetic_save(str(saves / 'Slot_00000002.save'), 8192, id_count=5, seed=7)
+    analyzed.clear()
+    second = analyze_savegames(config)
+    assert analyzed == ['Slot_00000002.save']
+    assert second != first
+
+    # Geänderte Analyse-Einstellung: alle Savegames werden neu analysiert
+    analyzed.clear()
+    config["pipeline"]["unaligned_scan"] = True
+    analyze_savegames(config)
+    assert sorted(analyzed) == ['Slot_00000001.save', 'Slot_00000002.save']
@@ -0,0 +1,85 @@
+import json
+import os
+
+from report_generator import generate_report, generate_delta_report
+from report_storage import ReportStore
+
+def test_delta_run_is_stored_and_compared_with_the_previous_run(tmp_path):
+    db_path = str(tmp_path / 'r.db')
+    output_dir = str(tmp_path / 'reports')
+    generate_report(['0x1', '0x2'], {'0x1': {'a': 'http://a'}}, output_dir, db_path)
+
+    assert generate_delta_report(['0x1', '0x2'], {'0x1': {'a': 'http://a'}}, output_dir, db_path) == \
+        {"added": 0, "changed": 0, "resolved": 0}
+
+    store = ReportStore(db_path)
+    try:
+        assert store.last_runs(2) == [2, 1]
+        assert store.missing_in_last_runs(2) == ['0x1', '0x2']
+    finally:
+        store.close()
+
+def test_delta_report_lists_only_changes(tmp_path):
+    db_path = str(tmp_path / 'r.db')
+    output_dir = str(tmp_path / 'reports')
+    generate_delta_report(['0x1', '0x2'], {'0x1': {'a': 'http://a'}}, output_dir, db_path)
+
+    stats = generate_delta_report(['0x1', '0x3'], {'0x1': {'a': 'http://b'}}, output_dir, db_path)
+
+    assert stats == {"added": 1, "changed": 1, "resolved": 1}
+    deltas = sorted(name for name in os.listdir(output_dir) if name.startswith('delta_'))
+    with open(os.path.join(output_dir, deltas[-1]), encoding='utf-8') as f:
+        delta = json.load(f)
+    assert delta["added"] == {'0x3': []}
+    assert delta["changed"] == {'0x1': {'a': 'http://b'}}
+    assert delta["resolved"] == ['0x2']
+
+def test_missing_latest_report_is_written_again(tmp_path):
+    db_path = str(tmp_path / 'r.db')
+    output_dir = str(tmp_path / 'reports')
+    generate_delta_report(['0x1'], {}, output_dir, db_path, formats=['csv'])
+    os.remove(os.path.join(output_dir, 'report_latest.csv'))
+
+    generate_delta_report(['0x1'], {}, output_dir, db_path, formats=['csv'])
+
+    assert os.path.exists(os.path.join(output_dir, 'report_latest.csv'))
+
+def _latest_json(output_dir):
+    with open(os.path.join(output_dir, 'report_latest.json'), encoding='utf-8') as f:
+        return json.load(f)
+
+def test_generator_input_is_read_once(tmp_path):
+    db_path = str(tmp_path / 'r.db')
+    output_dir = str(tmp_path / 'reports')
+
+    stats = generate_delta_report((cc_id for cc_id in ['0x1', '0x2']), {'0x1': {'a': 'http://a'}},
+                                  output_dir, db_path, formats=['json'])
+
+    assert stats == {"added": 2, "changed": 0, "resolved": 0}
+    assert _latest_json(output_dir) == {'0x1': {'a': 'http://a'}, '0x2': []}
+
+def test_rolling_report_is_patched_with_the_changes(tmp_path):
+    db_path = str(tmp_path / 'r.db')
+    output_dir = str(tmp_path / 'reports')
+    generate_delta_report(['0x1', '0x2', '0x8000000000000001'], {}, output_dir, db_path, formats=['json'])
+
+    generate_delta_report(['0x1', '0x3', '0x8000000000000001'], {'0x1': {'a': 'http://a'}},
+                          output_dir, db_path, formats=['json'])
+
+    assert _latest_json(output_dir) == {'0x1': {'a': 'http://a'}, '0x3': [], '0x8000000000000001': []}
+    store = ReportStore(db_path)
+    try:
+        assert store.latest_run() == 2
+        assert list(store.latest_items()) == [('0x1', {'a': 'http://a'}), ('0x3', []), ('0x8000000000000001', [])]
+    finally:
+        store.close()
+
+def test_rolling_report_is_rebuilt_after_a_full_run(tmp_path):
+    db_path = str(tmp_path / 'r.db')
+    output_dir = str(tmp_path / 'reports')
+    generate_delta_report(['0x1', '0x2'], {}, output_dir, db_path, formats=['json'])
+    generate_report(['0x2', '0x3'], {}, output_dir, db_path, formats=['json'])
+
+    assert generate_delta_report(['0x2', '0x3'], {}, output_dir, db_path, formats=['json']) == \
+        {"added": 0, "changed": 0, "resolved": 0}
+    assert _latest_json(output_dir) == {'0x2': [], '0x3': []}
@@ -0,0 +1,16 @@
+import os
+
+from instrumentation import start_tracing, stop_tracing
+from report_generator import write_report
+
+def test_traced_sinks_are_labelled_with_their_own_format(tmp_path):
+    output_dir = str(tmp_path / 'reports')
+    start_tracing()
+    try:
+        paths = write_report([('0x1', {'a': 'http://a'})], output_dir, str(tmp_path / 'r.db'),
+                             formats=['csv', 'csv', 'json'], name='report')
+    finally:
+        tracer = stop_tracing()
+
+    spans = {span.attrs['format']: span.bytes for span in tracer.spans if span.name == 'report.format'}
+    assert spans == {'csv': os.path.getsize(paths['csv']), 'json': os.path.getsize(paths['json']), 'sqlite': 0}
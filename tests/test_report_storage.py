@@ -0,0 +1,70 @@
+import threading
+
+from report_storage import ReportStore
+
+def _store(tmp_path):
+    return ReportStore(str(tmp_path / 'reports.db'))
+
+def test_runs_keep_their_history(tmp_path):
+    store = _store(tmp_path)
+    try:
+        first = store.begin_run('20260101_000000')
+        store.add_items(first, [('0x8000000000000002', {'a': 'http://a/2'}), ('0x1', ['http://x'])])
+        second = store.begin_run('20260102_000000')
+        store.add_items(second, [('0x8000000000000002', {'a': 'http://a/2', 'b': 'http://b/2'})])
+
+        assert store.last_runs(5) == [second, first]
+        assert store.run_items(first) == [('0x1', {'http://x': 'http://x'}),
+                                          ('0x8000000000000002', {'a': 'http://a/2'})]
+        assert store.run_items(second) == [('0x8000000000000002', {'a': 'http://a/2', 'b': 'http://b/2'})]
+    finally:
+        store.close()
+
+def test_query_api(tmp_path):
+    store = _store(tmp_path)
+    try:
+        assert store.missing_in_last_runs(2) == []
+        assert store.sources_per_site() == {}
+        first = store.begin_run()
+        store.add_items(first, [('0x1', {'a': 'u1'}), ('0x2', {}), ('0x3', {'a': 'u3'})])
+        second = store.begin_run()
+        store.add_items(second, [('0x1', {'a': 'u1', 'b': 'v1'}), ('0x2', {}), ('0x4', {'b': 'v4'})])
+
+        assert store.missing_in_last_runs(2) == ['0x1', '0x2']
+        assert store.missing_in_last_runs(1) == ['0x1', '0x2', '0x4']
+        assert store.sources_per_site() == {'b': 2, 'a': 1}
+        assert store.sources_per_site(first) == {'a': 2}
+        assert store.run_delta(second, first) == (['0x4'], ['0x1'], ['0x3'])
+    finally:
+        store.close()
+
+def test_concurrent_writers_get_distinct_item_ids(tmp_path):
+    run_ids = []
+    errors = []
+    start = threading.Barrier(2)
+
+    def write():
+        store = _store(tmp_path)
+        try:
+            run_id = store.begin_run()
+            run_ids.append(run_id)
+            start.wait()
+            for batch in range(20):
+                store.add_items(run_id, [(hex(batch * 100 + i + 1), {'a': 'u'}) for i in range(100)])
+        except Exception as e:
+            errors.append(e)
+        finally:
+            store.close()
+
+    threads = [threading.Thread(target=write) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    store = _store(tmp_path)
+    try:
+        assert [len(store.run_items(run_id)) for run_id in run_ids] == [2000, 2000]
+    finally:
+        store.close()
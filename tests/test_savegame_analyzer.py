@@ -0,0 +1,93 @@
+import os
+import struct
+
+import numpy as np
+import pytest
+
+from savegame_analyzer import (CC_ID_THRESHOLD, analyze_savegames_folder, extract_cc_id_array, extract_cc_ids,
+                               find_savegames, iter_analyze_savegames)
+from synthetic_data import SAVEGAME_DATA_TYPE, make_synthetic_savegame, write_dbpf
+
+def _reference_ids(data):
+    """Referenz: jedes vollständige 8-Byte-Wort einzeln prüfen."""
+    words = (struct.unpack_from('<Q', data, i)[0] for i in range(0, len(data) - 7, 8))
+    return sorted({word for word in words if word > CC_ID_THRESHOLD})
+
+@pytest.mark.parametrize('size', [0, 7, 8, 17, 4096 + 5])
+def test_extract_cc_id_array_matches_reference_loop(size):
+    data = make_synthetic_savegame(size, id_count=50, seed=size)
+    # Angehängter Rest, der kein ganzes Wort ergibt
+    data += b'\xff' * (size % 8)
+
+    expected = _reference_ids(data)
+    assert extract_cc_id_array(data).tolist() == expected
+    assert extract_cc_ids(data) == [hex(cc_id) for cc_id in expected]
+
+def test_extract_cc_id_array_filters_threshold_and_deduplicates():
+    words = [CC_ID_THRESHOLD, CC_ID_THRESHOLD + 1, 5, CC_ID_THRESHOLD + 1, 2**64 - 1]
+    data = struct.pack('<5Q', *words)
+
+    result = extract_cc_id_array(memoryview(data))
+
+    assert result.dtype == np.uint64
+    assert result.tolist() == [CC_ID_THRESHOLD + 1, 2**64 - 1]
+
+def test_extract_cc_id_array_unaligned_finds_shifted_ids():
+    data = b'\0' * 3 + struct.pack('<Q', CC_ID_THRESHOLD + 7) + b'\0' * 5
+
+    assert extract_cc_id_array(data).size == 0
+    assert extract_cc_id_array(data, unaligned=True).tolist() == [CC_ID_THRESHOLD + 7]
+
+def test_extract_cc_id_array_across_blocks(monkeypatch):
+    import savegame_analyzer
+
+    monkeypatch.setattr(savegame_analyzer, 'SCAN_BLOCK_WORDS', 4)
+    data = make_synthetic_savegame(8 * 64, id_count=20, seed=3)
+
+    assert savegame_analyzer.extract_cc_id_array(data).tolist() == _reference_ids(data)
+
+# Untere 7 Bytes < 0x80: auch der unausgerichtete Scan findet nur die ausgerichteten IDs
+ID_A, ID_B, ID_C = CC_ID_THRESHOLD + 0x11, CC_ID_THRESHOLD + 0x22, CC_ID_THRESHOLD + 0x33
+
+def _save(path, ids):
+    payload = b''.join(b'\0' * 8 + struct.pack('<Q', cc_id) for cc_id in ids)
+    write_dbpf(str(path), [(SAVEGAME_DATA_TYPE, 0, 1, payload)])
+
+def _saves_folder(tmp_path):
+    _save(tmp_path / 'Slot_00000001.save', [ID_A, ID_B])
+    _save(tmp_path / 'Slot_00000001.save.ver1', [ID_A])
+    _save(tmp_path / 'Slot_00000002.save', [ID_B, ID_C])
+    _save(tmp_path / 'Slot_00000003.save', [ID_C])
+    # Gültiger Header, aber index_count passt nicht zu index_size
+    with open(tmp_path / 'Slot_00000003.save', 'r+b') as f:
+        f.seek(36)
+        f.write(struct.pack('<III', 5, 0, 8))
+    _save(tmp_path / 'Slot_00000004.save.ver5', [ID_C])
+    (tmp_path / 'notes.txt').write_text('kein Savegame')
+    os.makedirs(tmp_path / 'ordner.save')
+    return tmp_path
+
+def test_find_savegames_lists_slots_and_rollbacks(tmp_path):
+    folder = _saves_folder(tmp_path)
+
+    assert [os.path.basename(path) for path in find_savegames(str(folder))] == [
+        'Slot_00000001.save', 'Slot_00000001.save.ver1', 'Slot_00000002.save', 'Slot_00000003.save']
+    assert find_savegames(str(tmp_path / 'missing')) == []
+
+def test_iter_analyze_savegames_returns_empty_ids_for_a_corrupt_save(tmp_path):
+    folder = _saves_folder(tmp_path)
+
+    results = {os.path.basename(path): id_array.tolist()
+               for path, id_array in iter_analyze_savegames(find_savegames(str(folder)), max_workers=2)}
+
+    assert results == {'Slot_00000001.save': [ID_A, ID_B], 'Slot_00000001.save.ver1': [ID_A],
+                       'Slot_00000002.save': [ID_B, ID_C], 'Slot_00000003.save': []}
+
+def test_analyze_savegames_folder_merges_sources_per_id(tmp_path):
+    folder = _saves_folder(tmp_path)
+
+    assert analyze_savegames_folder(str(folder), max_workers=2) == {
+        hex(ID_A): ['Slot_00000001.save', 'Slot_00000001.save.ver1'],
+        hex(ID_B): ['Slot_00000001.save', 'Slot_00000002.save'],
+        hex(ID_C): ['Slot_00000002.save'],
+    }
@@ -0,0 +1,55 @@
+import socket
+
+import cc_searcher
+from search_cache import SearchCache
+
+def _free_url():
+    # Port ohne Server: Verbindungsfehler wie bei einem Netzwerkausfall
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+    return f"http://127.0.0.1:{port}/ok?q={{query}}"
+
+def test_body_is_only_unpacked_on_request(tmp_path):
+    cache = SearchCache(str(tmp_path / 'cache.db'))
+    try:
+        cache.put('site', 'Query', 'http://hit', b'<html>ok</html>', '"v1"')
+        entry = cache.get('site', 'query')
+
+        assert entry.result == 'http://hit' and entry.etag == '"v1"' and entry.fresh
+        assert cache.body('site', '  QUERY ') == b'<html>ok</html>'
+    finally:
+        cache.close()
+
+def test_url_uses_the_normalized_query(stub_server, tmp_path):
+    template = f"http://127.0.0.1:{stub_server.server_address[1]}/ok?q={{query}}"
+    cache = SearchCache(str(tmp_path / 'cache.db'))
+    try:
+        first = cc_searcher.search_site('ok', template, '0xABC', cache=cache)
+        second = cc_searcher.search_site('ok', template, '0xabc', cache=cache)
+    finally:
+        cache.close()
+
+    assert first == second == template.format(query='0xabc')
+    assert stub_server.requests == ['/ok?q=0xabc']
+
+def test_stale_hit_survives_failed_revalidation(tmp_path):
+    cache = SearchCache(str(tmp_path / 'cache.db'), ttl=0)
+    try:
+        cache.put('ok', '0x1', 'http://hit', b'<html>ok</html>', '"v1"')
+
+        assert cc_searcher.search_site('ok', _free_url(), '0x1', cache=cache) == 'http://hit'
+        assert cache.get('ok', '0x1').result == 'http://hit'
+    finally:
+        cache.close()
+
+def test_revalidation_with_not_modified_keeps_the_hit(stub_server, tmp_path):
+    template = f"http://127.0.0.1:{stub_server.server_address[1]}/ok?q={{query}}"
+    cache = SearchCache(str(tmp_path / 'cache.db'), ttl=0)
+    try:
+        cache.put('ok', '0x1', 'http://hit', b'<html>ok</html>', '"v1"')
+
+        assert cc_searcher.search_site('ok', template, '0x1', cache=cache) == 'http://hit'
+    finally:
+        cache.close()
+    assert stub_server.requests == ['/ok?q=0x1']
@@ -0,0 +1,92 @@
+import time
+
+import search_queue
+from search_queue import SearchQueue
+
+SITES = ['a']
+
+def _status(queue, cc_id):
+    return queue.conn.execute('SELECT status FROM search_tasks WHERE cc_id = ?', (cc_id,)).fetchone()[0]
+
+def test_done_tasks_are_kept_until_their_ttl_expires(tmp_path):
+    queue = SearchQueue(str(tmp_path / 'q.db'), ttl=3600, negative_ttl=0)
+    try:
+        queue.enqueue(['0x1', '0x2'], SITES)
+        assert queue.claim(10, SITES) == [('0x1', 'a'), ('0x2', 'a')]
+        queue.complete('0x1', 'a', 'http://hit')
+        queue.complete('0x2', 'a', None)
+
+        queue.enqueue(['0x1', '0x2'], SITES)
+
+        # Treffer noch gültig, negatives Ergebnis (TTL 0) wird neu gesucht
+        assert _status(queue, '0x1') == 'done'
+        assert _status(queue, '0x2') == 'pending'
+        assert queue.results(['0x1']) == {'0x1': {'a': 'http://hit'}}
+    finally:
+        queue.close()
+
+def test_failed_tasks_are_requeued(tmp_path, monkeypatch):
+    monkeypatch.setattr(search_queue, 'MAX_ATTEMPTS', 1)
+    queue = SearchQueue(str(tmp_path / 'q.db'))
+    try:
+        queue.enqueue(['0x1'], SITES)
+        queue.claim(10, SITES)
+        queue.fail('0x1', 'a', 'timeout')
+        assert _status(queue, '0x1') == 'failed'
+
+        queue.enqueue(['0x1'], SITES)
+
+        assert _status(queue, '0x1') == 'pending'
+        assert queue.claim(10, SITES) == [('0x1', 'a')]
+    finally:
+        queue.close()
+
+def test_running_tasks_are_only_taken_over_after_the_lease(tmp_path):
+    path = str(tmp_path / 'q.db')
+    owner = SearchQueue(path)
+    try:
+        owner.enqueue(['0x1'], SITES)
+        assert owner.claim(10, SITES) == [('0x1', 'a')]
+
+        other = SearchQueue(path, lease=3600)
+        try:
+            assert other.claim(10, SITES) == []
+            assert other.next_retry_in(SITES) is None
+        finally:
+            other.close()
+
+        time.sleep(0.01)
+        expired = SearchQueue(path, lease=0)
+        try:
+            assert expired.next_retry_in(SITES) == 0
+            assert expired.claim(10, SITES) == [('0x1', 'a')]
+        finally:
+            expired.close()
+    finally:
+        owner.close()
+
+def test_tasks_of_a_killed_process_are_released_on_restart(tmp_path):
+    import subprocess
+    import sys
+
+    path = str(tmp_path / 'q.db')
+    crashed = SearchQueue(path, lease=3600)
+    try:
+        crashed.enqueue(['0x1', '0x2'], SITES)
+        assert crashed.claim(1, SITES) == [('0x1', 'a')]
+        # Auftrag einem inzwischen beendeten Prozess desselben Rechners zuordnen
+        process = subprocess.Popen([sys.executable, '-c', 'pass'])
+        process.wait()
+        with crashed.conn:
+            crashed.conn.execute("UPDATE search_tasks SET owner = ? WHERE cc_id = '0x1'",
+                                 (f"{crashed.host}:{process.pid}",))
+    finally:
+        crashed.close()
+
+    restarted = SearchQueue(path, lease=3600)
+    try:
+        assert restarted.claim(10, SITES) == [('0x1', 'a'), ('0x2', 'a')]
+        # Eigene, noch laufende Aufträge werden nicht freigegeben
+        assert restarted.release_dead_leases() == 0
+    finally:
+        restarted.close()
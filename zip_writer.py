@@ -0,0 +1,189 @@
+# Modul: zip_writer.py
+# Funktion: Schlanker ZIP-Schreiber für das Full-ZIP-Backup, der bereits komprimierte Einträge annimmt
+
+# Aufgaben:
+# - Einträge anhängen, deren Deflate-Stream schon in Worker-Threads erzeugt wurde
+#   (zipfile bietet dafür keine öffentliche Schnittstelle, nur interne Attribute)
+# - Große Dateien blockweise lesen und komprimieren, ohne sie ganz in den Speicher zu laden
+# - ZIP64 für große Dateien, Archive über 4 GiB und mehr als 65535 Einträge
+# - Aufbau nach der ZIP-Spezifikation (APPNOTE): lesbar mit zipfile und gängigen Entpackern
+# - Metadaten (Name, Zeitstempel, Rechte, CRC, Größen) kommen aus zipfile.ZipInfo
+
+# Strukturvorschlag:
+# - Klasse: ZipWriter(path)
+#   - write_compressed(zinfo, data) → fertigen Eintrag (ZIP_STORED oder roher Deflate-Stream) anhängen
+#   - write_file(zinfo, file_path, compresslevel) → Datei gestreamt anhängen
+#   - close() → Central Directory und Endsatz schreiben
+#   - abort() → unvollständiges Archiv verwerfen (beim Verlassen des with-Blocks mit Ausnahme)
+
+import os
+import struct
+import zlib
+import zipfile
+
+# Grenzen der klassischen 32-/16-Bit-Felder; darüber werden ZIP64-Felder geschrieben
+ZIP64_LIMIT = 0xFFFFFFFF
+ZIP_MAX_ENTRIES = 0xFFFF
+
+STREAM_BLOCK_SIZE = 1024 * 1024
+
+_LOCAL_HEADER = struct.Struct('<IHHHHHIIIHH')
+_CENTRAL_HEADER = struct.Struct('<IBBBBHHHHIIIHHHHHII')
+_END_RECORD = struct.Struct('<IHHHHIIH')
+_ZIP64_END_RECORD = struct.Struct('<IQHHIIQQQQ')
+_ZIP64_LOCATOR = struct.Struct('<IIQI')
+_ZIP64_EXTRA_ID = 0x0001
+_UTF8_FLAG = 0x800
+_ZIP64_VERSION = 45
+
+def _dos_datetime(date_time):
+    year, month, day, hour, minute, second = date_time
+    return (year - 1980) << 9 | month << 5 | day, hour << 11 | minute << 5 | second // 2
+
+def _encoded_name(zinfo):
+    try:
+        return zinfo.filename.encode('ascii'), zinfo.flag_bits
+    except UnicodeEncodeError:
+        return zinfo.filename.encode('utf-8'), zinfo.flag_bits | _UTF8_FLAG
+
+class ZipWriter:
+    """Schreibt ein ZIP-Archiv sequenziell; Einträge erscheinen in der Reihenfolge der Aufrufe."""
+
+    def __init__(self, path):
+        self.path = path
+        self.f = open(path, 'wb')
+        self.entries = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        # Ein abgeschnittenes Archiv mit gültigem Central Directory sähe wie ein gutes Backup aus
+        if exc_type is not None:
+            self.abort()
+        else:
+            self.close()
+
+    def _write_local_header(self, zinfo, zip64):
+        name, flags = _encoded_name(zinfo)
+        extra = b''
+        compress_size, file_size = zinfo.compress_size, zinfo.file_size
+        if zip64:
+            # Lokaler ZIP64-Eintrag enthält immer beide Größen
+            extra = struct.pack('<HHQQ', _ZIP64_EXTRA_ID, 16, file_size, compress_size)
+            compress_size = file_size = ZIP64_LIMIT
+        dos_date, dos_time = _dos_datetime(zinfo.date_time)
+        zinfo.header_offset = self.f.tell()
+        self.f.write(_LOCAL_HEADER.pack(
+            0x04034b50, _ZIP64_VERSION if zip64 else zinfo.extract_version, flags, zinfo.compress_type,
+            dos_time, dos_date, zinfo.CRC, compress_size, file_size, len(name), len(extra)))
+        self.f.write(name)
+        self.f.write(extra)
+        return zinfo.header_offset + _LOCAL_HEADER.size + len(name)
+
+    def write_compressed(self, zinfo, data):
+        """
+        Hängt einen fertigen Eintrag an.
+
+        zinfo muss CRC, file_size, compress_size und compress_type (ZIP_STORED
+        oder ZIP_DEFLATED mit rohem Deflate-Stream) bereits enthalten.
+        """
+        zip64 = zinfo.file_size >= ZIP64_LIMIT or zinfo.compress_size >= ZIP64_LIMIT
+        self._write_local_header(zinfo, zip64)
+        self.f.write(data)
+        self.entries.append(zinfo)
+
+    def write_file(self, zinfo, file_path, compresslevel=None):
+        """Liest file_path blockweise und hängt es an (Deflate, wenn zinfo.compress_type das verlangt)."""
+        deflate = zinfo.compress_type == zipfile.ZIP_DEFLATED
+        # Platz für ZIP64-Größen vorab reservieren, auch für den Fall leichter Deflate-Expansion
+        zip64 = zinfo.file_size + (zinfo.file_size >> 8) + 1024 >= ZIP64_LIMIT
+        zinfo.CRC = zinfo.compress_size = 0
+        extra_offset = self._write_local_header(zinfo, zip64)
+        compressor = zlib.compressobj(compresslevel or zlib.Z_DEFAULT_COMPRESSION, zlib.DEFLATED, -15) \
+            if deflate else None
+        crc = file_size = compress_size = 0
+        with open(file_path, 'rb') as f:
+            for block in iter(lambda: f.read(STREAM_BLOCK_SIZE), b''):
+                crc = zlib.crc32(block, crc)
+                file_size += len(block)
+                if compressor:
+                    block = compressor.compress(block)
+                compress_size += len(block)
+                self.f.write(block)
+        if compressor:
+            block = compressor.flush()
+            compress_size += len(block)
+            self.f.write(block)
+        if not zip64 and max(file_size, compress_size) >= ZIP64_LIMIT:
+            raise zipfile.LargeZipFile(f"{file_path} ist während des Backups über 4 GiB gewachsen.")
+
+        # CRC und Größen im lokalen Header nachtragen
+        zinfo.CRC, zinfo.file_size, zinfo.compress_size = crc, file_size, compress_size
+        end = self.f.tell()
+        self.f.seek(zinfo.header_offset + 14)
+        if zip64:
+            self.f.write(struct.pack('<I', crc))
+            self.f.seek(extra_offset + 4)
+            self.f.write(struct.pack('<QQ', file_size, compress_size))
+        else:
+            self.f.write(struct.pack('<III', crc, compress_size, file_size))
+        self.f.seek(end)
+        self.entries.append(zinfo)
+
+    def _write_central_header(self, zinfo):
+        name, flags = _encoded_name(zinfo)
+        # ZIP64-Werte in der Reihenfolge Originalgröße, komprimierte Größe, Header-Offset
+        values = []
+        file_size, compress_size, header_offset = zinfo.file_size, zinfo.compress_size, zinfo.header_offset
+        if file_size >= ZIP64_LIMIT:
+            values.append(file_size)
+            file_size = ZIP64_LIMIT
+        if compress_size >= ZIP64_LIMIT:
+            values.append(compress_size)
+            compress_size = ZIP64_LIMIT
+        if header_offset >= ZIP64_LIMIT:
+            values.append(header_offset)
+            header_offset = ZIP64_LIMIT
+        extra = struct.pack(f'<HH{len(values)}Q', _ZIP64_EXTRA_ID, 8 * len(values), *values) if values else b''
+        version = max(zinfo.create_version, _ZIP64_VERSION) if values else zinfo.create_version
+        extract_version = max(zinfo.extract_version, _ZIP64_VERSION) if values else zinfo.extract_version
+        dos_date, dos_time = _dos_datetime(zinfo.date_time)
+        self.f.write(_CENTRAL_HEADER.pack(
+            0x02014b50, version, zinfo.create_system, extract_version, 0, flags, zinfo.compress_type,
+            dos_time, dos_date, zinfo.CRC, compress_size, file_size, len(name), len(extra), 0, 0,
+            zinfo.internal_attr, zinfo.external_attr, header_offset))
+        self.f.write(name)
+        self.f.write(extra)
+
+    def close(self):
+        """Schreibt Central Directory und Endsatz (bei Bedarf im ZIP64-Format) und schließt die Datei."""
+        if self.f.closed:
+            return
+        try:
+            central_offset = self.f.tell()
+            for zinfo in self.entries:
+                self._write_central_header(zinfo)
+            central_size = self.f.tell() - central_offset
+            count = len(self.entries)
+            if count >= ZIP_MAX_ENTRIES or central_offset >= ZIP64_LIMIT or central_size >= ZIP64_LIMIT:
+                zip64_end_offset = self.f.tell()
+                self.f.write(_ZIP64_END_RECORD.pack(
+                    0x06064b50, _ZIP64_END_RECORD.size - 12, _ZIP64_VERSION, _ZIP64_VERSION, 0, 0,
+                    count, count, central_size, central_offset))
+                self.f.write(_ZIP64_LOCATOR.pack(0x07064b50, 0, zip64_end_offset, 1))
+            self.f.write(_END_RECORD.pack(
+                0x06054b50, 0, 0, min(count, ZIP_MAX_ENTRIES), min(count, ZIP_MAX_ENTRIES),
+                min(central_size, ZIP64_LIMIT), min(central_offset, ZIP64_LIMIT), 0))
+        finally:
+            self.f.close()
+
+    def abort(self):
+        """Schließt die Datei, ohne das Central Directory zu schreiben, und löscht das unvollständige Archiv."""
+        if self.f.closed:
+            return
+        self.f.close()
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass